@@ -0,0 +1,248 @@
+import asyncio
+import json
+import ssl
+from urllib.parse import urlsplit
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+
+from ndjson_stream import NDJSONDecoder
+from ollama_client import STAT_FIELDS
+from reasoning import ThinkSplitter
+
+class _Response:
+    """A streamed HTTP/1.1 response. Call close() when done; a fully read keep-alive response goes back to the pool."""
+    def __init__(self, client, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str]):
+        self.client = client
+        self.reader = reader
+        self.writer = writer
+        self.status = status
+        self.headers = headers
+        self._complete = False
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        read = self.client._read
+        if self.headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                line = await read(self.reader.readline())
+                if not line:
+                    # EOF where a chunk size should be: the stream was cut off, not finished
+                    raise ConnectionError("connection closed mid-response")
+                size = int(line.split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    # Skip trailers up to the terminating blank line
+                    while (await read(self.reader.readline())) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                data = await self._exactly(size)
+                await self._exactly(2)
+                yield data
+        elif "content-length" in self.headers:
+            remaining = int(self.headers["content-length"])
+            while remaining > 0:
+                data = await read(self.reader.read(min(remaining, 65536)))
+                if not data:
+                    raise ConnectionError("connection closed mid-response")
+                remaining -= len(data)
+                yield data
+        else:
+            while True:
+                data = await read(self.reader.read(65536))
+                if not data:
+                    break
+                yield data
+            self.headers["connection"] = "close"
+        self._complete = True
+
+    async def _exactly(self, size: int) -> bytes:
+        try:
+            return await self.client._read(self.reader.readexactly(size))
+        except asyncio.IncompleteReadError:
+            raise ConnectionError("connection closed mid-response") from None
+
+    async def ndjson(self) -> AsyncIterator[List[Any]]:
+        """Decoded NDJSON objects, one list per received chunk."""
+        decoder = NDJSONDecoder()
+        async for data in self.chunks():
+            items = decoder.feed(data)
+            if items:
+                yield items
+        items = decoder.flush()
+        if items:
+            yield items
+
+    async def read(self) -> bytes:
+        return b"".join([data async for data in self.chunks()])
+
+    def close(self):
+        reusable = self._complete and self.headers.get("connection", "").lower() != "close"
+        self.client._release(self.reader, self.writer, reusable)
+
+class AsyncOllamaClient:
+    """
+    asyncio counterpart of OllamaClient, built on stdlib streams so it needs
+    no extra dependency. Many chats can stream concurrently on one event
+    loop; `max_streams` bounds how many run at once. Cancelling the task
+    that consumes a stream closes its connection, which makes Ollama abort
+    the generation.
+    """
+    def __init__(self, base_url: str = "http://localhost:11434", max_streams: int = 4, pool_size: int = 10,
+                 connect_timeout: float = 5.0, read_timeout: float = 300.0):
+        self.base_url = base_url.rstrip('/')
+        parts = urlsplit(self.base_url)
+        self._tls = parts.scheme == "https"
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port or (443 if self._tls else 80)
+        self._host_header = parts.netloc
+        self._prefix = parts.path.rstrip('/')
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._streams = asyncio.Semaphore(max_streams)
+
+    # --- Transport -----------------------------------------------------
+
+    async def _read(self, awaitable):
+        return await asyncio.wait_for(awaitable, self.read_timeout)
+
+    async def _connect(self):
+        context = ssl.create_default_context() if self._tls else None
+        return await asyncio.wait_for(asyncio.open_connection(self._host, self._port, ssl=context), self.connect_timeout)
+
+    def _release(self, reader, writer, reusable: bool):
+        if reusable and len(self._idle) < self.pool_size and not writer.is_closing():
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> _Response:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = (f"{method} {self._prefix}{path} HTTP/1.1\r\n"
+                f"Host: {self._host_header}\r\n"
+                "Connection: keep-alive\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1")
+
+        # A pooled connection may have been closed by the server while idle; those get one retry on a fresh one
+        while True:
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else await self._connect()
+            try:
+                writer.write(head + body)
+                await writer.drain()
+                status_line = await self._read(reader.readline())
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if status_line:
+                break
+            writer.close()
+            if not reused:
+                raise ConnectionError("server closed the connection")
+
+        try:
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await self._read(reader.readline())
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+        except BaseException:
+            writer.close()
+            raise
+        return _Response(self, reader, writer, status, headers)
+
+    async def _error_message(self, response: _Response) -> str:
+        try:
+            return json.loads(await response.read()).get("error", f"HTTP {response.status}")
+        except ValueError:
+            return f"HTTP {response.status}"
+
+    async def aclose(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    # --- API -----------------------------------------------------------
+
+    async def tags(self) -> List[Dict[str, Any]]:
+        """Full /api/tags entries (name, size, digest, details, ...); [] when the server is unreachable."""
+        try:
+            response = await self._request("GET", "/api/tags")
+            try:
+                if response.status >= 400:
+                    return []
+                return json.loads(await response.read()).get("models", [])
+            finally:
+                response.close()
+        except (OSError, EOFError, asyncio.TimeoutError, ValueError):
+            return []
+
+    async def get_models(self) -> List[str]:
+        return [model["name"] for model in await self.tags()]
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], system_prompt: str = None,
+                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams a chat response. Yields the same events as OllamaClient.chat_stream
+        without batching: {"type": "content"|"thinking"|"error", "content": str}
+        and a final {"type": "stats", "stats": {...}} (no client timings).
+        """
+        if system_prompt:
+            messages = [{"role": "system", "content": system_prompt}] + list(messages)
+        payload = {"model": model, "messages": messages, "stream": True}
+        if options:
+            payload["options"] = options
+
+        async with self._streams:
+            try:
+                response = await self._request("POST", "/api/chat", payload)
+                try:
+                    if response.status >= 400:
+                        yield {"type": "error", "content": await self._error_message(response)}
+                        return
+                    splitter = ThinkSplitter()
+                    async for bodies in response.ndjson():
+                        for body in bodies:
+                            if "error" in body:
+                                yield {"type": "error", "content": body["error"]}
+                                return
+                            message = body.get("message") or {}
+                            if message.get("thinking"):
+                                yield {"type": "thinking", "content": message["thinking"]}
+                            answer, thinking = splitter.feed(message.get("content") or "")
+                            if body.get("done", False):
+                                rest = splitter.flush()
+                                answer, thinking = answer + rest[0], thinking + rest[1]
+                            if thinking:
+                                yield {"type": "thinking", "content": thinking}
+                            if answer:
+                                yield {"type": "content", "content": answer}
+                            if body.get("done", False):
+                                yield {"type": "stats", "stats": {k: body[k] for k in STAT_FIELDS if k in body}}
+                finally:
+                    response.close()
+            except (OSError, EOFError, asyncio.TimeoutError, ValueError) as e:
+                yield {"type": "error", "content": str(e) or type(e).__name__}
+
+    async def pull(self, name: str) -> AsyncIterator[Dict[str, Any]]:
+        """Pulls a model, yielding the raw /api/pull progress objects ({"error": ...} on failure)."""
+        try:
+            response = await self._request("POST", "/api/pull", {"name": name, "stream": True})
+            try:
+                if response.status >= 400:
+                    yield {"error": await self._error_message(response)}
+                    return
+                async for updates in response.ndjson():
+                    for update in updates:
+                        yield update
+            finally:
+                response.close()
+        except (OSError, EOFError, asyncio.TimeoutError, ValueError) as e:
+            yield {"error": str(e) or type(e).__name__}
@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for Ollinux. Run modules from the repository root,
+e.g. `python -m benchmarks.bench_render`.
+"""
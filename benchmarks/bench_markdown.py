@@ -0,0 +1,129 @@
+"""
+Streaming Markdown tokenizer vs. a full re-parse per chunk, over a corpus.
+
+Pure Python, no display needed. Run from the repo root:
+    python -m benchmarks.bench_markdown --repeat 8
+
+Three strategies are fed the same token-sized chunks:
+  stream   MarkdownStream.feed() on each delta (what RichTextDisplay does)
+  reparse  tokenizing the whole accumulated text again on every delta
+  plain    the old line-buffer logic that only recognised fences and headers
+"""
+import argparse
+import glob
+import os
+import random
+import time
+from typing import Callable, List
+
+from markdown_stream import MarkdownStream, render_markdown
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+def load_corpus(repeat: int) -> str:
+    docs = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.md"))):
+        with open(path, encoding="utf-8") as f:
+            docs.append(f.read())
+    return "\n".join(docs) * repeat
+
+def chunk(text: str, seed: int = 0) -> List[str]:
+    """Splits text into token-sized deltas (1-8 characters, like a real stream)."""
+    rng = random.Random(seed)
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 8)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+def run_stream() -> Callable[[str], None]:
+    stream = MarkdownStream()
+    def step(delta):
+        stream.feed(delta)
+    return step
+
+def run_reparse() -> Callable[[str], None]:
+    state = {"text": ""}
+    def step(delta):
+        state["text"] += delta
+        render_markdown(state["text"])
+    return step
+
+def run_plain() -> Callable[[str], None]:
+    state = {"buffer": "", "in_code_block": False}
+    def emit(text):
+        tags = []
+        if state["in_code_block"]:
+            tags.append("code_block")
+        elif text.strip().startswith('#'):
+            tags.append("header")
+        return text, tuple(tags)
+    def step(delta):
+        state["buffer"] += delta
+        while '\n' in state["buffer"]:
+            line, state["buffer"] = state["buffer"].split('\n', 1)
+            if line.strip().startswith('```'):
+                state["in_code_block"] = not state["in_code_block"]
+                continue
+            emit(line + '\n')
+        if state["buffer"] and not state["buffer"].strip().startswith('`'):
+            emit(state["buffer"])
+            state["buffer"] = ""
+    return step
+
+def measure(factory, chunks: List[str]) -> List[float]:
+    step = factory()
+    timings = []
+    for delta in chunks:
+        start = time.perf_counter()
+        step(delta)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def merge_segments(segments):
+    """Joins adjacent segments with the same tags, so outputs split at different points compare equal."""
+    merged = []
+    for text, tags in segments:
+        if not text:
+            continue
+        if merged and merged[-1][1] == tags:
+            merged[-1] = (merged[-1][0] + text, tags)
+        else:
+            merged.append((text, tags))
+    return merged
+
+def check_equivalence(text: str, chunks: List[str]):
+    stream = MarkdownStream()
+    streamed = []
+    for delta in chunks:
+        streamed.extend(stream.feed(delta))
+    streamed.extend(stream.flush())
+    full = render_markdown(text)
+    if merge_segments(streamed) != merge_segments(full):
+        raise SystemExit("streamed output differs from a full parse")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=8, help="times the corpus is concatenated")
+    parser.add_argument("--skip-reparse", action="store_true", help="skip the quadratic baseline")
+    args = parser.parse_args()
+
+    text = load_corpus(args.repeat)
+    chunks = chunk(text)
+    check_equivalence(text, chunks)
+    print(f"corpus: {len(text)} chars, {len(chunks)} chunks")
+
+    strategies = [("plain", run_plain), ("stream", run_stream)]
+    if not args.skip_reparse:
+        strategies.append(("reparse", run_reparse))
+    tail = len(chunks) // 10
+    print(f"{'strategy':>8}  {'total ms':>9}  {'mean us':>8}  {'first 10% us':>12}  {'last 10% us':>11}")
+    for name, factory in strategies:
+        timings = measure(factory, chunks)
+        first = sum(timings[:tail]) / tail * 1e6
+        last = sum(timings[-tail:]) / tail * 1e6
+        print(f"{name:>8}  {sum(timings) * 1e3:>9.1f}  {sum(timings) / len(timings) * 1e6:>8.2f}  {first:>12.2f}  {last:>11.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-token cost of streaming a long reply into RichTextDisplay.
+
+Needs a display (use `xvfb-run` on headless machines). Run from the repo root:
+    python -m benchmarks.bench_render --tokens 4000
+
+`--legacy` re-measures the whole widget on every token, which is what
+append_text did before layout was made incremental, for comparison.
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List
+
+import customtkinter as ctk
+
+WORDS = ["the", "model", "streams", "tokens", "into", "a", "text", "widget", "while",
+         "layout", "stays", "incremental", "so", "each", "delta", "is", "cheap"]
+
+def synthetic_tokens(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    tokens = []
+    for i in range(count):
+        if i % 60 == 59:
+            tokens.append("\n\n")
+        else:
+            tokens.append(rng.choice(WORDS) + " ")
+    return tokens
+
+def run(tokens: List[str], frame_tokens: int, legacy: bool) -> List[float]:
+    from ollama_chat import RichTextDisplay, setup_theme
+
+    setup_theme()
+    root = ctk.CTk()
+    root.geometry("900x700")
+    display = RichTextDisplay(root)
+    display.pack(fill="x")
+    root.update()
+
+    timings = []
+    for i, token in enumerate(tokens):
+        start = time.perf_counter()
+        display.append_text(token)
+        if legacy:
+            display._invalidate_layout()
+            display.adjust_height()
+        elif i % frame_tokens == 0:
+            # One frame's worth of deferred layout, charged to this token
+            display.adjust_height()
+        root.update_idletasks()
+        timings.append(time.perf_counter() - start)
+    root.destroy()
+    return timings
+
+def report(timings: List[float], buckets: int):
+    size = max(1, len(timings) // buckets)
+    print(f"{'tokens':>14}  {'mean us':>9}  {'p95 us':>9}")
+    means = []
+    for b in range(buckets):
+        chunk = sorted(timings[b * size:(b + 1) * size])
+        if not chunk:
+            break
+        mean = statistics.fmean(chunk) * 1e6
+        p95 = chunk[int(len(chunk) * 0.95) - 1] * 1e6
+        means.append(mean)
+        print(f"{b * size:>6}-{(b + 1) * size:<7}  {mean:>9.1f}  {p95:>9.1f}")
+    print(f"last/first bucket ratio: {means[-1] / means[0]:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=4000)
+    parser.add_argument("--buckets", type=int, default=8)
+    parser.add_argument("--frame-tokens", type=int, default=4, help="tokens arriving per 16 ms frame")
+    parser.add_argument("--legacy", action="store_true", help="full re-measure on every token")
+    args = parser.parse_args()
+    report(run(synthetic_tokens(args.tokens), args.frame_tokens, args.legacy), args.buckets)
+
+if __name__ == "__main__":
+    main()
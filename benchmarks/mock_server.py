@@ -0,0 +1,317 @@
+"""
+Local stand-in for an Ollama server that replays token streams.
+
+Serves /api/chat, /api/pull, /api/tags, /api/ps, /api/embed and model (un)loading, with
+streams as NDJSON over chunked HTTP/1.1, so OllamaClient can be measured
+without a GPU or a real model. Streams are
+synthetic or replayed from a recording (an NDJSON capture of a real
+/api/chat response), at a configurable rate and write size.
+
+Point the app at it for manual testing:
+    python -m benchmarks.mock_server --port 11434 --rate 40
+"""
+import argparse
+import json
+import random
+import select
+import socket
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional
+
+WORDS = ["the", "model", "streams", "tokens", "while", "the", "client", "parses", "each", "line",
+         "and", "the", "widget", "renders", "them", "as", "fast", "as", "it", "can"]
+
+def synthetic_tokens(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [("\n\n" if i % 50 == 49 else " ") + rng.choice(WORDS) for i in range(count)]
+
+def load_recording(path: str) -> List[Dict[str, Any]]:
+    """Reads a captured /api/chat NDJSON stream (one JSON object per line)."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def hashed_embedding(text: str, dim: int = 64) -> List[float]:
+    """Bag-of-words vector (words hashed into `dim` buckets): texts sharing words score as similar."""
+    vector = [0.0] * dim
+    for word in text.lower().split():
+        vector[zlib.crc32(word.strip(".,;:!?\"'()").encode()) % dim] += 1.0
+    return vector
+
+class StreamSpec:
+    """
+    What the server sends. `rate` is tokens per second (0 = as fast as
+    possible, None = the recording's own pacing from created_at), and
+    `lines_per_write` how many NDJSON lines go into one socket write.
+    `shape` is "minimal" (message and done only) or "full" (every field a
+    real Ollama response carries, which makes lines about 3x longer).
+    """
+    def __init__(self, tokens: int = 1000, rate: Optional[float] = 0, lines_per_write: int = 1,
+                 shape: str = "full", recording: Optional[str] = None, stamp: bool = False,
+                 first_token_delay: float = 0.0, model: str = "mock:latest", seed: int = 0):
+        self.tokens = tokens
+        self.rate = rate
+        self.lines_per_write = max(1, lines_per_write)
+        self.shape = shape
+        self.recording = load_recording(recording) if recording else None
+        # Adds "bench_t" (server perf_counter at send) so in-process clients can measure per-token latency
+        self.stamp = stamp
+        self.first_token_delay = first_token_delay
+        self.model = model
+        self.seed = seed
+        self._lines: Optional[List[bytes]] = None
+
+    def chat_bodies(self) -> List[Dict[str, Any]]:
+        if self.recording:
+            return self.recording
+        bodies = []
+        for token in synthetic_tokens(self.tokens, self.seed):
+            body = {"message": {"role": "assistant", "content": token}, "done": False}
+            if self.shape == "full":
+                body = {"model": self.model, "created_at": "2024-01-01T00:00:00.000000Z", **body}
+            bodies.append(body)
+        final = {"message": {"role": "assistant", "content": ""}, "done": True}
+        if self.shape == "full":
+            final.update({"model": self.model, "created_at": "2024-01-01T00:00:00.000000Z", "done_reason": "stop"})
+        final.update({"total_duration": 1_000_000_000, "load_duration": 1_000_000, "prompt_eval_count": 26,
+                      "prompt_eval_duration": 10_000_000, "eval_count": len(bodies), "eval_duration": 900_000_000})
+        return bodies + [final]
+
+    def chat_lines(self) -> List[bytes]:
+        """Encoded chat_bodies(), built once so serving doesn't allocate on the measured path."""
+        if self._lines is None:
+            self._lines = [(json.dumps(b) + "\n").encode() for b in self.chat_bodies()]
+        return self._lines
+
+def _recorded_delays(bodies: List[Dict[str, Any]]) -> List[float]:
+    """Gaps between consecutive created_at timestamps of a recording, in seconds."""
+    from datetime import datetime
+    stamps = []
+    for body in bodies:
+        try:
+            stamps.append(datetime.fromisoformat(body["created_at"][:26].rstrip("Z")).timestamp())
+        except (KeyError, ValueError):
+            stamps.append(None)
+    delays = [0.0]
+    for prev, cur in zip(stamps, stamps[1:]):
+        delays.append(max(0.0, cur - prev) if prev is not None and cur is not None else 0.0)
+    return delays
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOllama/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass  # the client dropped an idle keep-alive connection
+
+    def _json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, lines: List[bytes], delays: List[float], head_delay: float = 0.0):
+        spec = self.server.spec
+        batch = []
+        try:
+            # Ollama sends its headers with the first token, so the wait before it
+            # (model load, prompt evaluation) is spent inside the client's request
+            if head_delay:
+                self._pause(head_delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            next_send = time.perf_counter()
+            for line, delay in zip(lines, delays):
+                next_send += delay
+                if delay:
+                    pause = next_send - time.perf_counter()
+                    if pause > 0:
+                        self._pause(pause)
+                if spec.stamp:
+                    line = line[:-2] + b', "bench_t": %r}\n' % time.perf_counter()
+                batch.append(line)
+                if len(batch) >= spec.lines_per_write:
+                    self._write_chunk(b"".join(batch))
+                    batch = []
+            if batch:
+                self._write_chunk(b"".join(batch))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client hung up (e.g. Stop); count it so cancellation can be measured
+            self.close_connection = True
+            with self.server.lock:
+                self.server.aborted += 1
+                self.server.aborted_at = time.perf_counter()
+
+    def _pause(self, seconds: float):
+        """
+        Sleeps between tokens, but like Ollama notices a client that hangs up
+        meanwhile (raising BrokenPipeError), so a cancel during a long pause,
+        e.g. first_token_delay standing in for prompt evaluation, is seen at once.
+        """
+        readable, _, _ = select.select([self.connection], [], [], seconds)
+        if not readable:
+            return
+        try:
+            gone = self.connection.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            gone = True
+        if gone:
+            raise BrokenPipeError("client closed the connection")
+        time.sleep(seconds)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            models = [{"name": f"mock-{i}:latest", "model": f"mock-{i}:latest", "size": 4_700_000_000 + i,
+                       "digest": f"{i:064x}", "modified_at": "2024-01-01T00:00:00Z",
+                       "details": {"family": "llama", "parameter_size": "8B", "quantization_level": "Q4_0"}}
+                      for i in range(self.server.model_count)]
+            self._json(200, {"models": models})
+        elif self.path == "/api/ps":
+            with self.server.lock:
+                loaded = [{"name": name, "model": name, "size": 5_000_000_000, "size_vram": 5_000_000_000,
+                           "expires_at": "2099-01-01T00:00:00.000000000Z" if keep == -1 else expires,
+                           "details": {"family": "llama", "parameter_size": "8B", "quantization_level": "Q4_0"}}
+                          for name, (keep, expires) in self.server.loaded.items()]
+            self._json(200, {"models": loaded})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests.append((self.path, request))
+        spec = self.server.spec
+
+        if self.path == "/api/chat":
+            if not request.get("stream", True):
+                bodies = spec.chat_bodies()
+                content = "".join(b.get("message", {}).get("content", "") for b in bodies)
+                self._json(200, {**bodies[-1], "message": {"role": "assistant", "content": content}})
+                return
+            lines = spec.chat_lines()
+            if spec.rate is None and spec.recording:
+                delays = _recorded_delays(spec.recording)
+            else:
+                delays = [1.0 / spec.rate if spec.rate else 0.0] * len(lines)
+            self._stream(lines, delays, head_delay=spec.first_token_delay)
+        elif self.path == "/api/generate" and not request.get("prompt"):
+            # Load / unload request: no prompt, just keep_alive
+            model = request.get("model", spec.model)
+            keep = request.get("keep_alive", "5m")
+            with self.server.lock:
+                newly_loaded = model not in self.server.loaded
+                if keep == 0:
+                    self.server.loaded.pop(model, None)
+                else:
+                    expires = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 300))
+                    self.server.loaded[model] = (keep, expires)
+            self._json(200, {"model": model, "response": "", "done": True, "done_reason": "unload" if keep == 0 else "load",
+                             "load_duration": 2_000_000_000 if newly_loaded and keep != 0 else 1_000_000})
+        elif self.path == "/api/embed":
+            texts = request.get("input", [])
+            self._json(200, {"model": request.get("model", spec.model),
+                             "embeddings": [hashed_embedding(t) for t in ([texts] if isinstance(texts, str) else texts)]})
+        elif self.path == "/api/pull":
+            lines, delays = [], []
+            for layer in range(3):
+                total = 50_000_000 * (layer + 1)
+                for step in range(0, 101, 2):
+                    lines.append((json.dumps({"status": f"pulling {layer:012x}", "digest": f"sha256:{layer:064x}",
+                                              "total": total, "completed": total * step // 100}) + "\n").encode())
+                    delays.append(1.0 / spec.rate if spec.rate else 0.0)
+            lines.append(b'{"status": "success"}\n')
+            delays.append(0.0)
+            self._stream(lines, delays)
+        else:
+            self._json(404, {"error": "not found"})
+
+class MockOllamaServer:
+    """Runs the mock on a background thread; use as a context manager."""
+    def __init__(self, spec: Optional[StreamSpec] = None, host: str = "127.0.0.1", port: int = 0, model_count: int = 5):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.spec = spec or StreamSpec()
+        self.httpd.model_count = model_count
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = []
+        self.httpd.aborted = 0
+        self.httpd.aborted_at = None
+        self.httpd.loaded = {}     # model -> (keep_alive, expires_at) for /api/ps
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def spec(self) -> StreamSpec:
+        return self.httpd.spec
+
+    @spec.setter
+    def spec(self, spec: StreamSpec):
+        self.httpd.spec = spec
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def aborted(self) -> int:
+        return self.httpd.aborted
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=40, help="tokens/s (0 = unthrottled)")
+    parser.add_argument("--lines-per-write", type=int, default=1)
+    parser.add_argument("--shape", choices=["minimal", "full"], default="full")
+    parser.add_argument("--recording", help="NDJSON capture of a real /api/chat stream to replay")
+    parser.add_argument("--original-pace", action="store_true", help="replay a recording at its created_at pacing")
+    args = parser.parse_args()
+    spec = StreamSpec(tokens=args.tokens, rate=None if args.original_pace else args.rate,
+                      lines_per_write=args.lines_per_write, shape=args.shape, recording=args.recording)
+    server = MockOllamaServer(spec, host=args.host, port=args.port)
+    print(f"Mock Ollama listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
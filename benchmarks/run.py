@@ -0,0 +1,241 @@
+"""
+Headless benchmark suite. Drives OllamaClient against the local mock
+server and, when a display is available (e.g. under xvfb-run), the
+RichTextDisplay rendering path. Run from the repo root:
+
+    python -m benchmarks.run                         # run everything, print a report
+    python -m benchmarks.run --only client_throughput markdown
+    python -m benchmarks.run --save-baseline main    # write benchmarks/baselines/main.json
+    python -m benchmarks.run --compare main          # show change against that baseline
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Callable
+
+from benchmarks.mock_server import MockOllamaServer, StreamSpec
+from ndjson_stream import JSON_BACKEND, NDJSONDecoder, READ_SIZE, _json_loads, iter_ndjson
+from ollama_client import OllamaClient, StopSignal
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+MESSAGES = [{"role": "user", "content": "benchmark"}]
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+def _consume_chat(url: str, batch: bool = False) -> Dict[str, float]:
+    client = OllamaClient(url)
+    tokens = events = 0
+    start = time.perf_counter()
+    for event in client.chat_stream("mock", MESSAGES, batch=batch):
+        if event["type"] == "content":
+            tokens += event.get("tokens", 1)
+            events += 1
+        elif event["type"] == "error":
+            raise RuntimeError(event["content"])
+    elapsed = time.perf_counter() - start
+    client.close()
+    return {"tokens": tokens, "events": events, "elapsed": elapsed}
+
+def bench_client_throughput(args) -> Dict[str, float]:
+    """Unthrottled stream of full-shape lines: how fast chat_stream can parse."""
+    spec = StreamSpec(tokens=args.tokens, rate=0, shape="full", lines_per_write=args.lines_per_write)
+    with MockOllamaServer(spec) as server:
+        runs = [_consume_chat(server.url) for _ in range(args.repeat)]
+    best = min(runs, key=lambda r: r["elapsed"])
+    payload_mb = sum(len(line) for line in spec.chat_lines()) / 1e6
+    return {"tokens_per_s": best["tokens"] / best["elapsed"], "mb_per_s": payload_mb / best["elapsed"]}
+
+def bench_client_batched(args) -> Dict[str, float]:
+    """chat_stream(batch=True) against a server that writes several lines per chunk."""
+    spec = StreamSpec(tokens=args.tokens, rate=0, shape="full", lines_per_write=args.batch_lines)
+    with MockOllamaServer(spec) as server:
+        runs = [_consume_chat(server.url, batch=True) for _ in range(args.repeat)]
+    best = min(runs, key=lambda r: r["elapsed"])
+    return {"tokens_per_s": best["tokens"] / best["elapsed"], "events_per_token": best["events"] / best["tokens"]}
+
+def bench_client_latency(args) -> Dict[str, float]:
+    """Per-token delay from the server's write to chat_stream yielding it, at a realistic rate."""
+    spec = StreamSpec(tokens=min(args.tokens, 1000), rate=args.rate, stamp=True)
+    latencies = []
+    with MockOllamaServer(spec) as server:
+        client = OllamaClient(server.url)
+        # chat_stream drops unknown fields, so read the stamped lines through the same decoder it uses
+        with client.session.post(f"{server.url}/api/chat", json={"model": "mock", "messages": MESSAGES},
+                                 stream=True, timeout=client.timeout) as response:
+            for bodies in iter_ndjson(response.iter_content(READ_SIZE), client.decoder_factory()):
+                now = time.perf_counter()
+                latencies.extend((now - body["bench_t"]) * 1000 for body in bodies)
+        client.close()
+    return {"latency_ms_p50": percentile(latencies, 0.5), "latency_ms_p95": percentile(latencies, 0.95),
+            "latency_ms_p99": percentile(latencies, 0.99)}
+
+def bench_client_memory(args) -> Dict[str, float]:
+    """Peak Python heap while streaming a long reply."""
+    spec = StreamSpec(tokens=args.tokens, rate=0)
+    spec.chat_lines()   # the server shares this process; keep its payload out of the measurement
+    with MockOllamaServer(spec) as server:
+        tracemalloc.start()
+        _consume_chat(server.url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"peak_kb": peak / 1024}
+
+def bench_pull_parse(args) -> Dict[str, float]:
+    with MockOllamaServer(StreamSpec(rate=0)) as server:
+        client = OllamaClient(server.url)
+        start = time.perf_counter()
+        lines = sum(1 for _ in client.pull_model("mock"))
+        elapsed = time.perf_counter() - start
+        client.close()
+    return {"lines_per_s": lines / elapsed}
+
+def bench_ndjson_decode(args) -> Dict[str, float]:
+    """NDJSONDecoder alone on pre-encoded lines, one line per block, against the old splitlines/decode/json.loads path."""
+    lines = StreamSpec(tokens=args.tokens, shape="full").chat_lines()
+    def legacy():
+        for block in lines:
+            for line in block.splitlines():
+                json.loads(line.decode('utf-8'))
+    def decoder(loads=None):
+        feed = NDJSONDecoder(loads).feed
+        for block in lines:
+            feed(block)
+    results = {}
+    for name, fn in (("legacy", legacy), (JSON_BACKEND, decoder), ("json", lambda: decoder(_json_loads))):
+        best = min(_timed(fn) for _ in range(args.repeat))
+        results[f"{name}_lines_per_s"] = len(lines) / best
+    return results
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def _stop_to_abort(url: str, server, stop_after: float, stop_event) -> float:
+    """Milliseconds from Stop to the mock server seeing the client hang up, i.e. to generation stopping."""
+    client = OllamaClient(url)
+    before = server.aborted
+    timer = threading.Timer(stop_after, stop_event.set)
+    timer.start()
+    for _ in client.chat_stream("mock", MESSAGES, stop_event=stop_event, batch=True):
+        pass
+    deadline = time.perf_counter() + 10
+    while server.aborted == before and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    client.close()
+    return (server.httpd.aborted_at - stop_event.set_at) * 1000 if server.aborted > before else float("inf")
+
+def bench_cancel(args) -> Dict[str, float]:
+    """
+    Stop to server-side abort, mid-stream and during a 3 s prompt evaluation
+    (before the first token), with a StopSignal and, for comparison, with the
+    plain Event that only stops the stream at its next read.
+    """
+    class TimedEvent(threading.Event):
+        def set(self):
+            self.set_at = time.perf_counter()
+            super().set()
+    results = {}
+    cases = (("streaming", StreamSpec(tokens=2000, rate=50), 0.5),
+             ("prompt_eval", StreamSpec(tokens=200, rate=50, first_token_delay=3.0), 0.5))
+    for name, spec, stop_after in cases:
+        with MockOllamaServer(spec) as server:
+            runs = [_stop_to_abort(server.url, server, stop_after, StopSignal()) for _ in range(args.repeat)]
+            results[f"{name}_stop_ms"] = max(runs)
+            results[f"{name}_plain_event_stop_ms"] = _stop_to_abort(server.url, server, stop_after, TimedEvent())
+    return results
+
+def bench_markdown(args) -> Dict[str, float]:
+    from benchmarks.bench_markdown import load_corpus, chunk, measure, run_stream
+    chunks = chunk(load_corpus(4))
+    timings = measure(run_stream, chunks)
+    return {"us_per_chunk": statistics.fmean(timings) * 1e6, "us_per_chunk_p99": percentile(timings, 0.99) * 1e6}
+
+def bench_render(args) -> Dict[str, float]:
+    """Tokens from the mock server rendered into RichTextDisplay (skipped without a display)."""
+    import tkinter
+    try:
+        tkinter.Tk().destroy()
+    except tkinter.TclError:
+        return {}
+    from benchmarks.bench_render import run
+    spec = StreamSpec(tokens=args.tokens, rate=0)
+    with MockOllamaServer(spec) as server:
+        client = OllamaClient(server.url)
+        tokens = [e["content"] for e in client.chat_stream("mock", MESSAGES) if e["type"] == "content"]
+        client.close()
+    timings = run(tokens, frame_tokens=4, legacy=False)
+    tenth = max(1, len(timings) // 10)
+    return {"tokens_per_s": len(timings) / sum(timings),
+            "us_per_token_p50": percentile(timings, 0.5) * 1e6,
+            "us_per_token_p99": percentile(timings, 0.99) * 1e6,
+            "last_first_decile_ratio": sum(timings[-tenth:]) / sum(timings[:tenth])}
+
+BENCHMARKS: Dict[str, Callable] = {
+    "client_throughput": bench_client_throughput,
+    "client_batched": bench_client_batched,
+    "client_latency": bench_client_latency,
+    "client_memory": bench_client_memory,
+    "pull_parse": bench_pull_parse,
+    "cancel": bench_cancel,
+    "ndjson_decode": bench_ndjson_decode,
+    "markdown": bench_markdown,
+    "render": bench_render,
+}
+
+def print_report(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]] = None):
+    for name, metrics in results.items():
+        if not metrics:
+            print(f"{name}: skipped (no display)")
+            continue
+        print(name)
+        for metric, value in metrics.items():
+            line = f"  {metric:<26} {value:>14.2f}"
+            old = (baseline or {}).get(name, {}).get(metric)
+            if old:
+                line += f"   baseline {old:>12.2f}  ({(value - old) / old * 100:+.1f}%)"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=200, help="tokens/s for the latency benchmark")
+    parser.add_argument("--lines-per-write", type=int, default=1, help="NDJSON lines per server write")
+    parser.add_argument("--batch-lines", type=int, default=8, help="NDJSON lines per server write for client_batched")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    args = parser.parse_args()
+
+    results = {name: BENCHMARKS[name](args) for name in (args.only or BENCHMARKS)}
+    results["process"] = {"max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+    baseline = None
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        # Skipped benchmarks are listed, not saved as empty sections a later run would compare against
+        with open(path, 'w') as f:
+            json.dump({"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                                "date": time.strftime("%Y-%m-%d"), "tokens": args.tokens,
+                                "json_backend": JSON_BACKEND,
+                                "skipped": [name for name, metrics in results.items() if not metrics]},
+                       "results": {name: metrics for name, metrics in results.items() if metrics}}, f, indent=4)
+        print(f"Saved baseline to {path}")
+
+if __name__ == "__main__":
+    main()
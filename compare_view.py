@@ -0,0 +1,201 @@
+import customtkinter as ctk
+import asyncio
+import threading
+import time
+from typing import List, Dict, Any, Callable
+from async_client import AsyncOllamaClient
+
+def merge_events(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    return {"events": old["events"] + new["events"]}
+
+class CompareWindow(ctk.CTkToplevel):
+    """
+    Sends one prompt to several models at once and streams the answers into
+    side-by-side columns. Every stream runs on a single asyncio loop in one
+    background thread, and events reach the Tk side through the app's
+    UIDispatcher, batched so each wake-up handles all events that arrived.
+    """
+    def __init__(self, parent, base_url: str, models: List[str], dispatcher, display_factory: Callable[..., Any],
+                 system_prompt: str = "", max_streams: int = 4, connect_timeout: float = 5.0, read_timeout: float = 300.0):
+        super().__init__(parent)
+        self.title("Compare Models")
+        self.geometry("1200x700")
+        self.display_factory = display_factory
+        self.system_prompt = system_prompt
+        self.dispatcher = dispatcher
+        self.closed = False
+        self.columns: List[Dict[str, Any]] = []
+        self.futures = []
+        self.tasks = set()     # the _stream tasks still running on the loop
+        self.running = 0
+
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self._run_loop, daemon=True).start()
+        self.client = AsyncOllamaClient(base_url, max_streams=max_streams,
+                                        connect_timeout=connect_timeout, read_timeout=read_timeout)
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        # Controls
+        self.controls = ctk.CTkFrame(self)
+        self.controls.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="ew")
+        self.controls.grid_columnconfigure(0, weight=1)
+
+        self.prompt_text = ctk.CTkTextbox(self.controls, height=60, wrap="word", font=("Roboto", 14))
+        self.prompt_text.grid(row=0, column=0, rowspan=2, padx=10, pady=10, sticky="ew")
+
+        self.model_list = ctk.CTkScrollableFrame(self.controls, width=220, height=60, label_text="Models")
+        self.model_list.grid(row=0, column=1, rowspan=2, padx=(0, 10), pady=10)
+        self.model_vars = {}
+        for model in models:
+            var = ctk.BooleanVar(value=False)
+            ctk.CTkCheckBox(self.model_list, text=model, variable=var).pack(anchor="w", pady=2)
+            self.model_vars[model] = var
+
+        self.run_btn = ctk.CTkButton(self.controls, text="Run", command=self.handle_run_click)
+        self.run_btn.grid(row=0, column=2, padx=(0, 10), pady=(10, 5))
+
+        self.columns_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.columns_frame.grid(row=1, column=0, padx=10, pady=(5, 10), sticky="nsew")
+        self.columns_frame.grid_rowconfigure(0, weight=1)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.lift()
+        self.focus_force()
+
+    def handle_run_click(self):
+        if self.running:
+            self.stop()
+        else:
+            self.run()
+
+    def run(self):
+        prompt = self.prompt_text.get("0.0", "end").strip()
+        models = [model for model, var in self.model_vars.items() if var.get()]
+        if not prompt or not models:
+            return
+
+        for column in self.columns:
+            column["frame"].destroy()
+        self.columns = []
+        self.futures = []
+        messages = [{"role": "user", "content": prompt}]
+
+        for index, model in enumerate(models):
+            self.columns_frame.grid_columnconfigure(index, weight=1, uniform="column")
+            frame = ctk.CTkFrame(self.columns_frame)
+            frame.grid(row=0, column=index, padx=5, sticky="nsew")
+            frame.grid_rowconfigure(2, weight=1)
+            frame.grid_columnconfigure(0, weight=1)
+            ctk.CTkLabel(frame, text=model, font=ctk.CTkFont(size=15, weight="bold")).grid(row=0, column=0, padx=10, pady=(10, 0), sticky="w")
+            stats_label = ctk.CTkLabel(frame, text="waiting...", anchor="w")
+            stats_label.grid(row=1, column=0, padx=10, sticky="w")
+            scroll = ctk.CTkScrollableFrame(frame)
+            scroll.grid(row=2, column=0, padx=5, pady=5, sticky="nsew")
+            display = self.display_factory(scroll, text="")
+            display.pack(fill="x", expand=True)
+            self.columns.append({"frame": frame, "scroll": scroll, "display": display, "stats_label": stats_label,
+                                 "start": time.perf_counter(), "first_token": None, "chunks": 0, "thinking": 0, "stats": None})
+            self.futures.append(asyncio.run_coroutine_threadsafe(self._stream(index, model, messages), self.loop))
+
+        self.running = len(models)
+        self.run_btn.configure(text="Stop", fg_color="#C62828", hover_color="#B71C1C")
+
+    def _run_loop(self):
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _stream(self, index: int, model: str, messages: List[Dict[str, str]]):
+        task = asyncio.current_task()
+        self.tasks.add(task)
+        try:
+            async for event in self.client.chat(model, messages, self.system_prompt):
+                self.post(index, event)
+        except Exception as e:
+            # Shown in the column rather than lost with the task; cancellation still passes through
+            self.post(index, {"type": "error", "content": str(e) or type(e).__name__})
+        finally:
+            self.tasks.discard(task)
+            self.post(index, {"type": "done"})
+
+    def post(self, index: int, event: Dict[str, Any]):
+        self.dispatcher.post(self.handle_events, {"events": [(index, event, time.perf_counter())]}, merge=merge_events)
+
+    def stop(self):
+        # Cancelling the task closes its connection, so Ollama stops generating too
+        for future in self.futures:
+            future.cancel()
+
+    def handle_events(self, msg: Dict[str, Any]):
+        if self.closed or not self.winfo_exists():
+            return
+        touched = set()
+        for index, event, stamp in msg["events"]:
+            column = self.columns[index]
+            if event["type"] == "content":
+                if column["first_token"] is None:
+                    column["first_token"] = stamp
+                column["chunks"] += 1
+                column["display"].append_text(event["content"])
+                touched.add(index)
+            elif event["type"] == "thinking":
+                # Reasoning isn't shown in the column, only counted; its tokens are generated output too
+                if column["first_token"] is None:
+                    column["first_token"] = stamp
+                column["chunks"] += 1
+                column["thinking"] += 1
+                touched.add(index)
+            elif event["type"] == "stats":
+                column["stats"] = event["stats"]
+            elif event["type"] == "error":
+                column["display"].append_text(f"\n[Error] {event['content']}")
+            elif event["type"] == "done":
+                column["display"].finish()
+                column["end"] = stamp
+                self.running -= 1
+                if not self.running:
+                    self.run_btn.configure(text="Run", fg_color=["#3B8ED0", "#1F6AA5"], hover_color=["#36719F", "#144870"])
+                touched.add(index)
+
+        # Stats and scroll position are refreshed once per batch, not per chunk
+        for index in touched:
+            column = self.columns[index]
+            column["stats_label"].configure(text=self._format_stats(column))
+            column["scroll"]._parent_canvas.yview_moveto(1.0)
+
+    def _format_stats(self, column: Dict[str, Any]) -> str:
+        if column["first_token"] is None:
+            return "no output"
+        ttft = column["first_token"] - column["start"]
+        stats = column["stats"]
+        if stats and stats.get("eval_duration"):
+            rate = stats.get("eval_count", 0) / (stats["eval_duration"] / 1e9)
+        else:
+            elapsed = column.get("end", time.perf_counter()) - column["first_token"]
+            rate = column["chunks"] / elapsed if elapsed > 0 else 0.0
+        text = f"TTFT {ttft:.2f}s · {rate:.1f} tok/s"
+        if column["thinking"]:
+            text += f" · {column['thinking']} thinking"
+        if "end" in column:
+            text += f" · total {column['end'] - column['start']:.2f}s"
+        return text
+
+    def on_close(self):
+        self.closed = True
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        self.destroy()
+
+    async def _shutdown(self):
+        """
+        Cancels the streams and waits for them to unwind, so each one's
+        connection is closed (and Ollama stops) before the loop stops.
+        """
+        try:
+            tasks = list(self.tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.client.aclose()
+        finally:
+            self.loop.stop()
@@ -6,8 +6,78 @@ CONFIG_FILE = "config.json"
 
 DEFAULT_CONFIG = {
     "ollama_url": "http://localhost:11434",
+    # Further Ollama hosts. Each request goes to the least-busy host that has the model
+    # loaded (else on disk); every host is probed (/api/tags, /api/ps) this often, in seconds
+    "ollama_servers": [],
+    "server_probe_interval": 10.0,
     "system_prompt": "",
-    "last_model": ""
+    "last_model": "",
+    # Reopen the session that was open at exit (its newest page) at startup
+    "restore_last_session": True,
+    "last_session": None,
+    # HTTP transport: pooled keep-alive connections shared by every request
+    "http_pool_size": 10,
+    "connect_timeout": 5.0,
+    "read_timeout": 300.0,
+    "max_retries": 3,
+    # Upper bound on concurrent streams in the Compare Models window
+    "compare_max_streams": 4,
+    # Context assembly: per-model context windows in tokens (falling back to
+    # default_context_tokens), room reserved for the reply, and the policy
+    # used when history doesn't fit: sliding_window, pin or summarize.
+    # A model listed in context_tokens also gets it sent as num_ctx
+    "context_tokens": {},
+    "default_context_tokens": 4096,
+    "context_reserve_tokens": 1024,
+    "context_policy": "sliding_window",
+    "context_pinned_messages": 2,
+    # Append one JSON record of timings per generation to this file ("" = off)
+    "metrics_file": "",
+    # SQLite database holding every conversation; opened sessions load this many messages per page
+    "sessions_db": "sessions.db",
+    "session_page_size": 50,
+    # Model residency: load the model as soon as it is picked, and how long Ollama keeps
+    # each one in memory after a request ("30m", "2h", -1 = forever, 0 = unload at once;
+    # per model in keep_alive, else default_keep_alive, "" = the server's default)
+    "preload_on_select": True,
+    "keep_alive": {},
+    "default_keep_alive": "",
+    # Extra Ollama options sent with every chat, e.g. {"temperature": 0, "seed": 42};
+    # per model in model_options, merged over default_model_options
+    "model_options": {},
+    "default_model_options": {},
+    # Leave a reply's reasoning (<think> blocks, message.thinking) out of the history sent back
+    # as context; per model in strip_reasoning, else default_strip_reasoning. It is still saved and shown
+    "strip_reasoning": {},
+    "default_strip_reasoning": False,
+    # Opt-in cache of finished replies for deterministic requests (temperature 0 or a fixed
+    # seed), replayed instead of regenerated; paced replays keep the original timing
+    "response_cache": False,
+    "response_cache_file": "response_cache.db",
+    "response_cache_mb": 200,
+    "response_cache_paced": False,
+    # Retrieval (needs numpy): passages from the files under retrieval_paths and, with
+    # retrieval_chats, from saved conversations are embedded with embedding_model; the
+    # retrieval_top_k closest to each prompt (cosine >= retrieval_min_score) go into the system prompt
+    "retrieval": False,
+    "embedding_model": "nomic-embed-text",
+    "retrieval_paths": [],
+    "retrieval_chats": True,
+    "retrieval_index_dir": "retrieval_index",
+    "retrieval_top_k": 4,
+    "retrieval_min_score": 0.5,
+    # /api/tags listings per server, shown at startup until the server answers
+    "model_cache_file": "models_cache.json",
+    # Seconds between /api/ps polls in the Loaded Models window
+    "ps_poll_interval": 2.0,
+    # Model pulls run in the background, this many at once; unfinished ones are kept in
+    # downloads_file and resumed at the next start. The Downloads window redraws every
+    # download_refresh_ms, however fast progress arrives.
+    "max_concurrent_pulls": 2,
+    "downloads_file": "downloads.json",
+    "download_refresh_ms": 250,
+    # Longest the UI thread spends handling queued worker messages before letting Tk redraw
+    "ui_frame_budget_ms": 8.0
 }
 
 class ConfigManager:
@@ -0,0 +1,191 @@
+import math
+import threading
+from typing import List, Dict, Any, Callable, Hashable, Optional, Tuple
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for your own future reference. Keep names, "
+    "numbers, decisions, code identifiers and open questions; drop pleasantries. "
+    "Answer with the summary only."
+)
+
+class TokenEstimator:
+    """
+    Cheap per-model token estimate (characters / chars-per-token). The ratio
+    starts at a generic default and is calibrated from the prompt_eval_count
+    Ollama reports for prompts we assembled ourselves.
+    """
+    DEFAULT_CHARS_PER_TOKEN = 4.0
+    MESSAGE_OVERHEAD = 4   # role markers and template tokens per message
+    SMOOTHING = 0.3
+
+    def __init__(self, ratios: Optional[Dict[str, float]] = None):
+        self.ratios: Dict[str, float] = dict(ratios or {})
+        self._lock = threading.Lock()
+
+    def ratio(self, model: str) -> float:
+        return self.ratios.get(model, self.DEFAULT_CHARS_PER_TOKEN)
+
+    def count(self, model: str, text: str) -> int:
+        return math.ceil(len(text) / self.ratio(model))
+
+    def count_message(self, model: str, message: Dict[str, Any]) -> int:
+        return self.count(model, message.get("content", "")) + self.MESSAGE_OVERHEAD
+
+    def observe(self, model: str, messages: List[Dict[str, Any]], prompt_eval_count: Optional[int]):
+        """Folds one (prompt, prompt_eval_count) sample into the model's ratio."""
+        if not prompt_eval_count:
+            return
+        chars = sum(len(m.get("content", "")) for m in messages)
+        tokens = prompt_eval_count - self.MESSAGE_OVERHEAD * len(messages)
+        if chars < 200 or tokens <= 0:
+            return
+        sample = chars / tokens
+        # Ollama only counts tokens it had to evaluate, so a prompt that mostly
+        # hit the KV cache reports far fewer; such samples are discarded.
+        if not 1.0 <= sample <= 8.0:
+            return
+        with self._lock:
+            current = self.ratio(model)
+            self.ratios[model] = current + self.SMOOTHING * (sample - current)
+
+class ContextBuilder:
+    """
+    Assembles the message list sent to /api/chat from the stored chat history
+    so that it fits a per-model token budget. The stored history is never
+    copied or mutated: the result is a new list of references to the same
+    message dicts, plus at most a system prompt and a summary message.
+
+    Policies:
+      sliding_window  the most recent messages that fit
+      pin             the first `pinned_messages` messages (and any with
+                      "pinned": True) always, then the most recent that fit
+      summarize       the most recent that fit, with everything older folded
+                      into a rolling summary written by the model
+
+    The summary is kept between calls for the conversation named by build()'s
+    `key`; the caller must use a new key whenever the history list is
+    replaced rather than appended to. Without a key nothing is reused.
+    """
+    POLICIES = ("sliding_window", "pin", "summarize")
+
+    def __init__(self, estimator: TokenEstimator, budgets: Optional[Dict[str, int]] = None,
+                 default_budget: int = 4096, reserve: int = 1024, policy: str = "sliding_window",
+                 pinned_messages: int = 2, complete: Optional[Callable[[str, List[Dict[str, str]]], str]] = None):
+        self.estimator = estimator
+        self.budgets = budgets or {}
+        self.default_budget = default_budget
+        self.reserve = reserve
+        self.policy = policy if policy in self.POLICIES else "sliding_window"
+        self.pinned_messages = pinned_messages
+        # complete(model, messages) -> reply text; used to write summaries
+        self.complete = complete
+        # (conversation key, number of messages summarized, summary text)
+        self._summary: Tuple[Optional[Hashable], int, str] = (None, 0, "")
+
+    def context_window(self, model: str) -> int:
+        return self.budgets.get(model, self.default_budget)
+
+    def prompt_budget(self, model: str) -> int:
+        """Tokens available for the prompt once room for the reply is reserved."""
+        window = self.context_window(model)
+        return max(window // 4, window - self.reserve)
+
+    def build(self, model: str, history: List[Dict[str, Any]], system_prompt: str = "",
+              key: Optional[Hashable] = None) -> List[Dict[str, Any]]:
+        budget = self.prompt_budget(model)
+        head: List[Dict[str, Any]] = []
+        if system_prompt:
+            head.append({"role": "system", "content": system_prompt})
+            budget -= self.estimator.count_message(model, head[0])
+
+        if self.policy == "pin":
+            pinned = [i for i, m in enumerate(history) if i < self.pinned_messages or m.get("pinned")]
+            pinned_cost = self._cost(model, [history[i] for i in pinned])
+            start = self._window_start(model, history, budget - pinned_cost, skip=set(pinned))
+            keep = sorted(set(i for i in pinned if i < start) | set(range(start, len(history))))
+            return head + [history[i] for i in keep]
+
+        if self.policy == "summarize":
+            start = self._window_start(model, history, budget)
+            if start > 0:
+                # A quarter of the budget goes to the summary. Reuse the current
+                # summary while the messages after it still fit; otherwise cut
+                # deeper than strictly needed so the next few turns don't each
+                # trigger another summarization call.
+                summary_key, done, _ = self._summary
+                if key is not None and summary_key == key and 0 < done <= len(history) and \
+                        self._cost(model, history[done:]) <= budget * 3 // 4:
+                    start = done
+                else:
+                    start = self._window_start(model, history, budget // 2)
+                summary = self._summarize(model, history, start, budget // 4, budget // 2, key)
+                if summary:
+                    head.append({"role": "system", "content": "Summary of the earlier conversation:\n" + summary})
+            return head + history[start:]
+
+        return head + history[self._window_start(model, history, budget):]
+
+    def _cost(self, model: str, messages: List[Dict[str, Any]]) -> int:
+        return sum(self.estimator.count_message(model, m) for m in messages)
+
+    def _window_start(self, model: str, history: List[Dict[str, Any]], budget: int, skip=frozenset()) -> int:
+        """Index of the oldest message in the longest suffix of history that fits the budget (the last message always fits)."""
+        start = len(history)
+        used = 0
+        for i in range(len(history) - 1, -1, -1):
+            if i in skip:
+                continue
+            used += self.estimator.count_message(model, history[i])
+            if used > budget and start < len(history):
+                break
+            start = i
+        # Pinned messages inside the window are simply part of it
+        while start > 0 and (start - 1) in skip:
+            start -= 1
+        return start
+
+    def _summarize(self, model: str, history: List[Dict[str, Any]], upto: int, max_tokens: int,
+                   slice_tokens: int, key: Optional[Hashable]) -> str:
+        """
+        Rolling summary of history[:upto]. Only messages not yet summarized
+        are sent to the model, at most `slice_tokens` of them per call, so a
+        long restored session is folded in over several calls.
+        """
+        summary_key, done, text = self._summary
+        if key is None or summary_key != key or done > upto:
+            done, text = 0, ""
+        while done < upto:
+            end = self._slice_end(model, history, done, upto, slice_tokens)
+            text = self._write_summary(model, text, history[done:end], max_tokens, slice_tokens)
+            done = end
+            self._summary = (key, done, text)
+        return text
+
+    def _slice_end(self, model: str, history: List[Dict[str, Any]], start: int, upto: int, budget: int) -> int:
+        """End of the longest run of history[start:upto] that fits the budget (at least one message)."""
+        used = 0
+        for i in range(start, upto):
+            used += self.estimator.count_message(model, history[i])
+            if used > budget and i > start:
+                return i
+        return upto
+
+    def _write_summary(self, model: str, previous: str, messages: List[Dict[str, Any]], max_tokens: int,
+                       max_input_tokens: int) -> str:
+        # A single message longer than the slice is cut, so the call still fits the context window
+        max_input_chars = int(max_input_tokens * self.estimator.ratio(model))
+        transcript = "\n\n".join(f"{m['role']}: {m.get('content', '')[:max_input_chars]}" for m in messages)
+        if previous:
+            transcript = f"Summary so far:\n{previous}\n\nNew messages:\n{transcript}"
+        summary = ""
+        if self.complete:
+            summary = self.complete(model, [{"role": "system", "content": SUMMARY_PROMPT},
+                                            {"role": "user", "content": transcript}]).strip()
+        if not summary:
+            # Extractive fallback: the opening line of every dropped message
+            lines = [previous] if previous else []
+            lines += [f"{m['role']}: {m.get('content', '').strip().splitlines()[0][:200]}"
+                      for m in messages if m.get("content", "").strip()]
+            summary = "\n".join(lines)
+        max_chars = int(max_tokens * self.estimator.ratio(model))
+        return summary if len(summary) <= max_chars else summary[-max_chars:]
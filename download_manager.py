@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Callable, Optional
+
+class PullJob:
+    """One model pull: status plus per-layer byte counts, keyed by layer digest."""
+    # queued -> pulling -> done | failed | cancelled
+    ACTIVE = ("queued", "pulling")
+    RATE_WINDOW = 10.0   # seconds of samples behind the throughput estimate
+
+    def __init__(self, name: str):
+        self.name = name
+        self.status = "queued"
+        self.message = "Waiting"
+        self.error = ""
+        self.layers: Dict[str, List[int]] = {}    # digest -> [completed, total]
+        self.samples = deque()                     # (perf_counter, completed bytes)
+        self.cancel_requested = False
+        self.finished_at: Optional[float] = None
+
+    def completed(self) -> int:
+        return sum(done for done, _ in self.layers.values())
+
+    def total(self) -> int:
+        return sum(total for _, total in self.layers.values())
+
+    def rate(self) -> float:
+        """Bytes per second over the last RATE_WINDOW seconds."""
+        if len(self.samples) < 2:
+            return 0.0
+        (t0, b0), (t1, b1) = self.samples[0], self.samples[-1]
+        return (b1 - b0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def update(self, progress: Dict[str, Any]):
+        self.message = progress.get("status", self.message)
+        digest = progress.get("digest")
+        if digest and progress.get("total"):
+            self.layers[digest] = [progress.get("completed", 0), progress["total"]]
+            now = time.perf_counter()
+            self.samples.append((now, self.completed()))
+            while self.samples and now - self.samples[0][0] > self.RATE_WINDOW:
+                self.samples.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        rate = self.rate() if self.status == "pulling" else 0.0
+        remaining = self.total() - self.completed()
+        return {"name": self.name, "status": self.status, "message": self.message, "error": self.error,
+                "completed": self.completed(), "total": self.total(), "layers": len(self.layers),
+                "rate": rate, "eta": remaining / rate if rate > 0 else None}
+
+class DownloadManager:
+    """
+    Runs model pulls in the background, at most `max_concurrent` at a time;
+    the rest wait in a queue. It owns no widgets: progress is kept per job
+    and read with snapshot() by whoever displays it, at their own refresh
+    rate, so a multi-GB pull costs the UI nothing per progress line.
+
+    Unfinished pulls are written to `state_path` and resumed by resume() on
+    the next start. Ollama keeps partially downloaded layers, so a resumed
+    pull continues where it stopped rather than starting over.
+    """
+    def __init__(self, client, max_concurrent: int = 2, state_path: str = "downloads.json",
+                 on_complete: Optional[Callable[[str], None]] = None):
+        self.client = client
+        self.max_concurrent = max(1, max_concurrent)
+        self.state_path = state_path
+        # Called from a worker thread with the model name once a pull succeeds
+        self.on_complete = on_complete
+        self.jobs: Dict[str, PullJob] = {}
+        self._lock = threading.Lock()
+
+    # --- Queue ---------------------------------------------------------
+
+    def enqueue(self, name: str) -> bool:
+        """Queues a pull; False if that model is already queued or pulling."""
+        with self._lock:
+            job = self.jobs.get(name)
+            if job and job.status in PullJob.ACTIVE:
+                return False
+            self.jobs[name] = PullJob(name)
+            self._save()
+            self._start_waiting()
+        return True
+
+    def cancel(self, name: str):
+        with self._lock:
+            job = self.jobs.get(name)
+            if job is None or job.status not in PullJob.ACTIVE:
+                return
+            if job.status == "queued":
+                self._finish(job, "cancelled")
+            else:
+                # The worker stops at the next progress line and closes the connection
+                job.cancel_requested = True
+                job.message = "Cancelling..."
+
+    def clear_finished(self):
+        with self._lock:
+            self.jobs = {name: job for name, job in self.jobs.items() if job.status in PullJob.ACTIVE}
+
+    def resume(self):
+        """Re-queues the pulls that were unfinished when the app last closed."""
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r') as f:
+                names = json.load(f).get("pending", [])
+        except (json.JSONDecodeError, IOError, AttributeError):
+            return
+        for name in names:
+            self.enqueue(name)
+
+    # --- Progress ------------------------------------------------------
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Every job's progress, in the order they were queued."""
+        with self._lock:
+            return [job.snapshot() for job in self.jobs.values()]
+
+    def totals(self, jobs: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Aggregate bytes, throughput and ETA over the active jobs."""
+        active = [j for j in (jobs if jobs is not None else self.snapshot()) if j["status"] in PullJob.ACTIVE]
+        completed = sum(j["completed"] for j in active)
+        total = sum(j["total"] for j in active)
+        rate = sum(j["rate"] for j in active)
+        return {"active": len(active), "completed": completed, "total": total, "rate": rate,
+                "eta": (total - completed) / rate if rate > 0 else None}
+
+    # --- Workers -------------------------------------------------------
+
+    def _start_waiting(self):
+        """Starts queued jobs up to the concurrency limit. Caller holds the lock."""
+        running = sum(1 for job in self.jobs.values() if job.status == "pulling")
+        for job in self.jobs.values():
+            if running >= self.max_concurrent:
+                break
+            if job.status == "queued":
+                job.status = "pulling"
+                job.message = "Starting"
+                running += 1
+                threading.Thread(target=self._pull_thread, args=(job,), daemon=True).start()
+
+    def _pull_thread(self, job: PullJob):
+        updates = self.client.pull_model(job.name)
+        outcome, error = "failed", "Connection closed before the pull finished"
+        try:
+            for progress in updates:
+                if job.cancel_requested:
+                    outcome, error = "cancelled", ""
+                    break
+                if "error" in progress:
+                    error = progress["error"]
+                    break
+                with self._lock:
+                    job.update(progress)
+                if progress.get("status") == "success":
+                    outcome, error = "done", ""
+                    break
+        finally:
+            updates.close()
+        with self._lock:
+            job.error = error
+            self._finish(job, outcome)
+        if outcome == "done" and self.on_complete:
+            self.on_complete(job.name)
+
+    def _finish(self, job: PullJob, status: str):
+        """Caller holds the lock."""
+        job.status = status
+        job.message = {"done": "Done", "failed": "Failed", "cancelled": "Cancelled"}[status]
+        job.finished_at = time.time()
+        self._save()
+        self._start_waiting()
+
+    def _save(self):
+        """Persists the unfinished pulls. Caller holds the lock."""
+        pending = [name for name, job in self.jobs.items() if job.status in PullJob.ACTIVE]
+        try:
+            with open(self.state_path, 'w') as f:
+                json.dump({"pending": pending}, f, indent=4)
+        except IOError as e:
+            print(f"Error saving download queue: {e}")
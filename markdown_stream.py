@@ -0,0 +1,315 @@
+import re
+from typing import List, Tuple
+
+# (text, tags) ready for Text.insert
+Segment = Tuple[str, Tuple[str, ...]]
+
+MAX_LINK_LENGTH = 800
+RULE = "─" * 24
+
+_INLINE_SPECIAL = re.compile(r"[*_`\[\\|\n]")
+_CODE_SPECIAL = re.compile(r"[`\n]")
+_LINK = re.compile(r"\[([^\]\n]{0,300})\]\(([^)\s]{0,480})\)")
+_LINK_PREFIX = re.compile(r"\[[^\]\n]{0,300}(?:\](?:\([^)\s]{0,480})?)?")
+_ORDERED = re.compile(r"\d{1,9}[.)] ")
+_ORDERED_PREFIX = re.compile(r"\d{1,9}[.)]?")
+_RULE_LINE = re.compile(r"([-*_]) *(?:\1 *){2,}")
+_RULE_PREFIX = re.compile(r"([-*_]) *(?:\1 *)*")
+_TABLE_SEPARATOR = re.compile(r"\|[-:| ]*")
+_ESCAPABLE = set("\\`*_{}[]()#+-.!|>")
+
+class MarkdownStream:
+    """
+    Incremental Markdown tokenizer for streamed text.
+
+    `feed()` takes the next delta and returns the (text, tags) segments that
+    are now unambiguous. Only the tail that can still change meaning (a lone
+    `*`, an unterminated link, the first characters of a line) is held back,
+    and all block and inline state carries over between calls, so each call
+    does O(delta) work no matter how long the message already is.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._pending = ""
+        self._out: List[Segment] = []
+        self._line_start = True
+        self._line_tags: Tuple[str, ...] = ()
+        self._table_row = False
+        self._prev = "\n"
+        self.in_code_block = False
+        self.bold = False
+        self.italic = False
+        self.code = False
+
+    def feed(self, text: str) -> List[Segment]:
+        self._pending += text
+        consumed = self._scan(self._pending, final=False)
+        self._pending = self._pending[consumed:]
+        return self._take()
+
+    def flush(self) -> List[Segment]:
+        """Emits whatever is still held back, treating the stream as complete."""
+        self._scan(self._pending, final=True)
+        self._pending = ""
+        return self._take()
+
+    def _take(self) -> List[Segment]:
+        out, self._out = self._out, []
+        return out
+
+    def _emit(self, text: str, tags: Tuple[str, ...]):
+        if not text:
+            return
+        if self._out and self._out[-1][1] == tags:
+            self._out[-1] = (self._out[-1][0] + text, tags)
+        else:
+            self._out.append((text, tags))
+        self._prev = text[-1]
+
+    def _inline_tags(self) -> Tuple[str, ...]:
+        if self.code:
+            return self._line_tags + ("code",)
+        if self.bold and self.italic:
+            return self._line_tags + ("bold_italic",)
+        if self.bold:
+            return self._line_tags + ("bold",)
+        if self.italic:
+            return self._line_tags + ("italic",)
+        return self._line_tags
+
+    def _end_line(self):
+        # Inline spans don't carry across lines; an unclosed `**` only affects its own line
+        self.bold = self.italic = self.code = False
+        self._line_start = True
+        self._line_tags = ()
+        self._table_row = False
+
+    # --- Scanning ------------------------------------------------------
+
+    def _scan(self, s: str, final: bool) -> int:
+        """Consumes as much of `s` as is unambiguous; returns the number of characters consumed."""
+        i, n = 0, len(s)
+        while i < n:
+            if self._line_start:
+                j = self._start_line(s, i, final)
+                if j is None:
+                    return i
+                i = j
+            elif self.in_code_block:
+                j = s.find("\n", i)
+                if j == -1:
+                    self._emit(s[i:], ("code_block",))
+                    return n
+                self._emit(s[i:j + 1], ("code_block",))
+                self._end_line()
+                i = j + 1
+            else:
+                i, hold = self._scan_inline(s, i, final)
+                if hold:
+                    return i
+        return n
+
+    def _start_line(self, s: str, i: int, final: bool):
+        """Classifies the line starting at i. Returns the index to continue from, or None to wait for more text."""
+        nl = s.find("\n", i)
+        line = s[i:] if nl == -1 else s[i:nl]
+        complete = nl != -1 or final
+        line_end = len(s) if nl == -1 else nl + 1
+        stripped = line.lstrip(" ")
+        indent = len(line) - len(stripped)
+        if not stripped and not complete:
+            return None
+
+        if self.in_code_block:
+            if stripped.startswith("```"):
+                if not complete:
+                    return None
+                self.in_code_block = False
+                return line_end
+            if len(stripped) < 3 and "```".startswith(stripped) and not complete:
+                return None
+            self._line_start = False
+            return i
+
+        self._line_start = False
+        if not stripped:
+            return i
+
+        # Fenced code block
+        if stripped.startswith("```"):
+            if not complete:
+                self._line_start = True
+                return None
+            self.in_code_block = True
+            self._line_start = True
+            return line_end
+        if len(stripped) < 3 and "```".startswith(stripped) and not complete:
+            self._line_start = True
+            return None
+
+        lead = stripped[0]
+
+        # Horizontal rule (and the "--" / "- -" prefixes that might still become one)
+        if lead in "-*_":
+            if not complete and _RULE_PREFIX.fullmatch(stripped):
+                self._line_start = True
+                return None
+            if complete and _RULE_LINE.fullmatch(stripped.rstrip()):
+                self._emit(RULE, ("hr",))
+                self._emit("\n", ("hr",))
+                self._end_line()
+                return line_end
+
+        # Header
+        if lead == "#":
+            hashes = len(stripped) - len(stripped.lstrip("#"))
+            if hashes == len(stripped) and not complete:
+                self._line_start = True
+                return None
+            if hashes <= 6 and (hashes == len(stripped) or stripped[hashes] == " "):
+                self._line_tags = ("header",)
+                return i + indent + min(hashes + 1, len(stripped))
+
+        # Bullet list
+        if lead in "-*+":
+            if len(stripped) == 1 and not complete:
+                self._line_start = True
+                return None
+            if len(stripped) > 1 and stripped[1] == " ":
+                self._line_tags = ("list_item",)
+                self._emit(" " * indent + "• ", self._line_tags)
+                return i + indent + 2
+
+        # Ordered list
+        if lead.isdigit():
+            m = _ORDERED.match(stripped)
+            if m:
+                self._line_tags = ("list_item",)
+                self._emit(" " * indent + m.group(0), self._line_tags)
+                return i + indent + m.end()
+            if not complete and _ORDERED_PREFIX.fullmatch(stripped):
+                self._line_start = True
+                return None
+
+        # Block quote
+        if lead == ">":
+            if len(stripped) == 1 and not complete:
+                self._line_start = True
+                return None
+            self._line_tags = ("quote",)
+            return i + indent + (2 if stripped[1:2] == " " else 1)
+
+        # Table row; a separator row becomes a rule
+        if lead == "|":
+            if _TABLE_SEPARATOR.fullmatch(stripped.rstrip()):
+                if not complete:
+                    self._line_start = True
+                    return None
+                if "-" in stripped:
+                    self._emit(RULE, ("table",))
+                    self._emit("\n", ("table",))
+                    self._end_line()
+                    return line_end
+            self._line_tags = ("table",)
+            self._table_row = True
+            return i + indent + 1
+
+        return i
+
+    def _scan_inline(self, s: str, i: int, final: bool):
+        """
+        Handles text up to and including the next special character.
+        Returns (index, hold); with hold set, s[index:] must wait for more text.
+        """
+        m = (_CODE_SPECIAL if self.code else _INLINE_SPECIAL).search(s, i)
+        if not m:
+            self._emit(s[i:], self._inline_tags())
+            return len(s), False
+        j = m.start()
+        self._emit(s[i:j], self._inline_tags())
+        c = s[j]
+        n = len(s)
+
+        if c == "\n":
+            self._emit("\n", self._line_tags)
+            self._end_line()
+            return j + 1, False
+
+        if c == "`":
+            self.code = not self.code
+            self._prev = c
+            return j + 1, False
+
+        if c == "\\":
+            if j + 1 >= n:
+                if final:
+                    self._emit("\\", self._inline_tags())
+                    return n, False
+                return j, True
+            if s[j + 1] in _ESCAPABLE:
+                self._emit(s[j + 1], self._inline_tags())
+                return j + 2, False
+            self._emit("\\", self._inline_tags())
+            return j + 1, False
+
+        if c == "|":
+            if not self._table_row:
+                self._emit("|", self._inline_tags())
+                return j + 1, False
+            if j + 1 >= n and not final:
+                return j, True
+            if j + 1 >= n or s[j + 1] == "\n":
+                # Trailing pipe closes the row
+                return j + 1, False
+            self._emit(" │ ", self._inline_tags())
+            return j + 1, False
+
+        if c == "[":
+            link = _LINK.match(s, j)
+            if link:
+                self._emit(link.group(1), self._inline_tags() + ("link", "href:" + link.group(2)))
+                return link.end(), False
+            if not final and n - j < MAX_LINK_LENGTH and _LINK_PREFIX.fullmatch(s, j):
+                return j, True
+            self._emit("[", self._inline_tags())
+            return j + 1, False
+
+        # Emphasis: * ** *** and the _ equivalents
+        run = j
+        while run < n and s[run] == c:
+            run += 1
+        if run >= n and not final:
+            return j, True
+        count = run - j
+        before = self._prev
+        after = s[run] if run < n else "\n"
+        if count > 3 or (c == "_" and before.isalnum() and after.isalnum()):
+            self._emit(s[j:run], self._inline_tags())
+            return run, False
+        toggled = False
+        if count in (2, 3):
+            toggled |= self._toggle("bold", before, after)
+        if count in (1, 3):
+            toggled |= self._toggle("italic", before, after)
+        if not toggled:
+            self._emit(s[j:run], self._inline_tags())
+            return run, False
+        self._prev = c
+        return run, False
+
+    def _toggle(self, flag: str, before: str, after: str) -> bool:
+        if getattr(self, flag):
+            # Closing needs text right before the marker
+            if before.isspace():
+                return False
+        elif after.isspace():
+            return False
+        setattr(self, flag, not getattr(self, flag))
+        return True
+
+def render_markdown(text: str) -> List[Segment]:
+    """Tokenizes a complete document in one pass."""
+    stream = MarkdownStream()
+    return stream.feed(text) + stream.flush()
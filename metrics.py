@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+class GenerationMetrics:
+    """
+    Timings for one generation. The network thread fills in what the client
+    measured plus Ollama's own stats; the UI thread adds queue-to-render delay
+    and render time for every chunk it draws.
+    """
+    def __init__(self, model: str, server: str):
+        self.model = model
+        self.server = server
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.client: Dict[str, float] = {}        # ttfb_ms, first_token_ms, stream_ms (cancelled, stop_ms) from chat_stream
+        self.stats: Dict[str, Any] = {}           # Ollama's timing fields from the final chunk
+        self.queue_delays_ms: List[float] = []
+        self.render_ms = 0.0
+        self.chunks = 0
+        self.tokens = 0
+        self.passages = 0                          # retrieved passages added to the prompt
+        self.retrieval_ms: Optional[float] = None
+        self.first_render_ms: Optional[float] = None
+        self.finished_ms: Optional[float] = None
+
+    def record_render(self, enqueued_at: float, render_start: float, render_end: float, tokens: int = 1):
+        self.chunks += 1
+        self.tokens += tokens
+        self.queue_delays_ms.append((render_start - enqueued_at) * 1000)
+        self.render_ms += (render_end - render_start) * 1000
+        if self.first_render_ms is None:
+            self.first_render_ms = (render_end - self.t0) * 1000
+
+    def finish(self):
+        self.finished_ms = (time.perf_counter() - self.t0) * 1000
+
+    def tokens_per_second(self) -> Optional[float]:
+        if self.stats.get("eval_duration"):
+            return self.stats.get("eval_count", 0) / (self.stats["eval_duration"] / 1e9)
+        # No server stats (e.g. stopped early): fall back to streamed tokens over wall time
+        if self.tokens and self.client.get("stream_ms"):
+            return self.tokens / (self.client["stream_ms"] / 1000)
+        return None
+
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds from pressing Send to the first token on screen."""
+        return self.first_render_ms / 1000 if self.first_render_ms is not None else None
+
+    def summary_text(self) -> str:
+        # A replayed reply keeps the original server stats; its TTFT is the replay's
+        parts = ["cached"] if self.client.get("cached") else []
+        if self.client.get("cancelled"):
+            parts.insert(0, "stopped")
+        rate = self.tokens_per_second()
+        if rate is not None:
+            parts.append(f"{rate:.1f} tok/s")
+        ttft = self.time_to_first_token()
+        if ttft is not None:
+            parts.append(f"TTFT {ttft:.2f}s")
+        if self.passages:
+            parts.append(f"{self.passages} passage{'s' if self.passages > 1 else ''}")
+        if self.stats.get("load_duration", 0) > 5e8:
+            parts.append(f"load {self.stats['load_duration'] / 1e9:.1f}s")
+        return " · ".join(parts)
+
+    def to_record(self) -> Dict[str, Any]:
+        delays = sorted(self.queue_delays_ms)
+        def percentile(p):
+            return round(delays[min(len(delays) - 1, int(len(delays) * p))], 3) if delays else None
+        rate = self.tokens_per_second()
+        ttft = self.time_to_first_token()
+        return {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "model": self.model,
+            "server": self.server,
+            "tokens_per_s": round(rate, 2) if rate is not None else None,
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            **{k: round(v, 1) if isinstance(v, float) else v for k, v in self.client.items() if k != "host"},
+            "queue_delay_ms_p50": percentile(0.5),
+            "queue_delay_ms_p95": percentile(0.95),
+            "queue_delay_ms_max": percentile(1.0),
+            "render_ms": round(self.render_ms, 1),
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "passages": self.passages,
+            "retrieval_ms": round(self.retrieval_ms, 1) if self.retrieval_ms is not None else None,
+            "total_ms": round(self.finished_ms, 1) if self.finished_ms is not None else None,
+            **self.stats,
+        }
+
+class MetricsLog:
+    """Appends one JSON object per generation to a JSONL file."""
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, record: Dict[str, Any]):
+        try:
+            with self._lock, open(self.path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+        except IOError as e:
+            print(f"Error writing metrics: {e}")
+
+class StartupProfile:
+    """Wall time of each startup phase, printed by `ollama_chat.py --profile-startup`."""
+    def __init__(self, start: Optional[float] = None):
+        self.start = start if start is not None else time.perf_counter()
+        self.last = self.start
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        """Ends `phase`: the time since the previous mark is charged to it."""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self) -> str:
+        lines = [f"{phase:<14}{ms:9.1f} ms" for phase, ms in self.phases]
+        lines.append(f"{'total':<14}{(self.last - self.start) * 1000:9.1f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def describe_model(model: Dict[str, Any]) -> str:
+    """Resource cost at a glance, e.g. "4.7 GB · 8.0B · Q4_0"."""
+    details = model.get("details") or {}
+    parts = [format_bytes(model["size"]) if model.get("size") else "",
+             details.get("parameter_size", ""), details.get("quantization_level", "")]
+    return " · ".join(part for part in parts if part)
+
+class ModelCatalog:
+    """
+    /api/tags listings cached on disk per server URL, so the model picker is
+    filled at startup before the server answers, and still works when it is
+    down. A fresh listing replaces the cached one; whether anything changed
+    is decided by comparing names and digests.
+    """
+    def __init__(self, path: str = "models_cache.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Any]] = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, IOError):
+            return {}
+
+    def _write(self):
+        # Write-then-rename so a crash mid-write never leaves a truncated cache
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self._data, f, indent=4)
+            os.replace(tmp, self.path)
+        except IOError as e:
+            print(f"Error saving model cache: {e}")
+
+    def models(self, base_url: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._data.get(base_url, {}).get("models", []))
+
+    def fetched_at(self, base_url: str) -> Optional[float]:
+        with self._lock:
+            return self._data.get(base_url, {}).get("fetched_at")
+
+    @staticmethod
+    def digests(models: List[Dict[str, Any]]) -> Dict[str, str]:
+        return {m["name"]: m.get("digest", "") for m in models}
+
+    def update(self, base_url: str, models: List[Dict[str, Any]]) -> bool:
+        """Stores a fresh listing; True if it differs from the cached one."""
+        with self._lock:
+            old = self._data.get(base_url, {}).get("models")
+            changed = old is None or self.digests(old) != self.digests(models)
+            self._data[base_url] = {"fetched_at": time.time(), "models": models}
+            self._write()
+        return changed
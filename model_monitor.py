@@ -0,0 +1,164 @@
+import customtkinter as ctk
+import re
+import threading
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+
+from model_catalog import format_bytes
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """Ollama's RFC 3339 timestamps (nanosecond fractions, 'Z' or an offset)."""
+    match = re.match(r"(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?(Z|[+-]\d\d:\d\d)?$", value or "")
+    if not match:
+        return None
+    stamp, fraction, zone = match.groups()
+    fraction = (fraction or ".0")[:7]
+    zone = "+00:00" if zone in (None, "Z") else zone
+    return datetime.fromisoformat(stamp + fraction + zone)
+
+def format_expiry(expires_at: str) -> str:
+    expires = parse_timestamp(expires_at)
+    if expires is None:
+        return ""
+    remaining = (expires - datetime.now(timezone.utc)).total_seconds()
+    if remaining > 365 * 24 * 3600:
+        return "kept loaded"
+    if remaining <= 0:
+        return "unloading"
+    minutes, seconds = divmod(int(remaining), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"unloads in {hours}h {minutes:02d}m" if hours else f"unloads in {minutes}m {seconds:02d}s"
+
+def describe_memory(model: Dict[str, Any]) -> str:
+    size = model.get("size", 0)
+    vram = model.get("size_vram", 0)
+    if not size:
+        return ""
+    if vram >= size:
+        placement = "100% GPU"
+    elif vram == 0:
+        placement = "100% CPU"
+    else:
+        placement = f"{vram * 100 // size}% GPU / {100 - vram * 100 // size}% CPU"
+    return f"{format_bytes(size)} · {placement}"
+
+class LoadedModelsWindow(ctk.CTkToplevel):
+    """
+    Live view of /api/ps: every model Ollama has in memory, how much RAM/VRAM
+    it takes and when it will be unloaded, with a button to unload it now.
+    With a ServerPool client the list covers every host, and Unload acts on
+    the row's host only. A background thread polls while the window is shown
+    and hands results over through the app's UIDispatcher; closing the window
+    hides it and stops the polling until show().
+    """
+    def __init__(self, parent, client, dispatcher, poll_interval: float = 2.0):
+        super().__init__(parent)
+        self.title("Loaded Models")
+        self.geometry("520x320")
+        self.client = client
+        self.dispatcher = dispatcher
+        self.poll_interval = poll_interval
+        # Set while hidden; show() starts a poller with a fresh one, so only one ever runs
+        self.closed = threading.Event()
+        self.closed.set()
+        self.models: List[Dict[str, Any]] = []
+        self.rows: List[Dict[str, Any]] = []
+
+        self.status_label = ctk.CTkLabel(self, text="Checking...", anchor="w")
+        self.status_label.pack(padx=20, pady=(15, 5), fill="x")
+
+        self.list_frame = ctk.CTkScrollableFrame(self)
+        self.list_frame.pack(padx=10, pady=(0, 10), fill="both", expand=True)
+        self.list_frame.grid_columnconfigure(0, weight=1)
+
+        self._tick_job = None
+        self.protocol("WM_DELETE_WINDOW", self.hide)
+        self.show()
+
+    def show(self):
+        if self.closed.is_set():
+            self.closed = threading.Event()
+            threading.Thread(target=self._poll_thread, args=(self.closed,), daemon=True).start()
+        self.deiconify()
+        self.lift()
+
+    def hide(self):
+        self.closed.set()
+        if self._tick_job is not None:
+            self.after_cancel(self._tick_job)
+            self._tick_job = None
+        self.withdraw()
+
+    def _poll_thread(self, closed: threading.Event):
+        while not closed.is_set():
+            self.dispatcher.post(self.handle_message, {"type": "models", "models": self.client.running_models()})
+            closed.wait(self.poll_interval)
+
+    def _unload_thread(self, name, host):
+        # Only the row's host; a plain OllamaClient has just the one
+        result = self.client.unload_model(name, host=host) if host else self.client.unload_model(name)
+        if "error" in result:
+            self.dispatcher.post(self.handle_message, {"type": "error", "message": f"Unloading {name} failed: {result['error']}"})
+        self.dispatcher.post(self.handle_message, {"type": "models", "models": self.client.running_models()})
+
+    def handle_message(self, msg):
+        if self.closed.is_set() or not self.winfo_exists():
+            return
+        if msg["type"] == "models":
+            self.show_models(msg["models"])
+        elif msg["type"] == "error":
+            self.status_label.configure(text=msg["message"])
+
+    def tick(self):
+        """Counts the unload timers down between polls; stops while nothing is loaded."""
+        self._tick_job = None
+        if self.closed.is_set() or not self.winfo_exists():
+            return
+        for row, model in zip(self.rows, self.models):
+            row["expiry"].configure(text=format_expiry(model.get("expires_at", "")))
+        if self.models:
+            self._tick_job = self.after(1000, self.tick)
+
+    def show_models(self, models: Optional[List[Dict[str, Any]]]):
+        if models is None:
+            self.status_label.configure(text="No connection to the Ollama server.")
+            models = []
+        else:
+            vram = sum(m.get("size_vram", 0) for m in models)
+            total = sum(m.get("size", 0) for m in models)
+            self.status_label.configure(text=f"{len(models)} loaded · {format_bytes(total)} total, {format_bytes(vram)} in VRAM"
+                                        if models else "No models loaded.")
+        # Rebuild the rows only when the set of models changed
+        if [(m.get("name"), m.get("host")) for m in models] != [(m.get("name"), m.get("host")) for m in self.models]:
+            for row in self.rows:
+                row["frame"].destroy()
+            self.rows = [self._make_row(i, model) for i, model in enumerate(models)]
+        self.models = models
+        for row, model in zip(self.rows, models):
+            row["memory"].configure(text=describe_memory(model))
+        if models and self._tick_job is None:
+            self.tick()
+
+    def _make_row(self, index: int, model: Dict[str, Any]) -> Dict[str, Any]:
+        frame = ctk.CTkFrame(self.list_frame)
+        frame.grid(row=index, column=0, padx=5, pady=4, sticky="ew")
+        frame.grid_columnconfigure(0, weight=1)
+        title = model.get("name", "")
+        if model.get("host"):
+            title += f"  @ {model['host'].split('//')[-1]}"
+        name = ctk.CTkLabel(frame, text=title, font=ctk.CTkFont(weight="bold"), anchor="w")
+        name.grid(row=0, column=0, padx=10, pady=(6, 0), sticky="w")
+        memory = ctk.CTkLabel(frame, text="", anchor="w", text_color="gray70")
+        memory.grid(row=1, column=0, padx=10, sticky="w")
+        expiry = ctk.CTkLabel(frame, text="", anchor="w", text_color="gray70")
+        expiry.grid(row=2, column=0, padx=10, pady=(0, 6), sticky="w")
+        unload = ctk.CTkButton(frame, text="Unload", width=80,
+                               command=lambda n=model.get("name", ""), h=model.get("host"): self.unload(n, h))
+        unload.grid(row=0, column=1, rowspan=3, padx=10)
+        return {"frame": frame, "memory": memory, "expiry": expiry, "unload": unload}
+
+    def unload(self, name: str, host: Optional[str] = None):
+        for row, model in zip(self.rows, self.models):
+            if model.get("name") == name and model.get("host") == host:
+                row["unload"].configure(state="disabled", text="Unloading...")
+        threading.Thread(target=self._unload_thread, args=(name, host), daemon=True).start()
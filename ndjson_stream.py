@@ -0,0 +1,70 @@
+import json
+from typing import Any, Callable, Iterator, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _json_loads(line: bytes) -> Any:
+    # json.loads() accepts bytes too, but sniffs the encoding first, which costs more than this
+    return json.loads(line.decode("utf-8"))
+
+# orjson parses bytes directly, skipping the utf-8 decode as well
+JSON_BACKEND = "orjson" if orjson else "json"
+default_loads: Callable[[bytes], Any] = orjson.loads if orjson else _json_loads
+
+# Bytes requested per read. The transport returns less when less has arrived
+# (e.g. one HTTP chunk), so this bounds reads without adding latency.
+READ_SIZE = 64 * 1024
+
+class NDJSONDecoder:
+    """
+    Incremental newline-delimited JSON decoder. feed() takes raw body bytes
+    as they arrive and returns the objects of every line completed by them;
+    a partial last line is kept until the next feed(). Lines that are not
+    valid JSON are skipped and counted.
+    """
+    def __init__(self, loads: Optional[Callable[[bytes], Any]] = None):
+        self.loads = loads or default_loads
+        self.skipped = 0
+        self._tail = b""
+
+    def feed(self, data: bytes) -> List[Any]:
+        if self._tail:
+            data = self._tail + data
+        lines = data.split(b"\n")
+        self._tail = lines.pop()
+        return self._decode(lines)
+
+    def flush(self) -> List[Any]:
+        """Decodes whatever is left once the body has ended."""
+        tail, self._tail = self._tail, b""
+        return self._decode([tail])
+
+    def _decode(self, lines: List[bytes]) -> List[Any]:
+        items = []
+        loads = self.loads
+        for line in lines:
+            if line:
+                try:
+                    items.append(loads(line))
+                except ValueError:  # json.JSONDecodeError and orjson.JSONDecodeError
+                    if line.strip():
+                        self.skipped += 1
+        return items
+
+def iter_ndjson(blocks, decoder: Optional[NDJSONDecoder] = None) -> Iterator[List[Any]]:
+    """
+    Yields, for every block of body bytes, the list of objects completed by
+    that block (blocks that only extend a partial line yield nothing).
+    `blocks` is any iterable of bytes, e.g. response.iter_content(READ_SIZE).
+    """
+    decoder = decoder or NDJSONDecoder()
+    for data in blocks:
+        items = decoder.feed(data)
+        if items:
+            yield items
+    items = decoder.flush()
+    if items:
+        yield items
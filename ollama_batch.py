@@ -0,0 +1,178 @@
+"""
+Headless batch runner: sends a suite of prompts to one or more models and
+writes one JSONL result per (prompt, model) as each finishes.
+
+Input is JSONL, one item per line:
+    {"id": "greet", "prompt": "Say hi"}
+    {"id": "chat-1", "messages": [{"role": "user", "content": "..."}], "system": "...", "options": {"seed": 1}}
+"id" defaults to the line number. Server URLs, the system prompt and model
+options come from config.json unless given on the command line.
+
+    python ollama_batch.py prompts.jsonl -m llama3 -m qwen2.5 -o results.jsonl --workers 4
+    python ollama_batch.py prompts.jsonl -m llama3 -o results.jsonl --resume
+
+Needs no display: nothing here imports customtkinter.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from config_manager import ConfigManager
+from ollama_client import OllamaClient, StopSignal
+from server_pool import ServerPool, POOL_CONNECT_RETRIES
+
+def read_items(path: str) -> List[Dict[str, Any]]:
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "messages" not in item:
+                if "prompt" not in item:
+                    raise ValueError(f"{path}:{number}: needs \"prompt\" or \"messages\"")
+                item["messages"] = [{"role": "user", "content": item["prompt"]}]
+            item["id"] = str(item.get("id", number))
+            items.append(item)
+    return items
+
+def finished_pairs(path: str) -> Set[Tuple[str, str]]:
+    """(id, model) pairs already answered without error in an earlier run's output."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short when the run was interrupted
+            if not record.get("error"):
+                done.add((record["id"], record["model"]))
+    return done
+
+def ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+def run_one(client, item: Dict[str, Any], model: str, system_prompt: str,
+            options: Dict[str, Any], stop_event: threading.Event) -> Optional[Dict[str, Any]]:
+    """One chat, consumed through chat_stream; None if stopped before it finished."""
+    start = time.perf_counter()
+    parts, thoughts, error, stats, timing = [], [], "", {}, {}
+    for chunk in client.chat_stream(model, item["messages"], system_prompt=item.get("system", system_prompt),
+                                    stop_event=stop_event, options={**options, **item.get("options", {})}, batch=True):
+        if chunk["type"] == "content":
+            parts.append(chunk["content"])
+        elif chunk["type"] == "thinking":
+            thoughts.append(chunk["content"])
+        elif chunk["type"] == "stats":
+            stats, timing = chunk["stats"], chunk["client"]
+        elif chunk["type"] == "error":
+            error = chunk["content"]
+    if stop_event.is_set():
+        return None
+    eval_duration = stats.get("eval_duration")
+    return {
+        "id": item["id"],
+        "model": model,
+        "host": timing.get("host"),
+        "response": "".join(parts),
+        "thinking": "".join(thoughts),
+        "error": error,
+        "tokens_per_s": round(stats.get("eval_count", 0) / (eval_duration / 1e9), 2) if eval_duration else None,
+        "ttft_ms": round(timing["first_token_ms"], 1) if "first_token_ms" in timing else None,
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        "stats": stats,
+    }
+
+def summarize(records: List[Dict[str, Any]], wall: float, skipped: int) -> str:
+    ok = [r for r in records if not r["error"]]
+    tokens = sum(r["stats"].get("eval_count", 0) for r in ok)
+    lines = [f"{len(records)} requests in {wall:.1f}s ({len(records) / wall if wall else 0:.2f} req/s), "
+             f"{len(records) - len(ok)} failed, {skipped} skipped (already done)",
+             f"{tokens} tokens generated, {tokens / wall if wall else 0:.1f} tok/s aggregate"]
+    for model in sorted({r["model"] for r in ok}):
+        rates = [r["tokens_per_s"] for r in ok if r["model"] == model and r["tokens_per_s"]]
+        ttfts = [r["ttft_ms"] for r in ok if r["model"] == model and r["ttft_ms"] is not None]
+        lines.append(f"  {model}: {len(rates)} ok"
+                     + (f", {sum(rates) / len(rates):.1f} tok/s mean" if rates else "")
+                     + (f", TTFT {sum(ttfts) / len(ttfts):.0f} ms mean" if ttfts else ""))
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of prompts or conversations")
+    parser.add_argument("-m", "--model", action="append", required=True, help="model to run (repeat for several)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file the results are appended to")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="requests in flight at once")
+    parser.add_argument("--resume", action="store_true", help="keep the output file and skip what it already answers")
+    parser.add_argument("--url", action="append", help="Ollama server URL (repeat for several; default: config.json)")
+    parser.add_argument("--system", help="system prompt for items without one (default: config.json)")
+    parser.add_argument("--options", type=json.loads, default={}, help="JSON object of Ollama options, e.g. '{\"temperature\": 0}'")
+    args = parser.parse_args(argv)
+
+    config = ConfigManager.load_config()
+    workers = max(1, args.workers)
+    urls = args.url or [config["ollama_url"]] + config["ollama_servers"]
+
+    def make_client(base_url):
+        return OllamaClient(base_url=base_url, pool_size=max(workers, config["http_pool_size"]),
+                            connect_timeout=config["connect_timeout"], read_timeout=config["read_timeout"],
+                            max_retries=config["max_retries"], connect_retries=POOL_CONNECT_RETRIES,
+                            keep_alive=config["keep_alive"],
+                            default_keep_alive=config["default_keep_alive"])
+
+    client = ServerPool(urls, client_factory=make_client)
+    system_prompt = args.system if args.system is not None else config["system_prompt"]
+
+    items = read_items(args.input)
+    done = finished_pairs(args.output) if args.resume else set()
+    jobs = [(item, model) for item in items for model in args.model if (item["id"], model) not in done]
+    skipped = len(items) * len(args.model) - len(jobs)
+    print(f"{len(jobs)} requests, {workers} workers, {len(urls)} server(s)" +
+          (f", {skipped} already done" if skipped else ""), file=sys.stderr)
+
+    # On Ctrl-C it closes every request in flight, so the servers stop generating at once
+    stop_event = StopSignal()
+    records: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    with open(args.output, "a" if args.resume else "w", encoding="utf-8") as out:
+        if out.tell() and not ends_with_newline(args.output):
+            out.write("\n")  # end the line an interrupted run cut short
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {executor.submit(run_one, client, item, model, system_prompt,
+                                   {**config["default_model_options"], **config["model_options"].get(model, {}), **args.options},
+                                   stop_event): (item["id"], model)
+                   for item, model in jobs}
+        try:
+            for future in as_completed(futures):
+                record = future.result()
+                if record is None:
+                    continue
+                # Written and flushed as each finishes, so an interrupted run loses only what was in flight
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                records.append(record)
+                status = f"error: {record['error']}" if record["error"] else \
+                    f"{record['tokens_per_s'] or 0:.1f} tok/s, {record['total_ms'] / 1000:.1f}s"
+                print(f"[{len(records)}/{len(jobs)}] {record['model']} {record['id']}: {status}", file=sys.stderr)
+        except KeyboardInterrupt:
+            print("Interrupted; rerun with --resume to finish.", file=sys.stderr)
+            stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            executor.shutdown()
+    client.close()
+
+    print(summarize(records, time.perf_counter() - start, skipped))
+    return 1 if any(r["error"] for r in records) or stop_event.is_set() else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,36 @@
+import time
+_IMPORT_START = time.perf_counter()   # for --profile-startup
+
+import argparse
+import importlib
 import customtkinter as ctk
 import threading
-import queue
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import json
 import re
-from ollama_client import OllamaClient
+from server_pool import ServerPool, normalize_urls, POOL_CONNECT_RETRIES
 from pull_dialog import PullModelDialog
+from model_monitor import LoadedModelsWindow
+from model_catalog import ModelCatalog, describe_model
+from download_manager import DownloadManager
 from config_manager import ConfigManager
-from typing import List, Dict
+from context_builder import ContextBuilder, TokenEstimator
+from metrics import GenerationMetrics, MetricsLog, StartupProfile
+from transcript_view import VirtualTranscript
+from markdown_stream import MarkdownStream
+from session_store import SessionStore
+from ui_dispatcher import UIDispatcher, merge_chunks
+from response_cache import ResponseCache, cache_key, is_deterministic
+from reasoning import split_reasoning, join_reasoning
+import sqlite3
+from typing import List, Dict, Optional, Callable
+# ollama_client (requests), retrieval (numpy) and compare_view (asyncio) are imported
+# where first used, so none of them delays the first window
 
-# Configuration
-ctk.set_appearance_mode("Dark")
-ctk.set_default_color_theme("miku_wave.json")
+def setup_theme():
+    """Parses the theme; must run before the first widget is created."""
+    ctk.set_appearance_mode("Dark")
+    ctk.set_default_color_theme("miku_wave.json")
 
 # Theme Constants
 USER_BG_COLOR = "#FF00FF"     # Hot Pink (User)
@@ -21,38 +39,56 @@ AI_BG_COLOR = "#16213E"       # Dark Navy (AI)
 AI_TEXT_COLOR = "#39C5BB"     # Miku Teal (AI)
 BORDER_COLOR = "#39C5BB"      # Teal Border
 
+# Resize/scroll work triggered by streaming is coalesced to at most once per frame
+LAYOUT_INTERVAL_MS = 16
+
+def open_link(url):
+    import webbrowser   # only needed once a link is clicked
+    webbrowser.open(url)
+
 class SettingsDialog(ctk.CTkToplevel):
-    def __init__(self, parent, current_url, current_system_prompt):
+    """Built the first time Settings is opened, then hidden rather than destroyed so reopening is instant."""
+    def __init__(self, parent):
         super().__init__(parent)
         self.title("Settings")
         self.geometry("400x300")
         self.parent = parent
         self.transient(parent)
-        self.lift()
-        self.focus_force()
-        self.after(100, self.grab_set)
+        self.protocol("WM_DELETE_WINDOW", self.hide)
         
-        self.url_label = ctk.CTkLabel(self, text="Ollama URL:")
+        self.url_label = ctk.CTkLabel(self, text="Ollama URL(s), comma-separated:")
         self.url_label.pack(padx=20, pady=(20, 5), anchor="w")
         self.url_entry = ctk.CTkEntry(self, width=300)
-        self.url_entry.insert(0, current_url)
         self.url_entry.pack(padx=20, pady=5)
         
         self.prompt_label = ctk.CTkLabel(self, text="System Prompt:")
         self.prompt_label.pack(padx=20, pady=(10, 5), anchor="w")
         self.prompt_text = ctk.CTkTextbox(self, width=300, height=100)
-        if current_system_prompt:
-            self.prompt_text.insert("0.0", current_system_prompt)
         self.prompt_text.pack(padx=20, pady=5)
         
         self.save_btn = ctk.CTkButton(self, text="Save", command=self.save_settings)
         self.save_btn.pack(padx=20, pady=20)
+
+    def show(self, current_url, current_system_prompt):
+        self.url_entry.delete(0, "end")
+        self.url_entry.insert(0, current_url)
+        self.prompt_text.delete("0.0", "end")
+        if current_system_prompt:
+            self.prompt_text.insert("0.0", current_system_prompt)
+        self.deiconify()
+        self.lift()
+        self.focus_force()
+        self.after(100, self.grab_set)
+
+    def hide(self):
+        self.grab_release()
+        self.withdraw()
         
     def save_settings(self):
         new_url = self.url_entry.get().strip()
         new_prompt = self.prompt_text.get("0.0", "end").strip()
+        self.hide()
         self.parent.update_settings(new_url, new_prompt)
-        self.destroy()
 
 class RichTextDisplay(ctk.CTkTextbox):
     def __init__(self, master, text: str = "", font_size=16, text_color="white", **kwargs):
@@ -63,73 +99,146 @@ class RichTextDisplay(ctk.CTkTextbox):
         self.code_font = ctk.CTkFont(family="monospace", size=int(font_size * 0.95))
         self.header_font = ctk.CTkFont(family="Roboto", size=int(font_size * 1.3), weight="bold")
         
-        # Configure Tags
+        # Configure Tags (when fonts conflict the tag configured last wins, so block tags come last)
         self._textbox.tag_config("bold", font=ctk.CTkFont(family="Roboto", size=font_size, weight="bold"))
         self._textbox.tag_config("italic", font=ctk.CTkFont(family="Roboto", size=font_size, slant="italic"))
+        self._textbox.tag_config("bold_italic", font=ctk.CTkFont(family="Roboto", size=font_size, weight="bold", slant="italic"))
+        self._textbox.tag_config("code", font=self.code_font, background="#1E1E2E", foreground="#F8F8F2")
+        self._textbox.tag_config("link", foreground="#FF77FF", underline=True)
+        self._textbox.tag_config("list_item", lmargin1=10, lmargin2=28)
+        self._textbox.tag_config("quote", lmargin1=15, lmargin2=15, foreground="#8892B0")
+        self._textbox.tag_config("table", font=self.code_font, lmargin1=10, lmargin2=10)
+        self._textbox.tag_config("hr", foreground="#39C5BB")
         self._textbox.tag_config("code_block", font=self.code_font, background="#1E1E2E", foreground="#F8F8F2", lmargin1=10, lmargin2=10, rmargin=10, spacing1=5, spacing3=5)
         self._textbox.tag_config("header", font=self.header_font, foreground="#39C5BB", spacing3=10)
+        self._textbox.tag_bind("link", "<Enter>", lambda e: self._textbox.configure(cursor="hand2"))
+        self._textbox.tag_bind("link", "<Leave>", lambda e: self._textbox.configure(cursor=""))
         
         # State
-        self.in_code_block = False
-        self.buffer = ""
+        self.markdown = MarkdownStream()
+        self._link_tags = set()
+        
+        # Layout state: text only ever grows at the end, so display lines above
+        # the last logical line are cached and only the tail is re-measured.
+        self._stable_display_lines = 0
+        self._tail_start = "1.0"
+        self._measured_width = 0
+        self._layout_pending = False
         
         self.configure(state="disabled")
         if text:
-            self.append_text(text)
+            self.set_text(text)
             
-        self.bind("<Configure>", self.adjust_height)
+        self.bind("<Configure>", self._on_configure)
+
+    def set_text(self, text, final=True):
+        """
+        Resets the parser state and renders `text` from scratch (used when a row is recycled).
+        Pass final=False when more deltas will follow.
+        """
+        self.configure(state="normal")
+        self.delete("1.0", "end")
+        self.configure(state="disabled")
+        self.markdown.reset()
+        self._invalidate_layout()
+        self.append_text(text)
+        if final:
+            self.finish()
+
+    def _on_configure(self, event=None):
+        # Height changes we make ourselves also land here; only a new width rewraps text
+        width = self._textbox.winfo_width()
+        if width != self._measured_width:
+            self._measured_width = width
+            self._invalidate_layout()
+            self.schedule_layout()
+
+    def _invalidate_layout(self):
+        self._stable_display_lines = 0
+        self._tail_start = "1.0"
+
+    def _count_display_lines(self, index1, index2):
+        result = self._textbox.count(index1, index2, "displaylines")
+        return result[0] if result else 0
+
+    def count_display_lines(self):
+        """Display lines in the widget, measuring only what changed since the last call."""
+        tail_start = self._textbox.index("end-1c linestart")
+        if tail_start != self._tail_start:
+            # Everything between the old and new tail is complete and won't rewrap
+            self._stable_display_lines += self._count_display_lines(self._tail_start, tail_start)
+            self._tail_start = tail_start
+        return self._stable_display_lines + self._count_display_lines(tail_start, "end")
+
+    def schedule_layout(self):
+        if not self._layout_pending:
+            self._layout_pending = True
+            self.after(LAYOUT_INTERVAL_MS, self.adjust_height)
 
     def adjust_height(self, event=None):
+        self._layout_pending = False
         try:
-            num_lines = self._textbox.count("1.0", "end", "displaylines")[0]
+            num_lines = self.count_display_lines()
             pixel_height = num_lines * (self.font_size * 1.5) + 30
             
             current_height = self.cget("height")
             if abs(pixel_height - current_height) > 5:
-                self.unbind("<Configure>")
                 self.configure(height=max(50, pixel_height))
-                self.after(10, lambda: self.bind("<Configure>", self.adjust_height))
-        except:
+        except tk.TclError:
             pass
 
     def append_text(self, text):
-        self.configure(state="normal")
-        self.buffer += text
-        
-        while '\n' in self.buffer:
-            line, self.buffer = self.buffer.split('\n', 1)
-            self._process_line(line + '\n')
-            
-        if self.buffer:
-            # If buffer starts with code fence, wait for more data
-            if not self.buffer.strip().startswith('`'):
-                self._process_text_chunk(self.buffer)
-                self.buffer = ""
+        segments = self.markdown.feed(text)
+        if segments:
+            self._insert_segments(segments)
 
-        self.configure(state="disabled")
-        self.adjust_height()
+    def finish(self):
+        """Renders anything the Markdown tokenizer was still holding back once the stream has ended."""
+        segments = self.markdown.flush()
+        if segments:
+            self._insert_segments(segments)
 
-    def _process_line(self, line):
-        if line.strip().startswith('```'):
-            self.in_code_block = not self.in_code_block
-            return
-        self._process_text_chunk(line)
-
-    def _process_text_chunk(self, text):
-        tags = []
-        if self.in_code_block:
-            tags.append("code_block")
-        else:
-            if text.strip().startswith('#'):
-                tags.append("header")
-        
-        self.insert("end", text, tuple(tags))
+    def _insert_segments(self, segments):
+        # One Tcl call for the whole batch: insert index chars tags chars tags ...
+        args = []
+        for text, tags in segments:
+            for tag in tags:
+                if tag.startswith("href:") and tag not in self._link_tags:
+                    self._link_tags.add(tag)
+                    self._textbox.tag_bind(tag, "<Button-1>", lambda e, url=tag[5:]: open_link(url))
+            args.extend((text, tags))
+        self.configure(state="normal")
+        self._textbox.insert("end", *args)
+        self.configure(state="disabled")
+        self.schedule_layout()
 
 class ChatMessage(ctk.CTkFrame):
     def __init__(self, master, role: str, text: str, **kwargs):
         super().__init__(master, **kwargs)
-        self.role = role
+        self._apply_role(role)
+        self.configure(fg_color=self.fg_color, corner_radius=16)
         
+        self.content_display = RichTextDisplay(self, text=text, text_color=self.text_color)
+        self.content_display.pack(fill="both", expand=True, padx=15, pady=10)
+        
+        # Per-message stats (tokens/s, TTFT); only packed when there is something to show
+        self.footer_label = ctk.CTkLabel(self, text="", text_color="#8892B0", font=ctk.CTkFont(size=11), height=14)
+        self.footer = ""
+
+        # Reasoning is kept as a string and only rendered while expanded; collapsed, just the count changes.
+        # The transcript sets on_thinking_toggle to remember the state when the row is recycled.
+        self.thinking = ""
+        self.thinking_tokens = 0
+        self.thinking_expanded = False
+        self.thinking_final = True
+        self.thinking_display = None
+        self.on_thinking_toggle = None
+        self.thinking_button = ctk.CTkButton(self, text="", fg_color="transparent", hover_color="#1F2B4D",
+                                             text_color="#8892B0", anchor="w", height=22, font=ctk.CTkFont(size=12),
+                                             command=self.toggle_thinking)
+
+    def _apply_role(self, role):
+        self.role = role
         if role == "user":
             self.fg_color = USER_BG_COLOR
             self.text_color = USER_TEXT_COLOR
@@ -139,40 +248,235 @@ class ChatMessage(ctk.CTkFrame):
             self.text_color = AI_TEXT_COLOR
             self.align = "w"
 
-        self.configure(fg_color=self.fg_color, corner_radius=16)
-        
-        self.content_display = RichTextDisplay(self, text=text, text_color=self.text_color)
-        self.content_display.pack(fill="both", expand=True, padx=15, pady=10)
+    def set_message(self, role, text, final=True):
+        """Rebinds this widget to another message so the transcript can recycle it."""
+        if role != self.role:
+            self._apply_role(role)
+            self.configure(fg_color=self.fg_color)
+            self.content_display.configure(text_color=self.text_color)
+        self.content_display.set_text(text, final=final)
+        self.thinking_final = final
+
+    def finish(self):
+        self.content_display.finish()
+        self.thinking_final = True
+        if self.thinking_display is not None and self.thinking_expanded:
+            self.thinking_display.finish()
+        if self.thinking:
+            self._update_thinking_label()
+
+    # --- Reasoning -----------------------------------------------------
+
+    def set_thinking(self, text, tokens=0, expanded=False):
+        """Rebinds the reasoning block; nothing is rendered unless `expanded`."""
+        self.thinking = text
+        self.thinking_tokens = tokens
+        self.thinking_expanded = expanded and bool(text)
+        if not text:
+            self.thinking_button.pack_forget()
+            if self.thinking_display is not None:
+                self.thinking_display.pack_forget()
+            return
+        self._update_thinking_label()
+        self.thinking_button.pack(anchor="w", padx=10, pady=(8, 0), before=self.content_display)
+        self._show_thinking()
+
+    def append_thinking(self, text, tokens=1):
+        first = not self.thinking
+        self.thinking += text
+        self.thinking_tokens += tokens
+        if first:
+            self.set_thinking(self.thinking, self.thinking_tokens, self.thinking_expanded)
+            return
+        self._update_thinking_label()
+        if self.thinking_expanded:
+            self.thinking_display.append_text(text)
+
+    def toggle_thinking(self):
+        self.thinking_expanded = not self.thinking_expanded
+        self._update_thinking_label()
+        self._show_thinking()
+        if self.on_thinking_toggle:
+            self.on_thinking_toggle(self, self.thinking_expanded)
+
+    def _show_thinking(self):
+        if not self.thinking_expanded:
+            if self.thinking_display is not None:
+                self.thinking_display.pack_forget()
+                # Drop the rendered text; a recycled row may never expand it again
+                self.thinking_display.set_text("")
+            return
+        if self.thinking_display is None:
+            self.thinking_display = RichTextDisplay(self, font_size=13, text_color="#8892B0")
+        self.thinking_display.set_text(self.thinking, final=self.thinking_final)
+        self.thinking_display.pack(fill="x", padx=15, pady=(4, 0), before=self.content_display)
+
+    def _update_thinking_label(self):
+        # Saved sessions don't record the count; ~4 characters per token
+        tokens = self.thinking_tokens or max(1, len(self.thinking) // 4)
+        arrow = "▾" if self.thinking_expanded else "▸"
+        state = "Thinking…" if not self.thinking_final else "Thinking Process"
+        self.thinking_button.configure(text=f"{arrow} {state} ({tokens} tokens)")
+
+    def set_footer(self, text):
+        if text == self.footer:
+            return
+        self.footer = text
+        if text:
+            self.footer_label.configure(text=text)
+            self.footer_label.pack(anchor="e", padx=15, pady=(0, 8))
+        else:
+            self.footer_label.pack_forget()
 
     def append_text(self, text):
         self.content_display.append_text(text)
 
 class OllamaApp(ctk.CTk):
-    def __init__(self):
+    """
+    Starts in two steps so the window shows as early as possible. __init__
+    builds the widgets from local state only: the cached model list and the
+    tail of the last session. Everything that needs the network (the
+    server pool, downloads, retrieval) is set up by start_services() once
+    the first frame is drawn, or earlier if something needs it first. The
+    slow parts of that (importing requests, opening the retrieval index)
+    run on worker threads, so the window stays responsive meanwhile.
+    """
+    def __init__(self, profile: Optional[StartupProfile] = None):
+        self.profile = profile or StartupProfile()
         super().__init__()
         self.title("Ollama Chat Pro")
         self.geometry("1000x700")
+        self.profile.mark("window")
         self.config = ConfigManager.load_config()
-        self.client = OllamaClient(base_url=self.config.get("ollama_url", "http://localhost:11434"))
-        self.msg_queue = queue.Queue()
+        self.ui = UIDispatcher(self, frame_budget_ms=self.config["ui_frame_budget_ms"])
         self.chat_history: List[Dict[str, str]] = [] 
         self.is_generating = False
-        self.stop_event = threading.Event()
+        self.regenerate_pending = False
+        self.discard_reply = False     # set when a reply fails or its chat is left while it streams
         self.system_prompt = self.config.get("system_prompt", "")
         self.full_response_buffer = "" 
+        self.thinking_buffer = ""
+        self.current_ai_message = None
+        self.current_metrics = None
+        self.metrics_log = MetricsLog(self.config["metrics_file"]) if self.config["metrics_file"] else None
+        self.available_models: List[str] = []
+        self.model_labels: Dict[str, str] = {}     # picker entry -> model name
+        self.model_digests: Dict[str, str] = {}    # model name -> digest, for response cache keys
+        self.response_cache = ResponseCache(self.config["response_cache_file"],
+                                            max_bytes=self.config["response_cache_mb"] * 1024 * 1024) \
+            if self.config["response_cache"] else None
+        self.catalog = ModelCatalog(self.config["model_cache_file"])
+        self.store = SessionStore(self.config["sessions_db"], page_size=self.config["session_page_size"])
+        self.session_id = None
+        self.session_oldest_seq = 0    # seq of the oldest message loaded; 0 once the whole session is loaded
+        self.history_generation = 0    # bumped whenever chat_history is replaced; keys the context summary
+        self.sessions: List[Dict] = []
+        self.search_results = None     # list of search hits while the search box is in use
+        self._search_job = None
+        # Set up by start_services()
+        self.client = None
+        self.context = None
+        self.stop_event = None
+        self.downloads = None
+        self.retrieval = None
+        # Dialogs are built on first use and kept
+        self.pull_dialog = None
+        self.settings_dialog = None
+        self.model_monitor = None
+        self.profile.mark("state")
         
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
         self.create_sidebar()
         self.create_chat_area()
         self.create_input_area()
-        self.load_models()
-        self.check_queue()
+        self.profile.mark("widgets")
+        self.show_cached_models()
+        self.refresh_session_list()
+        if self.config["restore_last_session"]:
+            self.restore_last_session()
+        self.profile.mark("restore")
+        self.on_services_ready: Optional[Callable[[], None]] = None
+        self._mapped = False
+        self.bind("<Map>", self.on_map, add="+")
+
+    def on_map(self, event):
+        # Children's <Map> events reach this binding too
+        if event.widget is not self or self._mapped:
+            return
+        self._mapped = True
+        # Mapped isn't drawn yet: flush the pending layout and redraws first
+        self.update_idletasks()
+        self.profile.mark("first frame")
+        threading.Thread(target=self._import_services, daemon=True).start()
+
+    def _import_services(self):
+        # Imported here so the Tk thread doesn't stall on requests/urllib3; start_services() then finds them loaded
+        importlib.import_module("ollama_client")
+        self.post({"type": "services"})
+
+    def start_services(self):
+        """Creates the server pool and everything that talks to it. Safe to call again."""
+        if self.client is not None:
+            return
+        from ollama_client import StopSignal
+        self.client = ServerPool(self.server_urls(), client_factory=self.make_client,
+                                 probe_interval=self.config["server_probe_interval"]).start()
+        self.context = ContextBuilder(TokenEstimator(),
+                                      budgets=self.config["context_tokens"],
+                                      default_budget=self.config["default_context_tokens"],
+                                      reserve=self.config["context_reserve_tokens"],
+                                      policy=self.config["context_policy"],
+                                      pinned_messages=self.config["context_pinned_messages"],
+                                      complete=self.client.complete)
+        # Setting it closes the stream's connection at once, so Ollama stops generating too
+        self.stop_event = StopSignal()
+        self.downloads = DownloadManager(self.client, max_concurrent=self.config["max_concurrent_pulls"],
+                                         state_path=self.config["downloads_file"],
+                                         on_complete=lambda name: self.post({"type": "pull_done", "name": name}))
+        if self.config["retrieval"]:
+            threading.Thread(target=self._open_retrieval, daemon=True).start()
+        self.refresh_models()
+        if self.selected_model():
+            self.preload_model(self.selected_model())
+        self.downloads.resume()
+        self.profile.mark("services")
+        if self.on_services_ready:
+            self.on_services_ready()
+
+    def _open_retrieval(self):
+        """Loads numpy and maps the index off the Tk thread; replies go without retrieval until it is ready."""
+        from retrieval import RetrievalIndex, HAS_NUMPY
+        if not HAS_NUMPY:
+            self.post({"type": "status", "text": "Retrieval off: needs numpy"})
+            return
+        index = RetrievalIndex(self.config["retrieval_index_dir"], self.client, self.config["embedding_model"])
+        self.post({"type": "retrieval_ready", "index": index})
+
+    def server_urls(self):
+        return normalize_urls([self.config.get("ollama_url", "http://localhost:11434")] + self.config["ollama_servers"])
+
+    def restore_last_session(self):
+        """Reopens the session open at the last exit, newest page only."""
+        session_id = self.config.get("last_session")
+        if session_id is not None and any(s["id"] == session_id for s in self.sessions):
+            self.open_session(session_id)
+
+    def make_client(self, base_url):
+        from ollama_client import OllamaClient
+        return OllamaClient(base_url=base_url,
+                            pool_size=self.config["http_pool_size"],
+                            connect_timeout=self.config["connect_timeout"],
+                            read_timeout=self.config["read_timeout"],
+                            max_retries=self.config["max_retries"],
+                            connect_retries=POOL_CONNECT_RETRIES,
+                            keep_alive=self.config["keep_alive"],
+                            default_keep_alive=self.config["default_keep_alive"])
 
     def create_sidebar(self):
         self.sidebar_frame = ctk.CTkFrame(self, width=200, corner_radius=0)
         self.sidebar_frame.grid(row=0, column=0, rowspan=2, sticky="nsew")
-        self.sidebar_frame.grid_rowconfigure(7, weight=1)
+        self.sidebar_frame.grid_rowconfigure(10, weight=1)
 
         self.logo_label = ctk.CTkLabel(self.sidebar_frame, text="Ollama Chat", font=ctk.CTkFont(size=20, weight="bold"))
         self.logo_label.grid(row=0, column=0, padx=20, pady=(20, 10))
@@ -180,34 +484,126 @@ class OllamaApp(ctk.CTk):
         self.model_label = ctk.CTkLabel(self.sidebar_frame, text="Model:", anchor="w")
         self.model_label.grid(row=1, column=0, padx=20, pady=(10, 0))
 
-        self.model_option_menu = ctk.CTkOptionMenu(self.sidebar_frame, values=["Loading..."], command=self.on_model_change)
-        self.model_option_menu.grid(row=2, column=0, padx=20, pady=(10, 10))
+        self.model_option_menu = ctk.CTkOptionMenu(self.sidebar_frame, values=["Loading..."], command=self.on_model_pick,
+                                                   width=160, dynamic_resizing=False)
+        self.model_option_menu.grid(row=2, column=0, padx=20, pady=(10, 0))
+
+        # Load cost of the selected model, shown when it is picked rather than on the first prompt
+        self.model_status_label = ctk.CTkLabel(self.sidebar_frame, text="", text_color="gray70", font=ctk.CTkFont(size=12))
+        self.model_status_label.grid(row=3, column=0, padx=20, pady=(0, 5))
         
         self.pull_model_btn = ctk.CTkButton(self.sidebar_frame, text="+ Pull Model", command=self.open_pull_dialog, fg_color="transparent", border_width=1, text_color=("gray10", "#DCE4EE"))
-        self.pull_model_btn.grid(row=3, column=0, padx=20, pady=(0, 10))
+        self.pull_model_btn.grid(row=4, column=0, padx=20, pady=(0, 10))
 
-        self.clear_btn = ctk.CTkButton(self.sidebar_frame, text="Clear Chat", command=self.clear_chat, fg_color="transparent", border_width=2, text_color=("gray10", "#DCE4EE"))
-        self.clear_btn.grid(row=4, column=0, padx=20, pady=(10, 10))
+        self.clear_btn = ctk.CTkButton(self.sidebar_frame, text="New Chat", command=self.new_chat, fg_color="transparent", border_width=2, text_color=("gray10", "#DCE4EE"))
+        self.clear_btn.grid(row=5, column=0, padx=20, pady=(10, 10))
+        
+        self.save_btn = ctk.CTkButton(self.sidebar_frame, text="Export Chat", command=self.save_chat_history)
+        self.save_btn.grid(row=6, column=0, padx=20, pady=(10, 10))
         
-        self.save_btn = ctk.CTkButton(self.sidebar_frame, text="Save Chat", command=self.save_chat_history)
-        self.save_btn.grid(row=5, column=0, padx=20, pady=(10, 10))
+        self.load_btn = ctk.CTkButton(self.sidebar_frame, text="Import Chat", command=self.load_chat_history)
+        self.load_btn.grid(row=7, column=0, padx=20, pady=(10, 10))
         
-        self.load_btn = ctk.CTkButton(self.sidebar_frame, text="Load Chat", command=self.load_chat_history)
-        self.load_btn.grid(row=6, column=0, padx=20, pady=(10, 10))
+        self.compare_btn = ctk.CTkButton(self.sidebar_frame, text="Compare Models", command=self.open_compare_window)
+        self.compare_btn.grid(row=8, column=0, padx=20, pady=(10, 10))
+
+        self.monitor_btn = ctk.CTkButton(self.sidebar_frame, text="Loaded Models", command=self.open_model_monitor)
+        self.monitor_btn.grid(row=9, column=0, padx=20, pady=(10, 10))
+
+        # A plain Listbox: thousands of sessions cost one widget, not one button each
+        self.session_frame = ctk.CTkFrame(self.sidebar_frame, fg_color="transparent")
+        self.session_frame.grid(row=10, column=0, padx=(20, 10), pady=(10, 0), sticky="nsew")
+        self.session_frame.grid_columnconfigure(0, weight=1)
+        self.session_frame.grid_rowconfigure(1, weight=1)
+        self.search_entry = ctk.CTkEntry(self.session_frame, placeholder_text="Search chats")
+        self.search_entry.grid(row=0, column=0, columnspan=2, pady=(0, 6), sticky="ew")
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        self.search_entry.bind("<Escape>", self.clear_search)
+        self.session_list = tk.Listbox(self.session_frame, activestyle="none", borderwidth=0, highlightthickness=0,
+                                       bg=AI_BG_COLOR, fg="#DCE4EE", selectbackground=BORDER_COLOR,
+                                       selectforeground="#000000", font=("Roboto", 12), exportselection=False)
+        self.session_list.grid(row=1, column=0, sticky="nsew")
+        self.session_scrollbar = ctk.CTkScrollbar(self.session_frame, command=self.session_list.yview)
+        self.session_scrollbar.grid(row=1, column=1, sticky="ns")
+        self.session_list.configure(yscrollcommand=self.session_scrollbar.set)
+        self.session_list.bind("<<ListboxSelect>>", self.on_session_select)
         
         self.settings_btn = ctk.CTkButton(self.sidebar_frame, text="Settings", command=self.open_settings)
-        self.settings_btn.grid(row=8, column=0, padx=20, pady=(10, 20))
+        self.settings_btn.grid(row=11, column=0, padx=20, pady=(10, 20))
 
     def open_pull_dialog(self):
-        PullModelDialog(self, self.client, on_complete=self.load_models)
+        # One Downloads window, hidden when closed; the pulls themselves live in self.downloads
+        self.start_services()
+        if self.pull_dialog is not None and self.pull_dialog.winfo_exists():
+            self.pull_dialog.show()
+            return
+        self.pull_dialog = PullModelDialog(self, self.downloads, refresh_ms=self.config["download_refresh_ms"])
+
+    def open_compare_window(self):
+        if not self.available_models:
+            messagebox.showerror("Error", "No models available.")
+            return
+        self.start_services()
+        from compare_view import CompareWindow
+        CompareWindow(self, self.client.primary_url, self.available_models, self.ui, display_factory=RichTextDisplay,
+                      system_prompt=self.system_prompt, max_streams=self.config["compare_max_streams"],
+                      connect_timeout=self.config["connect_timeout"], read_timeout=self.config["read_timeout"])
+
+    def open_model_monitor(self):
+        # One Loaded Models window (and /api/ps poller), hidden when closed
+        self.start_services()
+        if self.model_monitor is not None and self.model_monitor.winfo_exists():
+            self.model_monitor.show()
+            return
+        self.model_monitor = LoadedModelsWindow(self, self.client, self.ui, poll_interval=self.config["ps_poll_interval"])
+
+    def selected_model(self):
+        """Name of the model picked in the sidebar, or None while there is none."""
+        return self.model_labels.get(self.model_option_menu.get())
+
+    def on_model_pick(self, label):
+        self.on_model_change(self.model_labels[label])
 
     def on_model_change(self, selected_model):
         self.config["last_model"] = selected_model
         ConfigManager.save_config(self.config)
+        self.preload_model(selected_model)
+
+    def preload_model(self, model):
+        """Loads the model in the background so its load time is paid (and shown) now, not on the first prompt."""
+        if self.config["preload_on_select"] and self.client is not None:
+            threading.Thread(target=self._preload_thread, args=(model,), daemon=True).start()
+
+    def model_options(self, model):
+        """
+        Ollama options for `model`, for chats and preloads alike. num_ctx is
+        sent only if a context size is configured for the model in
+        context_tokens, and one in model_options wins; otherwise the
+        Modelfile's or the server's default applies.
+        """
+        per_model = self.config["model_options"].get(model, {})
+        options = {**self.config["default_model_options"], **per_model}
+        if "num_ctx" not in per_model and model in self.config["context_tokens"]:
+            options["num_ctx"] = self.config["context_tokens"][model]
+        return options
+
+    def _preload_thread(self, model):
+        self.post({"type": "model_status", "model": model, "text": "Loading model..."})
+        result = self.client.load_model(model, options=self.model_options(model))
+        if "error" in result:
+            text = "Load failed"
+        elif result.get("load_duration", 0) > 5e8:
+            text = f"Loaded in {result['load_duration'] / 1e9:.1f}s"
+        else:
+            text = "Ready"
+        if "host" in result and len(self.client.hosts) > 1:
+            text += f" on {result['host'].split('//')[-1]}"
+        self.post({"type": "model_status", "model": model, "text": text})
 
     def create_chat_area(self):
-        self.chat_frame = ctk.CTkScrollableFrame(self, label_text="Conversation")
-        self.chat_frame.grid(row=0, column=1, padx=(10, 10), pady=(10, 0), sticky="nsew")
+        self.transcript = VirtualTranscript(self, row_factory=ChatMessage, label_text="Conversation",
+                                            on_reach_top=self.load_older_messages)
+        self.transcript.grid(row=0, column=1, padx=(10, 10), pady=(10, 0), sticky="nsew")
 
     def create_input_area(self):
         self.input_frame = ctk.CTkFrame(self, height=80)
@@ -221,21 +617,69 @@ class OllamaApp(ctk.CTk):
         self.send_btn = ctk.CTkButton(self.input_frame, text="Send", command=self.handle_send_click, height=40)
         self.send_btn.grid(row=0, column=1, padx=(0, 10), pady=10)
 
+        self.regenerate_btn = ctk.CTkButton(self.input_frame, text="↻", width=40, height=40, command=self.regenerate)
+        self.regenerate_btn.grid(row=0, column=2, padx=(0, 10), pady=10)
+
     def load_models(self):
-        threading.Thread(target=self._fetch_models_thread, daemon=True).start()
-
-    def _fetch_models_thread(self):
-        models = self.client.get_models()
-        if models:
-            self.model_option_menu.configure(values=models)
-            last_model = self.config.get("last_model")
-            if last_model and last_model in models:
-                self.model_option_menu.set(last_model)
+        """Shows the cached model list for the current server at once, then refreshes it in the background."""
+        self.show_cached_models()
+        self.refresh_models()
+
+    def show_cached_models(self):
+        # Keyed like ServerPool.base_url, which needn't exist yet
+        cached = self.catalog.models(", ".join(self.server_urls()))
+        if cached:
+            self.show_models(cached, preload=False)
+        else:
+            self.model_labels = {}
+            self.model_option_menu.configure(values=["Loading..."])
+            self.model_option_menu.set("Loading...")
+
+    def refresh_models(self):
+        threading.Thread(target=self._fetch_models_thread, args=(self.client.base_url,), daemon=True).start()
+
+    def _fetch_models_thread(self, base_url):
+        self.post({"type": "models", "base_url": base_url, "models": self.client.list_models()})
+
+    def on_models_fetched(self, base_url, models):
+        if base_url != self.client.base_url:
+            return  # the server was changed in the meantime
+        if models is None:
+            if not self.available_models:
+                self.model_option_menu.configure(values=["No Connection"])
+                self.model_option_menu.set("No Connection")
             else:
-                self.model_option_menu.set(models[0])
-                self.on_model_change(models[0])
+                self.model_status_label.configure(text="Offline, showing cached models")
+            return
+        if self.catalog.update(base_url, models) or not self.available_models:
+            self.show_models(models)
+
+    def show_models(self, models, preload=True):
+        previous = self.selected_model()
+        self.available_models = [m["name"] for m in models]
+        self.model_digests = {m["name"]: m.get("digest", "") for m in models}
+        if not models:
+            self.model_labels = {}
+            self.model_option_menu.configure(values=["No Models"])
+            self.model_option_menu.set("No Models")
+            return
+        self.model_labels = {}
+        for model in models:
+            details = describe_model(model)
+            self.model_labels[f"{model['name']}  ({details})" if details else model["name"]] = model["name"]
+        labels = {name: label for label, name in self.model_labels.items()}
+        self.model_option_menu.configure(values=list(self.model_labels))
+        last_model = self.config.get("last_model")
+        if last_model and last_model in labels:
+            self.model_option_menu.set(labels[last_model])
+            if last_model != previous and preload:
+                self.preload_model(last_model)
         else:
-            self.model_option_menu.configure(values=["No Connection"])
+            self.model_option_menu.set(labels[self.available_models[0]])
+            self.config["last_model"] = self.available_models[0]
+            ConfigManager.save_config(self.config)
+            if preload:
+                self.preload_model(self.available_models[0])
 
     def handle_enter(self, event):
         if event.state & 1: return None 
@@ -249,113 +693,433 @@ class OllamaApp(ctk.CTk):
     def start_generation(self):
         text = self.entry.get("0.0", "end").strip()
         if not text: return
+        # Checked before anything is shown or saved; the prompt stays in the box
+        model = self.selected_model()
+        if model is None:
+            messagebox.showerror("Error", "No model selected.")
+            return
+        self.start_services()
         self.entry.delete("0.0", "end")
+        # The context builder needs the whole session, not just the pages on screen
+        self.load_older_messages(everything=True)
         
         self.add_message("user", text)
         self.chat_history.append({"role": "user", "content": text})
-        
-        model = self.model_option_menu.get()
-        if model == "Loading..." or model == "No Connection":
-            messagebox.showerror("Error", "No model selected.")
-            return
+        self.store_message("user", text, model)
+        self.generate(model)
 
+    def generate(self, model):
+        """Streams a reply to the history as it stands into a new assistant row."""
         self.is_generating = True
         self.stop_event.clear()
         self.send_btn.configure(text="Stop", fg_color="#C62828", hover_color="#B71C1C")
         
         self.full_response_buffer = ""
-        self.current_ai_message = self.add_message("assistant", "")
+        self.thinking_buffer = ""
+        self.current_ai_message = self.add_message("assistant", "", streaming=True)
+        self.current_metrics = GenerationMetrics(model, self.client.base_url)
         
-        threading.Thread(target=self._generate_thread, args=(model, list(self.chat_history), self.system_prompt), daemon=True).start()
+        # The thread gets the history itself, not a copy; nothing appends to it until finish_generation
+        threading.Thread(target=self._generate_thread, args=(model, self.chat_history, self.system_prompt, self.session_id,
+                                                             self.history_generation),
+                         daemon=True).start()
 
     def stop_generation(self):
         self.stop_event.set()
 
-    def _generate_thread(self, model, history, system_prompt):
-        for chunk in self.client.chat_stream(model, history, system_prompt, self.stop_event):
+    def regenerate(self):
+        """
+        Replaces the last reply with a new one. A reply still streaming is
+        stopped first; its connection is closed right away, so the new one
+        doesn't queue behind it on the server.
+        """
+        if self.is_generating:
+            self.regenerate_pending = True
+            self.stop_generation()
+            return
+        self.start_services()
+        model = self.selected_model()
+        if model is None:
+            return
+        self.load_older_messages(everything=True)
+        if self.chat_history and self.chat_history[-1]["role"] == "assistant":
+            self.chat_history.pop()
+            if self.transcript.messages and self.transcript.messages[-1]["role"] == "assistant":
+                self.transcript.pop_message()
+            self.current_ai_message = None
+            if self.session_id is not None:
+                try:
+                    popped = self.store.pop_message(self.session_id)
+                except sqlite3.Error as e:
+                    messagebox.showerror("Error", f"Failed to remove the reply: {e}")
+                    popped = None
+                if popped and self.retrieval:
+                    threading.Thread(target=self.retrieval.forget_message,
+                                     args=(self.session_id, popped["role"], popped["content"]), daemon=True).start()
+        # Also answers a prompt left without a reply (e.g. one whose reply was stopped by leaving the chat)
+        if self.chat_history:
+            self.generate(model)
+
+    def _generate_thread(self, model, history, system_prompt, session_id, generation):
+        if self.retrieval:
+            system_prompt = self.retrieve(history[-1]["content"], system_prompt, session_id)
+        # Built here rather than on the UI thread: the summarize policy may call the model
+        messages = self.context.build(model, history, system_prompt, key=(session_id, generation))
+        options = self.model_options(model)
+        # batch: one UI message per network read rather than per token
+        def live():
+            return self.client.chat_stream(model, messages, stop_event=self.stop_event, options=options, batch=True)
+        digest = self.model_digests.get(model)
+        if self.response_cache and digest and is_deterministic(options):
+            stream = self.response_cache.stream(cache_key(digest, messages, options=options), model, live,
+                                                stop_event=self.stop_event, paced=self.config["response_cache_paced"])
+        else:
+            stream = live()
+        for chunk in stream:
             if chunk["type"] == "content":
-                self.msg_queue.put({"type": "chunk", "content": chunk["content"]})
+                self.post({"type": "chunk", "content": chunk["content"], "tokens": chunk["tokens"], "t": time.perf_counter()})
+            elif chunk["type"] == "thinking":
+                self.post({"type": "thinking", "content": chunk["content"], "tokens": chunk["tokens"], "t": time.perf_counter()})
+            elif chunk["type"] == "stats":
+                self.context.estimator.observe(model, messages, chunk["stats"].get("prompt_eval_count"))
+                self.post({"type": "stats", "stats": chunk["stats"], "client": chunk["client"]})
             elif chunk["type"] == "error":
-                self.msg_queue.put({"type": "error", "message": chunk["content"]})
+                self.post({"type": "error", "message": chunk["content"]})
                 break
-        self.msg_queue.put({"type": "done"})
+        self.post({"type": "done"})
 
-    def check_queue(self):
-        try:
-            while True:
-                msg = self.msg_queue.get_nowait()
-                if msg["type"] == "chunk":
-                    delta = msg["content"]
-                    self.full_response_buffer += delta
-                    if self.current_ai_message:
-                        self.current_ai_message.append_text(delta)
-                        self.chat_frame._parent_canvas.yview_moveto(1.0)
-                        
-                elif msg["type"] == "done":
-                    self.finish_generation()
-                    
-                elif msg["type"] == "error":
-                    self.is_generating = False
-                    messagebox.showerror("Network Error", msg["message"])
-                    self.send_btn.configure(text="Send", fg_color=["#3B8ED0", "#1F6AA5"], hover_color=["#36719F", "#144870"])
-        except queue.Empty:
-            pass
-        
-        self.after(50, self.check_queue)
+    def retrieve(self, query, system_prompt, session_id):
+        """Appends the passages closest to the prompt to the system prompt, so the context budget accounts for them."""
+        start = time.perf_counter()
+        # The open conversation is in the context already
+        passages = self.retrieval.search(query, k=self.config["retrieval_top_k"], min_score=self.config["retrieval_min_score"],
+                                         exclude={f"chat:{session_id}"})
+        self.post({"type": "retrieval", "passages": len(passages), "ms": (time.perf_counter() - start) * 1000})
+        if not passages:
+            return system_prompt
+        from retrieval import format_passages
+        return (system_prompt + "\n\n" if system_prompt else "") + format_passages(passages)
+
+    def update_index(self, files=False):
+        """Embeds new chat messages (and, with `files`, changed files) in the background."""
+        if self.retrieval:
+            threading.Thread(target=self._index_thread, args=(files,), daemon=True).start()
+
+    def _index_thread(self, files):
+        if files and self.config["retrieval_paths"]:
+            counts = self.retrieval.index_files(self.config["retrieval_paths"])
+            if counts["failed"]:
+                self.post({"type": "status", "text": f"Retrieval: {counts['failed']} files not indexed"})
+        if self.config["retrieval_chats"]:
+            self.retrieval.index_sessions(self.store)
+
+    def post(self, msg):
+        """Hands a message to the Tk thread; safe from any thread. Adjacent chunks are merged while they wait."""
+        self.ui.post(self.handle_message, msg, merge=merge_chunks if msg["type"] in ("chunk", "thinking") else None)
+
+    def handle_message(self, msg):
+        if msg["type"] == "chunk":
+            delta = msg["content"]
+            self.full_response_buffer += delta
+            if self.current_ai_message is not None:
+                render_start = time.perf_counter()
+                self.transcript.append_text(self.current_ai_message, delta)
+                self.current_metrics.record_render(msg["t"], render_start, time.perf_counter(), msg["tokens"])
+
+        elif msg["type"] == "thinking":
+            self.thinking_buffer += msg["content"]
+            if self.current_ai_message is not None:
+                self.transcript.append_thinking(self.current_ai_message, msg["content"], msg["tokens"])
+                
+        elif msg["type"] == "stats":
+            if self.current_metrics:
+                self.current_metrics.stats = msg["stats"]
+                self.current_metrics.client = msg["client"]
+                self.current_metrics.server = msg["client"].get("host", self.current_metrics.server)
+            
+        elif msg["type"] == "retrieval":
+            if self.current_metrics:
+                self.current_metrics.passages = msg["passages"]
+                self.current_metrics.retrieval_ms = msg["ms"]
+
+        elif msg["type"] == "models":
+            self.on_models_fetched(msg["base_url"], msg["models"])
+
+        elif msg["type"] == "status":
+            self.model_status_label.configure(text=msg["text"])
+
+        elif msg["type"] == "services":
+            self.start_services()
+
+        elif msg["type"] == "retrieval_ready":
+            self.retrieval = msg["index"]
+            self.update_index(files=True)
+
+        elif msg["type"] == "pull_done":
+            self.load_models()
+
+        elif msg["type"] == "model_status":
+            if msg["model"] == self.selected_model():
+                self.model_status_label.configure(text=msg["text"])
+
+        elif msg["type"] == "done":
+            self.finish_generation()
+            
+        elif msg["type"] == "error":
+            # The "done" that follows drops the failed reply, so it isn't saved or sent as context
+            self.discard_reply = True
+            messagebox.showerror("Network Error", msg["message"])
 
     def finish_generation(self):
         self.is_generating = False
-        self.chat_history.append({"role": "assistant", "content": self.full_response_buffer})
+        if self.current_ai_message is not None:
+            self.transcript.finish_message(self.current_ai_message)
+            if self.current_metrics:
+                self.current_metrics.finish()
+                self.transcript.set_footer(self.current_ai_message, self.current_metrics.summary_text())
+                if self.metrics_log:
+                    self.metrics_log.append(self.current_metrics.to_record())
+        model = self.current_metrics.model if self.current_metrics else ""
+        self.current_metrics = None
         self.send_btn.configure(text="Send", fg_color=["#3B8ED0", "#1F6AA5"], hover_color=["#36719F", "#144870"])
+        if self.regenerate_pending or self.discard_reply:
+            # The reply failed, is about to be replaced, or its chat was left: it is neither kept, stored nor indexed
+            self.discard_reply = False
+            if self.current_ai_message is not None:
+                self.transcript.pop_message()
+                self.current_ai_message = None
+            if self.regenerate_pending:
+                self.regenerate_pending = False
+                self.regenerate()
+            return
+        # A stopped reply stays in the history as far as it got, marked as stopped
+        cancelled = self.stop_event.is_set()
+        if cancelled and self.current_ai_message is not None:
+            self.transcript.messages[self.current_ai_message]["cancelled"] = True
+        # Saved with its reasoning in <think> tags, so a reopened session shows the same block
+        content = join_reasoning(self.full_response_buffer, self.thinking_buffer)
+        self.chat_history.append(self.history_entry("assistant", content, model))
+        self.store_message("assistant", content, model, cancelled=cancelled)
+        self.update_index()
+
+    def strip_reasoning_for(self, model):
+        return self.config["strip_reasoning"].get(model, self.config["default_strip_reasoning"])
 
-    def add_message(self, role, text):
-        msg = ChatMessage(self.chat_frame, role=role, text=text)
-        msg.pack(fill="x", padx=10, pady=5)
-        return msg
+    def history_entry(self, role, content, model=""):
+        """
+        A message as it goes into chat_history: without its reasoning if
+        strip_reasoning is on for `model`, the model the history will be sent to.
+        """
+        if role == "assistant" and self.strip_reasoning_for(model):
+            content = split_reasoning(content)[0]
+        return {"role": role, "content": content}
+
+    def transcript_entry(self, role, content, cancelled=False):
+        """A stored message as the transcript shows it: reasoning in its own, collapsed block."""
+        if role != "assistant":
+            return {"role": role, "content": content}
+        answer, thinking = split_reasoning(content)
+        entry = {"role": role, "content": answer, "thinking": thinking}
+        if cancelled:
+            entry.update(cancelled=True, footer="stopped")
+        return entry
+
+    def add_message(self, role, text, streaming=False):
+        """Appends a message to the transcript and returns its row index."""
+        return self.transcript.append_message({"role": role, "content": text}, streaming=streaming)
+
+    def new_chat(self):
+        self.clear_chat()
+        # Otherwise the next start would reopen the session just left
+        self.remember_session()
 
     def clear_chat(self):
-        for widget in self.chat_frame.winfo_children():
-            widget.destroy()
+        """Starts a new conversation; the session itself is created with its first message."""
+        if self.is_generating:
+            # The reply belongs to the chat being left; finish_generation drops it
+            self.discard_reply = True
+            self.regenerate_pending = False
+            self.stop_generation()
+        self.transcript.clear()
+        self.current_ai_message = None
         self.chat_history = []
+        self.history_generation += 1
+        self.session_id = None
+        self.session_oldest_seq = 0
+        self.session_list.selection_clear(0, "end")
+
+    # --- Sessions ------------------------------------------------------
+
+    def store_message(self, role, content, model="", cancelled=False):
+        """Appends a finished message to the current session, creating the session on the first one."""
+        try:
+            if self.session_id is None:
+                self.session_id = self.store.create_session(model=model)
+                self.remember_session()
+            self.store.append_message(self.session_id, role, content, model, cancelled=cancelled)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to save message: {e}")
+            return
+        self.refresh_session_list()
+
+    def refresh_session_list(self):
+        self.sessions = self.store.list_sessions()
+        if self.search_results is not None:
+            return
+        self.session_list.delete(0, "end")
+        self.session_list.insert("end", *[s["title"] or "Untitled" for s in self.sessions])
+        for i, session in enumerate(self.sessions):
+            if session["id"] == self.session_id:
+                self.session_list.selection_set(i)
+
+    def on_session_select(self, event=None):
+        selection = self.session_list.curselection()
+        if not selection:
+            return
+        if self.search_results is not None:
+            if selection[0] >= len(self.search_results):   # the "No matches" row
+                return
+            hit = self.search_results[selection[0]]
+            session_id, seq = hit["session_id"], hit["seq"]
+        else:
+            session_id, seq = self.sessions[selection[0]]["id"], None
+        if session_id == self.session_id and seq is None:
+            return
+        if self.is_generating:
+            # Finish or stop the running reply first; it belongs to the open session
+            self.session_list.selection_clear(0, "end")
+            return
+        self.open_session(session_id, seq)
+
+    def open_session(self, session_id, at_seq=None):
+        """
+        Shows the newest page of a session, or everything from just above
+        message `at_seq` when jumping to a search hit. Older pages load as the
+        view reaches the top.
+        """
+        if at_seq is None:
+            page = self.store.load_messages(session_id)
+        else:
+            page = self.store.load_messages_from(session_id, max(0, at_seq - 2))
+        self.clear_chat()
+        self.session_id = session_id
+        self.session_oldest_seq = page[0]["seq"] if page else 0
+        model = self.selected_model()
+        self.chat_history = [self.history_entry(m["role"], m["content"], model) for m in page]
+        # The transcript gets its own dicts: streamed rows mutate theirs in place
+        self.transcript.set_messages([self.transcript_entry(m["role"], m["content"], m["cancelled"]) for m in page])
+        if at_seq is not None and page:
+            self.transcript.scroll_to_index(at_seq - page[0]["seq"])
+        self.remember_session()
+        self.refresh_session_list()
+
+    def remember_session(self):
+        """Records the open session so the next start can restore it."""
+        if self.config.get("last_session") != self.session_id:
+            self.config["last_session"] = self.session_id
+            ConfigManager.save_config(self.config)
+
+    # --- Search --------------------------------------------------------
+
+    def schedule_search(self, event=None):
+        """Searches once typing pauses rather than on every keystroke."""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(150, self.run_search)
+
+    def run_search(self):
+        self._search_job = None
+        text = self.search_entry.get().strip()
+        if not text:
+            self.search_results = None
+            self.refresh_session_list()
+            return
+        self.search_results = self.store.search(text)
+        self.session_list.delete(0, "end")
+        self.session_list.insert("end", *[f"{hit['title'] or 'Untitled'} — {hit['snippet']}" for hit in self.search_results])
+        if not self.search_results:
+            self.session_list.insert("end", "No matches")
+            self.session_list.itemconfigure(0, foreground="gray50")
+
+    def clear_search(self, event=None):
+        self.search_entry.delete(0, "end")
+        self.run_search()
+
+    def load_older_messages(self, everything=False):
+        if self.session_id is None or self.session_oldest_seq <= 0 or self.is_generating:
+            return
+        if everything:
+            older = self.store.load_messages(self.session_id, before=self.session_oldest_seq, limit=self.session_oldest_seq)
+        else:
+            older = self.store.load_messages(self.session_id, before=self.session_oldest_seq)
+        if not older:
+            self.session_oldest_seq = 0
+            return
+        self.session_oldest_seq = older[0]["seq"]
+        model = self.selected_model()
+        self.chat_history = [self.history_entry(m["role"], m["content"], model) for m in older] + self.chat_history
+        self.history_generation += 1
+        self.transcript.prepend_messages([self.transcript_entry(m["role"], m["content"], m["cancelled"]) for m in older])
 
     def open_settings(self):
-        SettingsDialog(self, self.client.base_url, self.system_prompt)
+        if self.settings_dialog is None or not self.settings_dialog.winfo_exists():
+            self.settings_dialog = SettingsDialog(self)
+        self.settings_dialog.show(", ".join(self.server_urls()), self.system_prompt)
         
     def update_settings(self, new_url, new_prompt):
-        self.client.base_url = new_url
+        self.start_services()
+        urls = [url.strip() for url in re.split(r"[,\s]+", new_url) if url.strip()] or ["http://localhost:11434"]
+        self.client.set_urls(urls)
         self.system_prompt = new_prompt
-        self.config["ollama_url"] = new_url
+        self.config["ollama_url"] = urls[0]
+        self.config["ollama_servers"] = urls[1:]
         self.config["system_prompt"] = new_prompt
         ConfigManager.save_config(self.config)
         self.load_models()
 
     def save_chat_history(self):
-        if not self.chat_history:
+        """Exports the open session in the JSON format the old Save Chat wrote."""
+        if self.session_id is None:
             messagebox.showwarning("Warning", "No chat history to save.")
             return
         file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
         if file_path:
             try:
-                with open(file_path, 'w') as f:
-                    json.dump(self.chat_history, f, indent=4)
+                self.store.export_json(self.session_id, file_path)
                 messagebox.showinfo("Success", "Chat history saved successfully.")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save file: {e}")
 
     def load_chat_history(self):
+        """Imports a JSON chat file as a new session and opens it."""
         file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
         if file_path:
+            if self.is_generating:
+                messagebox.showwarning("Warning", "Wait for the current reply to finish.")
+                return
             try:
-                with open(file_path, 'r') as f:
-                    loaded_history = json.load(f)
-                self.clear_chat()
-                self.chat_history = loaded_history
-                for msg in self.chat_history:
-                    self.add_message(msg["role"], msg["content"])
-                messagebox.showinfo("Success", "Chat history loaded successfully.")
+                session_id = self.store.import_json(file_path)
+                self.open_session(session_id)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load file: {e}")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ollama Chat Pro")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print the time spent in each startup phase once the window is up, then exit")
+    args = parser.parse_args(argv)
+
+    profile = StartupProfile(start=_IMPORT_START)
+    profile.mark("imports")
+    setup_theme()
+    profile.mark("theme")
+    app = OllamaApp(profile)
+    if args.profile_startup:
+        def report():
+            print(profile.report())
+            app.destroy()
+        app.on_services_ready = lambda: app.after_idle(report)
+    app.mainloop()
+
 if __name__ == "__main__":
-    app = OllamaApp()
-    app.mainloop()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -1,58 +1,376 @@
 import requests
-import json
+import socket
 import threading
-from typing import List, Dict, Generator, Any
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from typing import List, Dict, Generator, Any, Callable, Optional
+
+from ndjson_stream import NDJSONDecoder, iter_ndjson, READ_SIZE
+from reasoning import ThinkSplitter, split_reasoning
+
+# Timing fields Ollama puts on the final ("done") chunk of a stream
+STAT_FIELDS = ("total_duration", "load_duration", "prompt_eval_count",
+               "prompt_eval_duration", "eval_count", "eval_duration")
+
+class StopSignal(threading.Event):
+    """
+    A threading.Event that also runs callbacks when it is set. chat_stream
+    registers one that closes its connection, so Stop takes effect at once,
+    even while the request is blocked waiting on prompt evaluation, and
+    Ollama sees the client go and stops generating. With a plain Event the
+    stream only notices at its next read.
+    """
+    def __init__(self):
+        super().__init__()
+        self._callbacks: List[Callable[[], None]] = []
+        self._callbacks_lock = threading.Lock()
+        self.set_at: Optional[float] = None   # perf_counter() of the last set()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Runs callback() on set(), or right away if already set."""
+        with self._callbacks_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._callbacks_lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def set(self):
+        with self._callbacks_lock:
+            if self.is_set():
+                return
+            self.set_at = time.perf_counter()
+            super().set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def clear(self):
+        super().clear()
+        self.set_at = None
+
+def _shutdown(sock: Optional[socket.socket]):
+    if sock is not None:
+        try:
+            # shutdown() rather than close(): it wakes a recv() blocked in another thread
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+# The AbortableRequest the current thread is sending, if any; read by the connections below
+_sending = threading.local()
+
+class AbortableRequest:
+    """Handle on one request's connection so another thread can cut it."""
+    def __init__(self):
+        self.aborted = False
+        self.connection: Optional[HTTPConnection] = None
+
+    def abort(self):
+        self.aborted = True
+        connection = self.connection
+        if connection is not None:
+            _shutdown(connection.sock)
+
+class _AbortableConnectionMixin:
+    def request(self, *args, **kwargs):
+        request = getattr(_sending, "request", None)
+        if request is not None:
+            request.connection = self
+        super().request(*args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        # Covers an abort() that ran while the socket was still being opened
+        request = getattr(_sending, "request", None)
+        if request is not None and request.aborted:
+            _shutdown(self.sock)
+        return super().getresponse(*args, **kwargs)
+
+class _AbortableHTTPConnection(_AbortableConnectionMixin, HTTPConnection):
+    pass
+
+class _AbortableHTTPSConnection(_AbortableConnectionMixin, HTTPSConnection):
+    pass
+
+class _AbortableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _AbortableHTTPConnection
+
+class _AbortableHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _AbortableHTTPSConnection
+
+class _AbortableAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections register with the AbortableRequest being sent on their thread."""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _AbortableHTTPConnectionPool,
+                                                   "https": _AbortableHTTPSConnectionPool}
 
 class OllamaClient:
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    # Builds the decoder for each streamed response; swap in one with a different `loads` to change JSON backend
+    decoder_factory = NDJSONDecoder
+
+    def __init__(self, base_url: str = "http://localhost:11434", pool_size: int = 10,
+                 connect_timeout: float = 5.0, read_timeout: float = 300.0,
+                 max_retries: int = 3, backoff_factor: float = 0.5, probe_timeout: float = 5.0,
+                 connect_retries: Optional[int] = None,
+                 keep_alive: Optional[Dict[str, Any]] = None, default_keep_alive: Any = None):
         self.base_url = base_url.rstrip('/')
+        # How long Ollama keeps each model loaded after a request ("10m", "1h", -1 = forever,
+        # 0 = unload at once); models without an entry get default_keep_alive, None = server default
+        self.keep_alive = keep_alive or {}
+        self.default_keep_alive = default_keep_alive
+        # (connect, read): read is the longest silence tolerated between bytes,
+        # which has to cover prompt evaluation and model load on the server.
+        self.timeout = (connect_timeout, read_timeout)
+        # Listings (/api/tags, /api/ps) answer at once when the server is up, so
+        # a short read timeout lets "No Connection" show without a long wait.
+        self.probe_timeout = (connect_timeout, probe_timeout)
+        self.session = self._create_session(pool_size, max_retries, backoff_factor,
+                                            max_retries if connect_retries is None else connect_retries)
 
-    def get_models(self) -> List[str]:
+    def _create_session(self, pool_size: int, max_retries: int, backoff_factor: float,
+                        connect_retries: int) -> requests.Session:
         """
-        Fetches the list of available models from the Ollama server.
+        One keep-alive session per client so every call reuses pooled connections
+        instead of paying TCP/TLS setup per request.
+        """
+        # Connection errors are retried for every method (nothing reached the
+        # server); read errors and 5xx responses only for idempotent GETs.
+        retry = Retry(total=max_retries, connect=connect_retries, read=max_retries, status=max_retries,
+                      backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False)
+        self._adapter = _AbortableAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        # Listings get one retry, and none after a read timeout: the pool probes them again soon anyway
+        self._probe_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2,
+                                          max_retries=Retry(total=1, read=0, backoff_factor=backoff_factor,
+                                                            raise_on_status=False))
+        session = requests.Session()
+        session.mount("http://", self._adapter)
+        session.mount("https://", self._adapter)
+        # requests picks the adapter with the longest matching prefix
+        for path in ("/api/tags", "/api/ps"):
+            session.mount(self.base_url + path, self._probe_adapter)
+        return session
+
+    def connection_stats(self) -> Dict[str, int]:
+        """
+        Requests sent and connections opened by the live connection pools.
+        `reused` is how many requests went out on an already-open connection.
+        """
+        sent = opened = 0
+        for adapter in (self._adapter, self._probe_adapter):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    sent += pool.num_requests
+                    opened += pool.num_connections
+        return {"requests": sent, "connections": opened, "reused": max(0, sent - opened)}
+
+    def close(self):
+        self.session.close()
+
+    def keep_alive_for(self, model: str) -> Any:
+        value = self.keep_alive.get(model, self.default_keep_alive)
+        return None if value == "" else value
+
+    def list_models(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        The server's local models (/api/tags) with their metadata: name, size,
+        digest, modified_at and details (family, parameter_size,
+        quantization_level). None if the server can't be reached.
         """
         try:
-            # Note: Ollama API endpoint for listing models is /api/tags
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=self.probe_timeout)
             response.raise_for_status()
-            data = response.json()
-            # Extract model names from the response
-            return [model['name'] for model in data.get('models', [])]
-        except requests.RequestException:
-            return []
+            return response.json().get('models', [])
+        except (requests.RequestException, ValueError):
+            return None
 
-    def chat_stream(self, model: str, messages: List[Dict[str, str]], system_prompt: str = None, stop_event: threading.Event = None) -> Generator[Dict[str, str], None, None]:
+    def get_models(self) -> List[str]:
+        """
+        Fetches the list of available models from the Ollama server.
+        """
+        return [model['name'] for model in self.list_models() or []]
+
+    def chat_stream(self, model: str, messages: List[Dict[str, str]], system_prompt: str = None, stop_event: threading.Event = None,
+                    options: Optional[Dict[str, Any]] = None, batch: bool = False) -> Generator[Dict[str, Any], None, None]:
         """
         Streams the chat response from the Ollama server.
-        Yields dictionaries: {"type": "content"|"error", "content": str}
+        Yields dictionaries: {"type": "content"|"thinking"|"error", "content": str}, and
+        once the stream ends {"type": "stats", "stats": {...}, "client": {...}}
+        with Ollama's timings (empty if stopped early) and the client-side
+        ttfb_ms / first_token_ms / stream_ms. `messages` is never modified.
+        With `batch`, all deltas that arrived in one read are joined into a
+        single content event, which also carries their number as "tokens".
+        Reasoning, whether in Ollama's message.thinking field or in <think>
+        tags inside the content, comes as "thinking" events instead of
+        "content" ones (ahead of the read's content in batch mode).
+        If `stop_event` is a StopSignal, setting it closes the connection at
+        once; the stream then ends with a stats event whose "client" dict
+        has "cancelled" and, as "stop_ms", how long the stream took to end
+        after Stop. No error event is yielded for a stopped stream. An error
+        event's "retryable" is true when the server couldn't be reached or
+        timed out, false when it answered with an error (e.g. HTTP 404).
         """
+        if system_prompt:
+            messages = [{"role": "system", "content": system_prompt}] + messages
         payload = {
             "model": model,
             "messages": messages,
             "stream": True
         }
-        
-        if system_prompt:
-             # Insert system prompt at the beginning if provided
-             payload["messages"].insert(0, {"role": "system", "content": system_prompt})
+        if options:
+            payload["options"] = options
+        keep_alive = self.keep_alive_for(model)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
 
+        request = AbortableRequest()
+        if isinstance(stop_event, StopSignal):
+            stop_event.add_callback(request.abort)
+        sent = time.perf_counter()
+        client = {}
+        server = {}
         try:
-            with requests.post(f"{self.base_url}/api/chat", json=payload, stream=True, timeout=30) as response:
+            _sending.request = request
+            try:
+                response = self.session.post(f"{self.base_url}/api/chat", json=payload, stream=True, timeout=self.timeout)
+            finally:
+                _sending.request = None
+            with response:
+                client["ttfb_ms"] = (time.perf_counter() - sent) * 1000
                 response.raise_for_status()
-                for line in response.iter_lines():
+                splitter = ThinkSplitter()
+                for bodies in iter_ndjson(response.iter_content(READ_SIZE), self.decoder_factory()):
                     if stop_event and stop_event.is_set():
                         break
-                    if line:
-                        try:
-                            body = json.loads(line.decode('utf-8'))
-                            if "message" in body and "content" in body["message"]:
-                                yield {"type": "content", "content": body["message"]["content"]}
-                            if body.get("done", False):
+                    parts = []   # (event type, delta) in arrival order
+                    final = None
+                    for body in bodies:
+                        message = body.get("message") or {}
+                        if message.get("thinking"):
+                            parts.append(("thinking", message["thinking"]))
+                        if message.get("content"):
+                            answer, thinking = splitter.feed(message["content"])
+                            if thinking:
+                                parts.append(("thinking", thinking))
+                            if answer:
+                                parts.append(("content", answer))
+                        if body.get("done", False):
+                            final = body
+                            break
+                    if final is not None:
+                        answer, thinking = splitter.flush()
+                        parts.extend((kind, text) for kind, text in (("thinking", thinking), ("content", answer)) if text)
+                    if "first_token_ms" not in client and parts:
+                        client["first_token_ms"] = (time.perf_counter() - sent) * 1000
+                    if batch:
+                        for kind in ("thinking", "content"):
+                            deltas = [text for part, text in parts if part == kind]
+                            if deltas:
+                                yield {"type": kind, "content": "".join(deltas), "tokens": len(deltas)}
+                    else:
+                        for kind, delta in parts:
+                            if stop_event and stop_event.is_set():
                                 break
-                        except json.JSONDecodeError:
-                            continue
+                            yield {"type": kind, "content": delta}
+                    if final is not None:
+                        server = {k: final[k] for k in STAT_FIELDS if k in final}
+                        break
         except requests.RequestException as e:
-            yield {"type": "error", "content": str(e)}
+            if not request.aborted:
+                # Only a server that couldn't be reached (or didn't answer in time) is worth trying elsewhere
+                retryable = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                yield {"type": "error", "content": str(e), "retryable": retryable}
+                return
+        finally:
+            if isinstance(stop_event, StopSignal):
+                stop_event.remove_callback(request.abort)
+        client["stream_ms"] = (time.perf_counter() - sent) * 1000
+        if stop_event is not None and stop_event.is_set():
+            client["cancelled"] = True
+            if getattr(stop_event, "set_at", None) is not None:
+                client["stop_ms"] = (time.perf_counter() - stop_event.set_at) * 1000
+        yield {"type": "stats", "stats": server, "client": client}
+
+    def complete(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Non-streaming chat call for internal helpers (e.g. summaries). Returns '' on failure.
+        """
+        payload = {"model": model, "messages": messages, "stream": False}
+        if options:
+            payload["options"] = options
+        keep_alive = self.keep_alive_for(model)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        try:
+            response = self.session.post(f"{self.base_url}/api/chat", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            # Reasoning in <think> tags isn't part of the answer
+            return split_reasoning(response.json().get("message", {}).get("content", ""))[0]
+        except (requests.RequestException, ValueError):
+            return ""
+
+    def load_model(self, model: str, keep_alive: Any = None, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Loads a model into memory without generating anything (a /api/generate
+        request with no prompt). Returns Ollama's reply, whose load_duration is
+        the load cost, or {"error": str}. keep_alive defaults to keep_alive_for(model).
+        Pass the options later chats will use: a different num_ctx makes Ollama
+        load the model again.
+        """
+        payload = {"model": model, "stream": False}
+        if options:
+            payload["options"] = options
+        keep_alive = keep_alive if keep_alive is not None else self.keep_alive_for(model)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        try:
+            response = self.session.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            return {"error": str(e)}
+
+    def unload_model(self, model: str) -> Dict[str, Any]:
+        """Asks Ollama to free the model's memory now."""
+        return self.load_model(model, keep_alive=0)
+
+    def embed(self, model: str, texts: List[str]) -> Optional[List[List[float]]]:
+        """
+        Embeddings for `texts` from one /api/embed request, in order. None if
+        the request fails (e.g. the model doesn't exist or can't embed).
+        """
+        payload = {"model": model, "input": texts}
+        keep_alive = self.keep_alive_for(model)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        try:
+            response = self.session.post(f"{self.base_url}/api/embed", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json().get("embeddings")
+        except (requests.RequestException, ValueError):
+            return None
+
+    def running_models(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Models currently in memory (/api/ps): name, size, size_vram, expires_at,
+        details. None if the server can't be reached.
+        """
+        try:
+            response = self.session.get(f"{self.base_url}/api/ps", timeout=self.probe_timeout)
+            response.raise_for_status()
+            return response.json().get("models", [])
+        except (requests.RequestException, ValueError):
+            return None
 
     def pull_model(self, name: str) -> Generator[Dict[str, Any], None, None]:
         """
@@ -60,13 +378,10 @@ class OllamaClient:
         """
         payload = {"name": name, "stream": True}
         try:
-            with requests.post(f"{self.base_url}/api/pull", json=payload, stream=True, timeout=None) as response:
+            # No read timeout: the server can go quiet for a long time while verifying layers
+            with self.session.post(f"{self.base_url}/api/pull", json=payload, stream=True, timeout=(self.timeout[0], None)) as response:
                 response.raise_for_status()
-                for line in response.iter_lines():
-                    if line:
-                        try:
-                            yield json.loads(line.decode('utf-8'))
-                        except json.JSONDecodeError:
-                            continue
+                for updates in iter_ndjson(response.iter_content(READ_SIZE), self.decoder_factory()):
+                    yield from updates
         except requests.RequestException as e:
             yield {"error": str(e)}
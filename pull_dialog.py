@@ -1,89 +1,152 @@
 import customtkinter as ctk
-import threading
-from tkinter import messagebox
+from typing import Dict, Any
+
+from model_catalog import format_bytes
+
+def format_eta(seconds) -> str:
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {seconds:02d}s"
 
 class PullModelDialog(ctk.CTkToplevel):
-    def __init__(self, parent, client, on_complete=None):
+    """
+    Downloads window: queue pulls by name and watch their progress. It only
+    displays the DownloadManager's state, redrawn `refresh_ms` apart while
+    anything is queued or downloading (and not at all otherwise), so it can
+    be closed and reopened at any time without affecting the pulls. Closing
+    only hides it; show() brings the same window back.
+    """
+    def __init__(self, parent, manager, refresh_ms: int = 250):
         super().__init__(parent)
-        self.title("Pull New Model")
-        self.geometry("400x250")
-        self.client = client
-        self.on_complete = on_complete
-        
+        self.title("Downloads")
+        self.geometry("520x420")
+        self.manager = manager
+        self.refresh_ms = refresh_ms
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self._refresh_job = None
+
         # UI Elements
         self.label = ctk.CTkLabel(self, text="Enter Model Name (e.g. 'llama3', 'deepseek-r1'):")
         self.label.pack(padx=20, pady=(20, 5), anchor="w")
-        
-        self.entry = ctk.CTkEntry(self, width=300)
-        self.entry.pack(padx=20, pady=5)
+
+        self.entry_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.entry_frame.pack(padx=20, pady=5, fill="x")
+        self.entry = ctk.CTkEntry(self.entry_frame)
+        self.entry.pack(side="left", fill="x", expand=True)
         self.entry.bind("<Return>", self.start_pull)
-        
-        self.progress_label = ctk.CTkLabel(self, text="")
-        self.progress_label.pack(padx=20, pady=(20, 5), anchor="w")
-        
-        self.progress_bar = ctk.CTkProgressBar(self, width=300)
-        self.progress_bar.set(0)
-        self.progress_bar.pack(padx=20, pady=5)
-        
-        self.pull_btn = ctk.CTkButton(self, text="Pull Model", command=self.start_pull)
-        self.pull_btn.pack(padx=20, pady=20)
-        
-        self.is_pulling = False
-        
-        # Focus
+        self.pull_btn = ctk.CTkButton(self.entry_frame, text="Pull Model", width=100, command=self.start_pull)
+        self.pull_btn.pack(side="left", padx=(10, 0))
+
+        self.summary_label = ctk.CTkLabel(self, text="", anchor="w")
+        self.summary_label.pack(padx=20, pady=(10, 0), fill="x")
+
+        self.list_frame = ctk.CTkScrollableFrame(self)
+        self.list_frame.pack(padx=10, pady=(5, 5), fill="both", expand=True)
+        self.list_frame.grid_columnconfigure(0, weight=1)
+
+        self.clear_btn = ctk.CTkButton(self, text="Clear Finished", fg_color="transparent", border_width=1,
+                                       command=self.clear_finished)
+        self.clear_btn.pack(padx=20, pady=(0, 15), anchor="e")
+
+        self.protocol("WM_DELETE_WINDOW", self.hide)
+        self.show()
+
+    def show(self):
+        self.deiconify()
         self.lift()
         self.focus_force()
-        self.after(100, self.grab_set)
+        self.entry.focus_set()
+        self.refresh()
+
+    def hide(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        self.withdraw()
 
     def start_pull(self, event=None):
-        if self.is_pulling:
-            return
-            
         model_name = self.entry.get().strip()
         if not model_name:
             return
-            
-        self.is_pulling = True
-        self.pull_btn.configure(state="disabled", text="Pulling...")
-        self.entry.configure(state="disabled")
-        
-        threading.Thread(target=self._pull_thread, args=(model_name,), daemon=True).start()
-        
-    def _pull_thread(self, model_name):
-        try:
-            for status in self.client.pull_model(model_name):
-                if "error" in status:
-                    self.after(0, lambda e=status["error"]: self.show_error(e))
-                    return
-                
-                # Update UI
-                self.after(0, lambda s=status: self.update_progress(s))
-                
-            self.after(0, self.finish_success)
-            
-        except Exception as e:
-             self.after(0, lambda: self.show_error(str(e)))
-
-    def update_progress(self, status):
-        msg = status.get("status", "")
-        
-        # Calculate progress if available
-        total = status.get("total")
-        completed = status.get("completed")
-        
-        if total and completed:
-            percent = completed / total
-            self.progress_bar.set(percent)
-            self.progress_label.configure(text=f"{msg} ({int(percent*100)}%)")
+        self.manager.enqueue(model_name)
+        self.entry.delete(0, "end")
+        self.refresh()
+
+    def clear_finished(self):
+        self.manager.clear_finished()
+        self.refresh()
+
+    def cancel(self, name: str):
+        self.manager.cancel(name)
+        self.refresh()
+
+    def retry(self, name: str):
+        self.manager.enqueue(name)
+        self.refresh()
+
+    def refresh(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        if not self.winfo_exists() or self.state() == "withdrawn":
+            return
+        jobs = self.manager.snapshot()
+        if [j["name"] for j in jobs] != list(self.rows):
+            for row in self.rows.values():
+                row["frame"].destroy()
+            self.rows = {job["name"]: self._make_row(i, job["name"]) for i, job in enumerate(jobs)}
+        for job in jobs:
+            self._update_row(self.rows[job["name"]], job)
+
+        totals = self.manager.totals(jobs)
+        if totals["active"]:
+            text = f"{totals['active']} active · {format_bytes(totals['completed'])} of {format_bytes(totals['total'])}"
+            if totals["rate"]:
+                text += f" · {format_bytes(totals['rate'])}/s · {format_eta(totals['eta'])} left"
+            self.summary_label.configure(text=text)
         else:
-            self.progress_label.configure(text=msg)
+            self.summary_label.configure(text="No active downloads." if jobs else "")
+        if totals["active"]:
+            self._refresh_job = self.after(self.refresh_ms, self.refresh)
 
-    def finish_success(self):
-        messagebox.showinfo("Success", "Model pulled successfully!")
-        self.destroy()
-        if self.on_complete:
-            self.on_complete()
+    def _make_row(self, index: int, name: str) -> Dict[str, Any]:
+        frame = ctk.CTkFrame(self.list_frame)
+        frame.grid(row=index, column=0, padx=5, pady=4, sticky="ew")
+        frame.grid_columnconfigure(0, weight=1)
+        title = ctk.CTkLabel(frame, text=name, font=ctk.CTkFont(weight="bold"), anchor="w")
+        title.grid(row=0, column=0, padx=10, pady=(6, 0), sticky="w")
+        progress_bar = ctk.CTkProgressBar(frame)
+        progress_bar.set(0)
+        progress_bar.grid(row=1, column=0, padx=10, pady=4, sticky="ew")
+        detail = ctk.CTkLabel(frame, text="", anchor="w", text_color="gray70")
+        detail.grid(row=2, column=0, padx=10, pady=(0, 6), sticky="w")
+        action = ctk.CTkButton(frame, text="Cancel", width=80)
+        action.grid(row=0, column=1, rowspan=3, padx=10)
+        return {"frame": frame, "progress_bar": progress_bar, "detail": detail, "action": action, "state": None}
+
+    def _update_row(self, row: Dict[str, Any], job: Dict[str, Any]):
+        if job["total"]:
+            row["progress_bar"].set(job["completed"] / job["total"])
+        if job["status"] == "pulling" and job["total"]:
+            detail = f"{job['message']} · {format_bytes(job['completed'])} of {format_bytes(job['total'])}"
+            if job["rate"]:
+                detail += f" · {format_bytes(job['rate'])}/s · {format_eta(job['eta'])} left"
+        elif job["status"] == "failed":
+            detail = f"Failed: {job['error']}"
+        else:
+            detail = job["message"]
+        row["detail"].configure(text=detail)
 
-    def show_error(self, error_msg):
-        messagebox.showerror("Error", f"Failed to pull model: {error_msg}")
-        self.destroy()
+        # Only touch the button when the job changes state
+        if row["state"] != job["status"]:
+            row["state"] = job["status"]
+            name = job["name"]
+            if job["status"] in ("queued", "pulling"):
+                row["action"].configure(text="Cancel", state="normal", command=lambda: self.cancel(name))
+            elif job["status"] == "done":
+                row["progress_bar"].set(1)
+                row["action"].configure(text="Done", state="disabled")
+            else:
+                row["action"].configure(text="Retry", state="normal", command=lambda: self.retry(name))
@@ -0,0 +1,70 @@
+import re
+from typing import Tuple
+
+OPEN_TAG = "<think>"
+CLOSE_TAG = "</think>"
+
+_BLOCK = re.compile(r"<think>(.*?)(?:</think>|\Z)\s*", re.DOTALL)
+
+class ThinkSplitter:
+    """
+    Separates `<think>...</think>` reasoning from the answer in streamed text.
+
+    `feed()` takes the next delta and returns (answer, thinking), the parts
+    of it that are now known to be one or the other. A tag can arrive split
+    across deltas ("<thi", "nk>"), so a tail that could be the start of the
+    next tag is held back until the following delta decides it; text without
+    a "<" passes straight through.
+    """
+    def __init__(self):
+        self.thinking = False
+        self._pending = ""
+
+    def feed(self, text: str) -> Tuple[str, str]:
+        if not self._pending and "<" not in text:
+            return ("", text) if self.thinking else (text, "")
+        text = self._pending + text
+        self._pending = ""
+        answer, thinking = [], []
+        while text:
+            tag = CLOSE_TAG if self.thinking else OPEN_TAG
+            out = thinking if self.thinking else answer
+            at = text.find(tag)
+            if at >= 0:
+                out.append(text[:at])
+                text = text[at + len(tag):]
+                self.thinking = not self.thinking
+                continue
+            keep = self._partial_tag(text, tag)
+            out.append(text[:len(text) - keep])
+            self._pending = text[len(text) - keep:]
+            break
+        return "".join(answer), "".join(thinking)
+
+    def flush(self) -> Tuple[str, str]:
+        """Whatever is still held back, once the stream has ended."""
+        text, self._pending = self._pending, ""
+        return ("", text) if self.thinking else (text, "")
+
+    @staticmethod
+    def _partial_tag(text: str, tag: str) -> int:
+        """Length of the longest suffix of `text` that is a prefix of `tag`."""
+        start = text.find("<", max(0, len(text) - len(tag) + 1))
+        while start >= 0:
+            if tag.startswith(text[start:]):
+                return len(text) - start
+            start = text.find("<", start + 1)
+        return 0
+
+def split_reasoning(text: str) -> Tuple[str, str]:
+    """(answer, thinking) of a complete message, e.g. one loaded from a saved session."""
+    if OPEN_TAG not in text:
+        return text, ""
+    thinking = "\n\n".join(block.strip() for block in _BLOCK.findall(text))
+    return _BLOCK.sub("", text).lstrip(), thinking
+
+def join_reasoning(answer: str, thinking: str) -> str:
+    """The stored form of a reply: its reasoning wrapped in <think> tags ahead of the answer."""
+    if not thinking:
+        return answer
+    return f"{OPEN_TAG}{thinking}{CLOSE_TAG}\n\n{answer}"
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Generator, Any, Callable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    model      TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at    REAL NOT NULL,
+    size       INTEGER NOT NULL,
+    body       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_use ON responses (used_at);
+"""
+
+def is_deterministic(options: Optional[Dict[str, Any]]) -> bool:
+    """True when Ollama would give the same answer again: temperature 0 or a fixed seed."""
+    options = options or {}
+    return options.get("temperature") == 0 or options.get("seed") is not None
+
+def cache_key(digest: str, messages: List[Dict[str, str]], system_prompt: str = "",
+              options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    SHA-256 over everything that decides the answer. The model is identified
+    by its digest, so a re-pulled model with the same name misses.
+    """
+    payload = json.dumps({"digest": digest, "messages": messages, "system": system_prompt or "",
+                          "options": options or {}}, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Finished chat streams in a SQLite database, keyed by cache_key(). Each
+    entry keeps every content event with its offset from the request, plus
+    the final stats, so a hit replays through the same chat_stream event
+    path, at once or at the recorded pace. Entries are evicted least
+    recently used first once the bodies exceed `max_bytes`.
+    """
+    def __init__(self, path: str = "response_cache.db", max_bytes: int = 200 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, model: str, entry: Dict[str, Any]):
+        body = json.dumps(entry, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO responses (key, model, created_at, used_at, size, body) "
+                              "VALUES (?, ?, ?, ?, ?, ?)", (key, model, now, now, len(body), body))
+            self._evict()
+
+    def _evict(self):
+        """Drops least recently used entries until the total fits. Caller holds the lock."""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY used_at").fetchall():
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": size}
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM responses")
+
+    # --- Streaming -----------------------------------------------------
+
+    def stream(self, key: str, model: str, live: Callable[[], Generator[Dict[str, Any], None, None]],
+               stop_event: threading.Event = None, paced: bool = False) -> Generator[Dict[str, Any], None, None]:
+        """
+        Yields chat_stream events for `key`: replayed from the cache on a hit,
+        else from live() while recording them. Only streams that ran to the
+        end with the server's final stats are stored; stopped or failed ones
+        are not. Replayed stats carry "cached": True in their "client" dict.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            yield from self.replay(entry, stop_event, paced)
+            return
+        start = time.perf_counter()
+        events = []
+        for chunk in live():
+            if chunk["type"] == "content":
+                events.append([round(time.perf_counter() - start, 4), chunk["content"], chunk.get("tokens", 1)])
+            elif chunk["type"] == "thinking":
+                events.append([round(time.perf_counter() - start, 4), chunk["content"], chunk.get("tokens", 1), "thinking"])
+            elif chunk["type"] == "stats" and chunk["stats"] and not (stop_event and stop_event.is_set()):
+                self.put(key, model, {"events": events, "stats": chunk["stats"], "client": chunk["client"]})
+            yield chunk
+
+    def replay(self, entry: Dict[str, Any], stop_event: threading.Event = None,
+               paced: bool = False) -> Generator[Dict[str, Any], None, None]:
+        start = time.perf_counter()
+        client = {"ttfb_ms": 0.0, "cached": True}
+        for offset, content, tokens, *kind in entry["events"]:
+            if paced:
+                pause = offset - (time.perf_counter() - start)
+                if pause > 0:
+                    if stop_event:
+                        stop_event.wait(pause)
+                    else:
+                        time.sleep(pause)
+            if stop_event and stop_event.is_set():
+                break
+            if "first_token_ms" not in client and content:
+                client["first_token_ms"] = (time.perf_counter() - start) * 1000
+            yield {"type": kind[0] if kind else "content", "content": content, "tokens": tokens}
+        client["stream_ms"] = (time.perf_counter() - start) * 1000
+        stopped = stop_event is not None and stop_event.is_set()
+        if stopped:
+            # As OllamaClient.chat_stream reports a stopped stream
+            client["cancelled"] = True
+            if getattr(stop_event, "set_at", None) is not None:
+                client["stop_ms"] = (time.perf_counter() - stop_event.set_at) * 1000
+        yield {"type": "stats", "stats": {} if stopped else entry["stats"], "client": client}
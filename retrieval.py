@@ -0,0 +1,379 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Set
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    hash   TEXT NOT NULL,
+    mtime  REAL NOT NULL DEFAULT 0,
+    size   INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    row    INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    text   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_by_source ON chunks (source);
+"""
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".rst", ".org", ".adoc", ".tex", ".csv", ".json", ".yaml", ".yml",
+                   ".toml", ".ini", ".cfg", ".html", ".py", ".js", ".ts", ".c", ".h", ".cpp", ".rs", ".go",
+                   ".java", ".sh", ".sql"}
+MAX_FILE_BYTES = 2 * 1024 * 1024
+EMBED_BATCH = 64
+CHUNK_CHARS = 1200
+CHUNK_OVERLAP = 200
+
+def chunk_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Splits text into passages of at most `size` characters, cutting at
+    paragraph breaks where possible (else line, then word breaks); each
+    passage repeats the last `overlap` characters of the previous one.
+    """
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            for separator in ("\n\n", "\n", " "):
+                cut = text.rfind(separator, start + size // 2, end)
+                if cut > start:
+                    end = cut
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class RetrievalIndex:
+    """
+    Passages from local files and saved chats with their embeddings, for
+    top-k cosine search. Passage text and bookkeeping live in SQLite
+    (`index.db`); the vectors in a memory-mapped float32 matrix
+    (`vectors.f32`), one L2-normalized row per passage, so a search is one
+    matrix-vector product over the rows in use.
+
+    Indexing is incremental: a file is re-read only if its size or mtime
+    changed, and re-embedded only if its content hash changed; chats are
+    indexed by message id, so only messages added since the last run are
+    embedded. Rows of removed passages are zeroed and reused. Changing the
+    embedding model empties the index.
+    """
+    def __init__(self, directory: str, client, model: str):
+        if not HAS_NUMPY:
+            raise RuntimeError("numpy is required for retrieval (pip install numpy)")
+        self.directory = directory
+        self.client = client
+        self.model = model
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        # One connection shared by the indexing and UI threads, serialized by the lock;
+        # _index_lock keeps a single indexing pass (and its embedding calls) at a time
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+        self.dim = int(self._meta("dim", "0"))
+        self.vectors = None
+        self.alive = np.zeros(0, dtype=bool)
+        indexed_with = self._meta("model", "")
+        if indexed_with != model:
+            if indexed_with:
+                print(f"Embedding model changed to {model}; rebuilding the retrieval index")
+            self._reset()
+        self._open_vectors()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+            self.vectors = None
+
+    # --- Storage ---------------------------------------------------------
+
+    def _meta(self, key: str, default: str) -> str:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value: Any):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _reset(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM sources")
+            self.conn.execute("DELETE FROM meta")
+            self._set_meta("model", self.model)
+        if os.path.exists(self.vectors_path):
+            os.remove(self.vectors_path)
+        self.dim = 0
+
+    def _open_vectors(self):
+        """Maps the vector file and marks which rows hold a live passage."""
+        if not self.dim or not os.path.exists(self.vectors_path):
+            return
+        rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+        self.alive = np.zeros(rows, dtype=bool)
+        live = [row for (row,) in self.conn.execute("SELECT row FROM chunks") if row < rows]
+        self.alive[live] = True
+
+    def _grow(self, needed: int):
+        """Makes room for `needed` more rows, doubling the file so appends stay amortized O(1). Caller holds the lock."""
+        rows = 0 if self.vectors is None else self.vectors.shape[0]
+        capacity = max(1024, rows)
+        while capacity < rows + needed:
+            capacity *= 2
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.alive = np.concatenate([self.alive, np.zeros(capacity - rows, dtype=bool)])
+
+    def _store(self, source: str, texts: List[str], embeddings: List[List[float]]):
+        """Writes passages and their normalized vectors into free rows. Caller holds the lock."""
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if not self.dim:
+            self.dim = matrix.shape[1]
+            self._set_meta("dim", self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        free = np.flatnonzero(~self.alive)
+        if len(free) < len(texts):
+            self._grow(len(texts) - len(free))
+            free = np.flatnonzero(~self.alive)
+        rows = free[:len(texts)]
+        self.vectors[rows] = matrix
+        self.alive[rows] = True
+        self.conn.executemany("INSERT INTO chunks (row, source, text) VALUES (?, ?, ?)",
+                              [(int(row), source, text) for row, text in zip(rows, texts)])
+
+    def _drop(self, source: str):
+        """Removes a source's passages. Caller holds the lock."""
+        rows = [row for (row,) in self.conn.execute("SELECT row FROM chunks WHERE source = ?", (source,))]
+        if rows and self.vectors is not None:
+            self.vectors[rows] = 0
+            self.alive[rows] = False
+        self.conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+        self.conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+
+    def _embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        embeddings = []
+        for i in range(0, len(texts), EMBED_BATCH):
+            batch = self.client.embed(self.model, texts[i:i + EMBED_BATCH])
+            if batch is None or len(batch) != len(texts[i:i + EMBED_BATCH]):
+                return None
+            embeddings.extend(batch)
+        return embeddings
+
+    def _replace(self, pending: List[Dict[str, Any]]) -> bool:
+        """
+        Embeds the passages of several changed sources together (outside the
+        lock, in EMBED_BATCH-sized requests) and swaps them in for their old
+        passages in one transaction.
+        """
+        texts = [text for item in pending for text in item["texts"]]
+        embeddings = self._embed(texts) if texts else []
+        if embeddings is None:
+            return False
+        with self._lock, self.conn:
+            offset = 0
+            for item in pending:
+                count = len(item["texts"])
+                self._drop(item["source"])
+                if count:
+                    self._store(item["source"], item["texts"], embeddings[offset:offset + count])
+                offset += count
+                self.conn.execute("INSERT INTO sources (source, hash, mtime, size) VALUES (?, ?, ?, ?)",
+                                  (item["source"], item["hash"], item["mtime"], item["size"]))
+            if self.vectors is not None:
+                self.vectors.flush()
+        return True
+
+    # --- Indexing --------------------------------------------------------
+
+    @staticmethod
+    def walk(paths: Iterable[str]) -> Iterable[str]:
+        """Text files under `paths` (files or directories), skipping hidden ones."""
+        for path in paths:
+            path = os.path.expanduser(path)
+            if os.path.isfile(path):
+                yield os.path.abspath(path)
+                continue
+            for root, dirs, files in os.walk(path):
+                dirs[:] = [d for d in dirs if not d.startswith(".")]
+                for name in files:
+                    if not name.startswith(".") and os.path.splitext(name)[1].lower() in TEXT_EXTENSIONS:
+                        yield os.path.abspath(os.path.join(root, name))
+
+    def index_files(self, paths: Iterable[str]) -> Dict[str, int]:
+        """Brings the index up to date with the files under `paths`; files no longer there are dropped."""
+        counts = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        with self._index_lock:
+            with self._lock:
+                known = {row[0]: row[1:] for row in self.conn.execute(
+                    "SELECT source, hash, mtime, size FROM sources WHERE source LIKE 'file:%'")}
+            seen = set()
+            pending: List[Dict[str, Any]] = []
+            for path in self.walk(paths):
+                source = "file:" + path
+                seen.add(source)
+                try:
+                    stat = os.stat(path)
+                    if stat.st_size > MAX_FILE_BYTES:
+                        continue
+                    previous = known.get(source)
+                    if previous and previous[1] == stat.st_mtime and previous[2] == stat.st_size:
+                        counts["unchanged"] += 1
+                        continue
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except OSError:
+                    counts["failed"] += 1
+                    continue
+                digest = content_hash(data)
+                if previous and previous[0] == digest:
+                    # Touched but not changed: remember the new mtime, keep the vectors
+                    with self._lock, self.conn:
+                        self.conn.execute("UPDATE sources SET mtime = ?, size = ? WHERE source = ?",
+                                          (stat.st_mtime, stat.st_size, source))
+                    counts["unchanged"] += 1
+                    continue
+                pending.append({"source": source, "texts": chunk_text(data.decode("utf-8", errors="replace")),
+                                "hash": digest, "mtime": stat.st_mtime, "size": stat.st_size})
+                # Small files are embedded together rather than one request each
+                if sum(len(item["texts"]) for item in pending) >= EMBED_BATCH:
+                    counts["indexed" if self._replace(pending) else "failed"] += len(pending)
+                    pending = []
+            if pending:
+                counts["indexed" if self._replace(pending) else "failed"] += len(pending)
+            with self._lock, self.conn:
+                for source in set(known) - seen:
+                    self._drop(source)
+                    counts["removed"] += 1
+        return counts
+
+    def index_sessions(self, store) -> int:
+        """Embeds the saved chat messages added since the last call; drops deleted sessions. Returns messages indexed."""
+        indexed = 0
+        with self._index_lock:
+            with self._lock:
+                last_id = int(self._meta("chat_last_id", "0"))
+                indexed_sessions = {row[0] for row in self.conn.execute(
+                    "SELECT DISTINCT source FROM chunks WHERE source LIKE 'chat:%'")}
+            live = {f"chat:{session_id}" for session_id in store.session_ids()}
+            with self._lock, self.conn:
+                for source in indexed_sessions - live:
+                    self._drop(source)
+            while True:
+                messages = store.messages_since(last_id)
+                if not messages:
+                    break
+                passages = [(f"chat:{m['session_id']}", f"{m['role']}: {text}")
+                            for m in messages for text in chunk_text(m["content"])]
+                embeddings = self._embed([text for _, text in passages]) if passages else []
+                if embeddings is None:
+                    break
+                with self._lock, self.conn:
+                    for source in dict.fromkeys(source for source, _ in passages):
+                        rows = [i for i, (s, _) in enumerate(passages) if s == source]
+                        self._store(source, [passages[i][1] for i in rows], [embeddings[i] for i in rows])
+                    last_id = messages[-1]["id"]
+                    self._set_meta("chat_last_id", last_id)
+                    if self.vectors is not None:
+                        self.vectors.flush()
+                indexed += len(messages)
+        return indexed
+
+    def forget_message(self, session_id: int, role: str, content: str):
+        """Drops one saved message's passages, e.g. a reply deleted to be regenerated."""
+        texts = [f"{role}: {text}" for text in chunk_text(content)]
+        # Waits out an indexing pass that may be embedding the message right now
+        with self._index_lock, self._lock, self.conn:
+            for text in texts:
+                row = self.conn.execute("SELECT row FROM chunks WHERE source = ? AND text = ? LIMIT 1",
+                                        (f"chat:{session_id}", text)).fetchone()
+                if row is None:
+                    continue
+                if self.vectors is not None:
+                    self.vectors[row[0]] = 0
+                    self.alive[row[0]] = False
+                self.conn.execute("DELETE FROM chunks WHERE row = ?", (row[0],))
+            if self.vectors is not None:
+                self.vectors.flush()
+
+    # --- Search ----------------------------------------------------------
+
+    def search(self, query: str, k: int = 4, min_score: float = 0.0,
+               exclude: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        The `k` passages most similar to `query` (cosine), best first, as
+        {"source", "text", "score"}; sources in `exclude` are skipped.
+        """
+        if self.vectors is None or not query.strip():
+            return []
+        embedding = self.client.embed(self.model, [query])
+        if not embedding:
+            return []
+        q = np.asarray(embedding[0], dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm == 0 or q.shape[0] != self.dim:
+            return []
+        q /= norm
+        with self._lock:
+            # One matrix-vector product over the mapped rows; free rows are zero and masked
+            scores = self.vectors @ q
+            scores[~self.alive] = -np.inf
+            candidates = min(len(scores), k * 4 if exclude else k)
+            if candidates <= 0:
+                return []
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+            top = top[np.argsort(-scores[top])]
+            results = []
+            for row in top:
+                if scores[row] < min_score or len(results) >= k:
+                    break
+                found = self.conn.execute("SELECT source, text FROM chunks WHERE row = ?", (int(row),)).fetchone()
+                if found and not (exclude and found[0] in exclude):
+                    results.append({"source": found[0], "text": found[1], "score": float(scores[row])})
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            sources = self.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        return {"passages": int(self.alive.sum()), "files": sources,
+                "rows": 0 if self.vectors is None else self.vectors.shape[0]}
+
+def format_passages(passages: List[Dict[str, Any]]) -> str:
+    """The passages as a system-prompt section, each headed by where it came from."""
+    blocks = []
+    for passage in passages:
+        source = passage["source"]
+        label = os.path.basename(source[5:]) if source.startswith("file:") else "earlier conversation"
+        blocks.append(f"[{label}]\n{passage['text']}")
+    return ("Relevant excerpts from the user's documents and earlier conversations "
+            "(use them if they help answer):\n\n" + "\n\n".join(blocks))
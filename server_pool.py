@@ -0,0 +1,314 @@
+import threading
+import time
+from typing import List, Dict, Generator, Any, Callable, Optional, Set, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ollama_client import OllamaClient
+
+def normalize_urls(urls: List[str]) -> List[str]:
+    """Host URLs as the pool keys them: trailing slashes dropped, blanks and repeats removed."""
+    return list(dict.fromkeys(url.rstrip('/') for url in urls if url.strip())) or ["http://localhost:11434"]
+
+# Connect retries for a pooled client: trying the next host is the pool's own retry,
+# so a host that refuses connections is marked down at once rather than after the backoff
+POOL_CONNECT_RETRIES = 1
+
+def default_client(url: str) -> "OllamaClient":
+    # Imported on first use: it pulls in requests, which the GUI doesn't need before its first frame
+    from ollama_client import OllamaClient
+    return OllamaClient(url, connect_retries=POOL_CONNECT_RETRIES)
+
+class ServerHost:
+    """One Ollama server in a pool and what the last probe saw of it."""
+    def __init__(self, url: str, client: "OllamaClient"):
+        self.url = url
+        self.client = client
+        self.healthy: Optional[bool] = None   # None until the first probe answers
+        self.models: Set[str] = set()         # /api/tags
+        self.loaded: Set[str] = set()         # /api/ps
+        self.active = 0                        # requests this pool has in flight there
+        self.latency_ms: Optional[float] = None
+        self.error = ""
+
+    def describe(self) -> Dict[str, Any]:
+        return {"url": self.url, "healthy": self.healthy, "models": len(self.models), "loaded": sorted(self.loaded),
+                "active": self.active, "latency_ms": self.latency_ms, "error": self.error}
+
+class ServerPool:
+    """
+    Several Ollama servers behind the OllamaClient interface. A background
+    thread probes each one (/api/tags, /api/ps) every `probe_interval`
+    seconds, and every model request goes to the least-loaded healthy host
+    that already has the model in memory, else the least-loaded one that has
+    it on disk. A chat that fails before its first token is retried on the
+    next candidate. Listings (list_models, running_models) are merged across
+    hosts, each entry tagged with the "hosts"/"host" it came from.
+
+    Load is the number of requests this pool has in flight on a host; Ollama
+    doesn't report its own queue.
+    """
+    def __init__(self, urls: List[str], client_factory: Callable[[str], "OllamaClient"] = default_client,
+                 probe_interval: float = 10.0):
+        self.client_factory = client_factory
+        self.probe_interval = probe_interval
+        self.hosts: List[ServerHost] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._probe_thread = None
+        self.set_urls(urls)
+
+    @property
+    def base_url(self) -> str:
+        """Every host URL, comma-separated (as typed in Settings)."""
+        return ", ".join(host.url for host in self.hosts)
+
+    @property
+    def primary_url(self) -> str:
+        return self.hosts[0].url
+
+    def set_urls(self, urls: List[str]):
+        """Replaces the host list; clients of hosts that stay are kept."""
+        urls = normalize_urls(urls)
+        with self._lock:
+            current = {host.url: host for host in self.hosts}
+            self.hosts = [current.pop(url, None) or ServerHost(url, self.client_factory(url)) for url in urls]
+        for host in current.values():
+            host.client.close()
+
+    # --- Probing -------------------------------------------------------
+
+    def start(self):
+        """Starts the background probe loop."""
+        if self._probe_thread is None:
+            self._probe_thread = threading.Thread(target=self._probe_loop, daemon=True)
+            self._probe_thread.start()
+        return self
+
+    def _probe_loop(self):
+        while not self._closed.is_set():
+            self.probe()
+            self._closed.wait(self.probe_interval)
+
+    def probe(self):
+        """Probes every host at once, so one that is down doesn't delay the others."""
+        threads = [threading.Thread(target=self._probe_host, args=(host,), daemon=True) for host in list(self.hosts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _probe_host(self, host: ServerHost):
+        start = time.perf_counter()
+        models = host.client.list_models()
+        latency = (time.perf_counter() - start) * 1000
+        running = host.client.running_models() if models is not None else None
+        with self._lock:
+            self._record(host, models)
+            if models is not None:
+                host.latency_ms = latency
+            if running is not None:
+                host.loaded = {m.get("name", "") for m in running}
+
+    def _record(self, host: ServerHost, models: Optional[List[Dict[str, Any]]]):
+        """Caller holds the lock."""
+        if models is None:
+            host.healthy = False
+            host.error = "unreachable"
+        else:
+            host.healthy = True
+            host.error = ""
+            host.models = {m["name"] for m in models}
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [host.describe() for host in self.hosts]
+
+    # --- Routing -------------------------------------------------------
+
+    def candidates(self, model: str) -> List[ServerHost]:
+        """
+        Hosts to try for `model`, best first: healthy hosts with it resident,
+        then healthy hosts with it on disk, each by fewest requests in
+        flight. Hosts not probed yet count as healthy. If no host is known
+        to have the model, every reachable host in configured order.
+        """
+        with self._lock:
+            up = [host for host in self.hosts if host.healthy is not False]
+            having = [host for host in up if model in host.models]
+            if not having:
+                return up or list(self.hosts)
+            return sorted(having, key=lambda h: (model not in h.loaded, h.active, self.hosts.index(h)))
+
+    def _acquire(self, host: ServerHost):
+        with self._lock:
+            host.active += 1
+
+    def _release(self, host: ServerHost):
+        with self._lock:
+            host.active -= 1
+
+    def _failed(self, host: ServerHost, error: str):
+        with self._lock:
+            host.healthy = False
+            host.error = error
+
+    # --- OllamaClient interface ----------------------------------------
+
+    def keep_alive_for(self, model: str) -> Any:
+        return self.hosts[0].client.keep_alive_for(model)
+
+    def connection_stats(self) -> Dict[str, int]:
+        totals = {"requests": 0, "connections": 0, "reused": 0}
+        for host in list(self.hosts):
+            for key, value in host.client.connection_stats().items():
+                totals[key] += value
+        return totals
+
+    def close(self):
+        self._closed.set()
+        for host in list(self.hosts):
+            host.client.close()
+
+    def list_models(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        The merged /api/tags listing of every reachable host, one entry per
+        model name with the URLs that have it under "hosts". None if no host
+        answered. Also refreshes each host's model set.
+        """
+        hosts = list(self.hosts)
+        results: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+
+        def fetch(host):
+            results[host.url] = host.client.list_models()
+
+        threads = [threading.Thread(target=fetch, args=(host,), daemon=True) for host in hosts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for host in hosts:
+                models = results.get(host.url)
+                self._record(host, models)
+                for model in models or []:
+                    entry = merged.setdefault(model["name"], {**model, "hosts": []})
+                    entry["hosts"].append(host.url)
+        if all(results.get(host.url) is None for host in hosts):
+            return None
+        return list(merged.values())
+
+    def get_models(self) -> List[str]:
+        return [model['name'] for model in self.list_models() or []]
+
+    def chat_stream(self, model: str, messages: List[Dict[str, str]], system_prompt: str = None, stop_event: threading.Event = None,
+                    options: Optional[Dict[str, Any]] = None, batch: bool = False) -> Generator[Dict[str, Any], None, None]:
+        """
+        OllamaClient.chat_stream on the best host for `model`. If a host
+        can't be reached or times out before the first token, it is marked
+        down and the next candidate is tried. Errors the server answered
+        with (an unknown model, a bad request) and anything after the first
+        token are passed on as they are, without touching the host's health.
+        The stats event's "client" dict names the host that answered under
+        "host".
+        """
+        error = None
+        for host in self.candidates(model):
+            if stop_event and stop_event.is_set():
+                break
+            self._acquire(host)
+            started = False
+            try:
+                for chunk in host.client.chat_stream(model, messages, system_prompt=system_prompt,
+                                                     stop_event=stop_event, options=options, batch=batch):
+                    if chunk["type"] == "error" and not started:
+                        if not chunk.get("retryable"):
+                            yield chunk
+                            return
+                        error = chunk
+                        self._failed(host, chunk["content"])
+                        break
+                    if chunk["type"] == "stats":
+                        chunk["client"]["host"] = host.url
+                    started = True
+                    yield chunk
+            finally:
+                self._release(host)
+            if started:
+                with self._lock:
+                    host.loaded.add(model)
+                return
+        if error:
+            yield error
+
+    def complete(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> str:
+        for host in self.candidates(model):
+            self._acquire(host)
+            try:
+                content = host.client.complete(model, messages, options=options)
+            finally:
+                self._release(host)
+            if content:
+                return content
+        return ""
+
+    def embed(self, model: str, texts: List[str]) -> Optional[List[List[float]]]:
+        for host in self.candidates(model):
+            self._acquire(host)
+            try:
+                embeddings = host.client.embed(model, texts)
+            finally:
+                self._release(host)
+            if embeddings is not None:
+                return embeddings
+        return None
+
+    def load_model(self, model: str, keep_alive: Any = None, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Loads the model on the host its next request would go to."""
+        result = {"error": "no Ollama server available"}
+        for host in self.candidates(model):
+            result = host.client.load_model(model, keep_alive=keep_alive, options=options)
+            if "error" not in result:
+                with self._lock:
+                    host.loaded.add(model)
+                return {**result, "host": host.url}
+        return result
+
+    def unload_model(self, model: str, host: Optional[str] = None) -> Dict[str, Any]:
+        """Unloads the model from the host with URL `host`, or from every host that has it in memory."""
+        with self._lock:
+            if host is not None:
+                hosts = [h for h in self.hosts if h.url == host]
+                if not hosts:
+                    return {"error": f"{host} is not in the server list"}
+            else:
+                hosts = [h for h in self.hosts if model in h.loaded] or list(self.hosts)
+        result = {}
+        for host in hosts:
+            reply = host.client.unload_model(model)
+            if "error" in reply:
+                result = reply
+            else:
+                with self._lock:
+                    host.loaded.discard(model)
+        return result
+
+    def running_models(self) -> Optional[List[Dict[str, Any]]]:
+        """/api/ps of every host, each entry tagged with its "host". None if no host answered."""
+        merged, answered = [], False
+        for host in list(self.hosts):
+            models = host.client.running_models()
+            if models is None:
+                continue
+            answered = True
+            with self._lock:
+                host.loaded = {m.get("name", "") for m in models}
+            merged.extend({**m, "host": host.url} for m in models)
+        return merged if answered else None
+
+    def pull_model(self, name: str) -> Generator[Dict[str, Any], None, None]:
+        """Pulls onto the first reachable host in configured order."""
+        with self._lock:
+            host = next((h for h in self.hosts if h.healthy is not False), self.hosts[0])
+        yield from host.client.pull_model(name)
@@ -0,0 +1,258 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id            INTEGER PRIMARY KEY,
+    title         TEXT NOT NULL DEFAULT '',
+    model         TEXT NOT NULL DEFAULT '',
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_by_update ON sessions (updated_at DESC);
+CREATE TABLE IF NOT EXISTS messages (
+    id         INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    seq        INTEGER NOT NULL,
+    role       TEXT NOT NULL,
+    content    TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    cancelled  INTEGER NOT NULL DEFAULT 0,   -- a reply stopped before it finished
+    UNIQUE (session_id, seq)
+);
+"""
+
+# Full-text index over message content, kept in sync by triggers. It is an
+# external-content table, so the text itself is stored only once.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    content, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+END;
+"""
+
+TITLE_LENGTH = 60
+
+def fts_query(text: str) -> str:
+    """
+    Turns what the user typed into an FTS5 query: every word must match, the
+    last one as a prefix so results appear while typing. Words are quoted, so
+    FTS5 operators and punctuation in the input are taken literally.
+    """
+    words = text.split()
+    if not words:
+        return ""
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    return " ".join(terms) + "*"
+
+def make_title(text: str) -> str:
+    """First line of a message, shortened for the session list."""
+    line = text.strip().split("\n", 1)[0].strip()
+    return line if len(line) <= TITLE_LENGTH else line[:TITLE_LENGTH - 1] + "…"
+
+class SessionStore:
+    """
+    Conversations in a SQLite database (WAL mode). Messages are appended one
+    at a time as they are finished, so nothing is lost without saving and no
+    write ever rewrites a whole conversation. The sessions table doubles as
+    an index (title, model, timestamps, message count) for the session list,
+    and messages are read back a page at a time, newest page first.
+    """
+    PAGE_SIZE = 50
+
+    def __init__(self, path: str = "sessions.db", page_size: int = PAGE_SIZE):
+        self.path = path
+        self.page_size = page_size
+        # One connection shared by the UI and worker threads, serialized by the lock
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only risks the last commits on power loss, never corruption
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(messages)")}
+            if "cancelled" not in columns:
+                # Databases from before replies could be stopped
+                self.conn.execute("ALTER TABLE messages ADD COLUMN cancelled INTEGER NOT NULL DEFAULT 0")
+        self.fts = self._create_fts()
+
+    def _create_fts(self) -> bool:
+        """Creates the search index (filling it from existing messages the first time); False if FTS5 is unavailable."""
+        exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone()
+        try:
+            with self.conn:
+                self.conn.executescript(FTS_SCHEMA)
+                if not exists:
+                    self.conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable, falling back to substring search: {e}")
+            return False
+        return True
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    # --- Sessions ------------------------------------------------------
+
+    def create_session(self, title: str = "", model: str = "") -> int:
+        now = time.time()
+        with self._lock, self.conn:
+            cursor = self.conn.execute("INSERT INTO sessions (title, model, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                                       (title, model, now, now))
+        return cursor.lastrowid
+
+    def list_sessions(self, limit: int = 500) -> List[Dict[str, Any]]:
+        """Most recently updated first; reads only the sessions table."""
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM sessions ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_session(self, session_id: int):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    # --- Messages ------------------------------------------------------
+
+    def append_message(self, session_id: int, role: str, content: str, model: str = "", cancelled: bool = False) -> int:
+        """Appends one message and updates the session's index row; returns the message's seq."""
+        return self.append_messages(session_id, [{"role": role, "content": content, "cancelled": cancelled}], model)[0]
+
+    def append_messages(self, session_id: int, messages: List[Dict[str, Any]], model: str = "") -> List[int]:
+        now = time.time()
+        with self._lock, self.conn:
+            session = self.conn.execute("SELECT title, message_count FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if session is None:
+                raise KeyError(f"No session {session_id}")
+            first = session["message_count"]
+            seqs = list(range(first, first + len(messages)))
+            self.conn.executemany(
+                "INSERT INTO messages (session_id, seq, role, content, created_at, cancelled) VALUES (?, ?, ?, ?, ?, ?)",
+                [(session_id, seq, m["role"], m.get("content", ""), now, int(bool(m.get("cancelled"))))
+                 for seq, m in zip(seqs, messages)])
+            title = session["title"] or next((make_title(m["content"]) for m in messages
+                                              if m["role"] == "user" and m.get("content", "").strip()), "")
+            self.conn.execute(
+                "UPDATE sessions SET message_count = ?, updated_at = ?, title = ?, model = CASE WHEN ? != '' THEN ? ELSE model END "
+                "WHERE id = ?", (first + len(messages), now, title, model, model, session_id))
+        return seqs
+
+    def load_messages(self, session_id: int, before: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` messages (default page_size) with seq < `before` (default:
+        the newest), oldest first. Each dict carries its "seq" for paging and
+        whether it was "cancelled".
+        """
+        limit = limit or self.page_size
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT seq, role, content, cancelled FROM messages WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_id, before if before is not None else 2 ** 62, limit)).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def load_messages_from(self, session_id: int, start: int) -> List[Dict[str, Any]]:
+        """Every message from seq `start` to the newest, oldest first."""
+        with self._lock:
+            rows = self.conn.execute("SELECT seq, role, content, cancelled FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq",
+                                     (session_id, start)).fetchall()
+        return [dict(row) for row in rows]
+
+    def pop_message(self, session_id: int) -> Optional[Dict[str, Any]]:
+        """Deletes the session's newest message (e.g. a reply being regenerated) and returns it."""
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT id, seq, role, content FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT 1",
+                                    (session_id,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("DELETE FROM messages WHERE id = ?", (row["id"],))
+            self.conn.execute("UPDATE sessions SET message_count = ?, updated_at = ? WHERE id = ?",
+                              (row["seq"], time.time(), session_id))
+        return dict(row)
+
+    def all_messages(self, session_id: int) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self.conn.execute("SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq",
+                                     (session_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def messages_since(self, after_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """Messages of every session with a row id above `after_id`, oldest first (for incremental indexing)."""
+        with self._lock:
+            rows = self.conn.execute("SELECT id, session_id, seq, role, content FROM messages WHERE id > ? "
+                                     "ORDER BY id LIMIT ?", (after_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def session_ids(self) -> List[int]:
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT id FROM sessions").fetchall()]
+
+    # --- Search ----------------------------------------------------------
+
+    def search(self, text: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Messages matching every word of `text`, best match first, as dicts
+        with session_id, seq, role, title and a one-line snippet.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        with self._lock:
+            if self.fts:
+                try:
+                    rows = self.conn.execute(
+                        "SELECT m.session_id, m.seq, m.role, s.title, "
+                        "snippet(messages_fts, 0, '', '', '…', 12) AS snippet "
+                        "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+                        "JOIN sessions s ON s.id = m.session_id "
+                        "WHERE messages_fts MATCH ? ORDER BY rank LIMIT ?", (query, limit)).fetchall()
+                except sqlite3.OperationalError:
+                    # e.g. input that is all punctuation, which the tokenizer reduces to nothing
+                    return []
+            else:
+                conditions = " AND ".join("m.content LIKE ?" for _ in text.split())
+                rows = self.conn.execute(
+                    "SELECT m.session_id, m.seq, m.role, s.title, substr(m.content, 1, 120) AS snippet "
+                    "FROM messages m JOIN sessions s ON s.id = m.session_id "
+                    f"WHERE {conditions} ORDER BY s.updated_at DESC, m.seq DESC LIMIT ?",
+                    [f"%{word}%" for word in text.split()] + [limit]).fetchall()
+        results = [dict(row) for row in rows]
+        for result in results:
+            result["snippet"] = " ".join(result["snippet"].split())
+        return results
+
+    # --- JSON import/export --------------------------------------------
+
+    def import_json(self, path: str, title: str = "") -> int:
+        """Imports a file written by export_json (or the old Save Chat) as a new session; returns its id."""
+        with open(path, 'r') as f:
+            history = json.load(f)
+        if not isinstance(history, list) or not all(isinstance(m, dict) and "role" in m for m in history):
+            raise ValueError("Not a chat history file")
+        session_id = self.create_session(title)
+        try:
+            if history:
+                self.append_messages(session_id, history)
+        except sqlite3.Error:
+            self.delete_session(session_id)
+            raise
+        return session_id
+
+    def export_json(self, session_id: int, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.all_messages(session_id), f, indent=4)
@@ -0,0 +1,74 @@
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+# The app is a set of flat modules at the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.mock_server import MockOllamaServer, StreamSpec  # noqa: E402
+
+@pytest.fixture
+def mock_server():
+    """A MockOllamaServer streaming 20 tokens as fast as it can; tests may swap `spec`."""
+    with MockOllamaServer(StreamSpec(tokens=20, rate=0)) as server:
+        yield server
+
+@pytest.fixture
+def raw_server():
+    """
+    Starts local TCP servers that hand each accepted connection to
+    respond(conn) on its own thread, for replies the mock server can't give
+    (hangs, truncated bodies, refusals). Returns start(respond) -> URL.
+    """
+    sockets = []
+
+    def start(respond):
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(16)
+        sockets.append(listener)
+
+        def accept():
+            while True:
+                try:
+                    conn, _ = listener.accept()
+                except OSError:
+                    return
+                threading.Thread(target=respond, args=(conn,), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+        return f"http://127.0.0.1:{listener.getsockname()[1]}"
+
+    yield start
+    for listener in sockets:
+        listener.close()
+
+def read_request(conn) -> bytes:
+    """Reads one HTTP request (headers and Content-Length body) from conn."""
+    data = b""
+    while b"\r\n\r\n" not in data:
+        block = conn.recv(65536)
+        if not block:
+            return data
+        data += block
+    head, _, body = data.partition(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    while len(body) < length:
+        body += conn.recv(65536)
+    return head + b"\r\n\r\n" + body
+
+def refused_url() -> str:
+    """A URL nothing listens on."""
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return f"http://127.0.0.1:{port}"
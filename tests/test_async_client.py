@@ -0,0 +1,82 @@
+import asyncio
+import json
+import time
+
+from benchmarks.mock_server import StreamSpec
+from conftest import read_request, refused_url
+from async_client import AsyncOllamaClient
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+CHUNKED_HEAD = b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+LINE = b'{"message": {"content": "hi"}}\n'
+
+def chat(url, **kwargs):
+    async def run():
+        client = AsyncOllamaClient(url, **kwargs)
+        try:
+            return [event async for event in client.chat("mock", MESSAGES)]
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+def replying(raw: bytes):
+    def respond(conn):
+        read_request(conn)
+        conn.sendall(raw)
+        conn.close()
+    return respond
+
+def test_chat_streams_content_and_stats(mock_server):
+    events = chat(mock_server.url)
+    assert sum(e["type"] == "content" for e in events) == 20
+    assert events[-1] == {"type": "stats", "stats": events[-1]["stats"]}
+    assert events[-1]["stats"]["eval_count"] == 20
+
+def test_a_body_cut_off_mid_chunk_is_an_error(raw_server):
+    events = chat(raw_server(replying(CHUNKED_HEAD + b"%x\r\n" % len(LINE) + LINE[:5])))
+    assert events == [{"type": "error", "content": "connection closed mid-response"}]
+
+def test_a_body_cut_off_before_the_next_chunk_size_is_an_error(raw_server):
+    events = chat(raw_server(replying(CHUNKED_HEAD + b"%x\r\n" % len(LINE) + LINE + b"\r\n")))
+    assert events == [{"type": "content", "content": "hi"},
+                      {"type": "error", "content": "connection closed mid-response"}]
+
+def test_http_errors_carry_the_server_message(raw_server):
+    body = json.dumps({"error": "model 'mock' not found"}).encode()
+    events = chat(raw_server(replying(b"HTTP/1.1 404 Not Found\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))))
+    assert events == [{"type": "error", "content": "model 'mock' not found"}]
+
+def test_an_unreachable_server_is_an_error():
+    events = chat(refused_url())
+    assert len(events) == 1 and events[0]["type"] == "error"
+
+def test_cancelling_the_consumer_closes_the_connection(mock_server):
+    mock_server.spec = StreamSpec(tokens=500, rate=50)
+
+    async def run():
+        client = AsyncOllamaClient(mock_server.url)
+
+        async def consume():
+            async for _ in client.chat("mock", MESSAGES):
+                pass
+
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await client.aclose()
+
+    asyncio.run(run())
+    deadline = time.perf_counter() + 2
+    while not mock_server.aborted and time.perf_counter() < deadline:
+        time.sleep(0.02)
+    assert mock_server.aborted == 1
+
+def test_think_tags_become_thinking_events(raw_server):
+    bodies = [{"message": {"content": "<thi"}}, {"message": {"content": "nk>plan</think>answer"}},
+              {"message": {"thinking": "native"}}, {"message": {"content": ""}, "done": True, "eval_count": 3}]
+    body = b"".join(json.dumps(b).encode() + b"\n" for b in bodies)
+    events = chat(raw_server(replying(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))))
+    assert [(e["type"], e.get("content")) for e in events[:-1]] == \
+        [("thinking", "plan"), ("content", "answer"), ("thinking", "native")]
+
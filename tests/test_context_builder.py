@@ -0,0 +1,76 @@
+from context_builder import ContextBuilder, TokenEstimator
+
+def history(count, chars=400):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{i:04d}" + "x" * (chars - 4)}
+            for i in range(count)]
+
+def builder(policy, **kwargs):
+    return ContextBuilder(TokenEstimator(), default_budget=2000, reserve=500, policy=policy, **kwargs)
+
+def test_sliding_window_keeps_the_newest_messages_that_fit():
+    messages = history(100)
+    built = builder("sliding_window").build("m", messages, "be brief")
+    assert built[0] == {"role": "system", "content": "be brief"}
+    # The result references the stored dicts and ends with the newest one
+    assert built[-1] is messages[-1]
+    assert len(built) < len(messages)
+    assert sum(TokenEstimator().count_message("m", m) for m in built) <= 1500
+
+def test_history_that_fits_is_sent_whole():
+    messages = history(4)
+    assert builder("sliding_window").build("m", messages) == messages
+
+def test_pin_keeps_the_opening_messages():
+    messages = history(100)
+    built = builder("pin", pinned_messages=2).build("m", messages)
+    assert built[:2] == messages[:2]
+    assert built[-1] is messages[-1]
+
+def test_summarize_reuses_its_summary_for_the_same_key():
+    calls = []
+
+    def complete(model, messages):
+        calls.append(messages)
+        return f"summary {len(calls)}"
+
+    context = builder("summarize", complete=complete)
+    messages = history(100)
+    built = context.build("m", messages, key=(1, 0))
+    assert built[0]["content"].endswith(f"summary {len(calls)}")
+    first = len(calls)
+    context.build("m", messages + [{"role": "user", "content": "next"}], key=(1, 0))
+    assert len(calls) == first
+
+def test_a_new_key_never_gets_the_old_summary():
+    # The summary names the conversation it was written from
+    def complete(model, messages):
+        return "from A" if "user: A" in messages[1]["content"] else "from B"
+
+    context = builder("summarize", complete=complete)
+    first = [dict(m, content="A" + m["content"]) for m in history(100)]
+    second = [dict(m, content="B" + m["content"]) for m in history(100)]
+    context.build("m", first, key=(1, 0))
+    built = context.build("m", second, key=(2, 1))
+    assert built[0]["content"].endswith("from B")
+
+def test_long_histories_are_summarized_in_budget_sized_slices():
+    sizes = []
+
+    def complete(model, messages):
+        sizes.append(TokenEstimator().count(model, messages[1]["content"]))
+        return "s"
+
+    builder("summarize", complete=complete).build("m", history(400), key=(1, 0))
+    assert len(sizes) > 1
+    # Half the 1500-token prompt budget per slice, plus the running summary
+    assert max(sizes) <= 750 + 50
+
+def test_estimator_calibrates_from_prompt_eval_count():
+    estimator = TokenEstimator()
+    messages = [{"role": "user", "content": "x" * 3000}]
+    for _ in range(20):
+        estimator.observe("m", messages, 1000 + TokenEstimator.MESSAGE_OVERHEAD)
+    assert abs(estimator.ratio("m") - 3.0) < 0.05
+    # Samples from a prompt mostly served from the KV cache are ignored
+    estimator.observe("m", messages, 10)
+    assert abs(estimator.ratio("m") - 3.0) < 0.05
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+
+from download_manager import DownloadManager, PullJob
+from ollama_client import OllamaClient
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+class GatedClient:
+    """Pulls that yield one progress line, then wait for their gate before finishing (or erroring)."""
+    def __init__(self):
+        self.gates = {}
+        self.closed = []
+
+    def pull_model(self, name):
+        gate = self.gates.setdefault(name, threading.Event())
+        try:
+            yield {"status": "pulling", "digest": "sha256:1", "total": 100, "completed": 10}
+            gate.wait(5)
+            yield {"error": "boom"} if name.startswith("bad") else {"status": "success"}
+        finally:
+            self.closed.append(name)
+
+def statuses(manager):
+    return {job["name"]: job["status"] for job in manager.snapshot()}
+
+def test_pull_against_mock_server_completes(mock_server, tmp_path):
+    client = OllamaClient(mock_server.url)
+    done = []
+    manager = DownloadManager(client, state_path=str(tmp_path / "downloads.json"), on_complete=done.append)
+    assert manager.enqueue("llama3")
+    wait_until(lambda: done)
+    client.close()
+    [job] = manager.snapshot()
+    assert (job["status"], job["layers"]) == ("done", 3)
+    assert job["completed"] == job["total"] == 300_000_000
+    assert json.loads((tmp_path / "downloads.json").read_text()) == {"pending": []}
+
+def test_concurrency_limit_queues_the_rest(tmp_path):
+    client = GatedClient()
+    manager = DownloadManager(client, max_concurrent=1, state_path=str(tmp_path / "downloads.json"))
+    assert manager.enqueue("a") and manager.enqueue("b")
+    assert not manager.enqueue("a")
+    assert statuses(manager) == {"a": "pulling", "b": "queued"}
+    wait_until(lambda: "a" in client.gates)
+    client.gates["a"].set()
+    wait_until(lambda: statuses(manager) == {"a": "done", "b": "pulling"})
+    wait_until(lambda: "b" in client.gates)
+    client.gates["b"].set()
+    wait_until(lambda: statuses(manager)["b"] == "done")
+
+def test_errors_and_cancellation(tmp_path):
+    client = GatedClient()
+    manager = DownloadManager(client, max_concurrent=1, state_path=str(tmp_path / "downloads.json"))
+    manager.enqueue("bad")
+    manager.enqueue("queued")
+    manager.cancel("queued")
+    wait_until(lambda: "bad" in client.gates)
+    client.gates["bad"].set()
+    wait_until(lambda: statuses(manager)["bad"] == "failed")
+    assert manager.snapshot()[0]["error"] == "boom"
+    assert statuses(manager)["queued"] == "cancelled"
+
+    manager.enqueue("slow")
+    wait_until(lambda: manager.snapshot()[-1]["completed"] == 10)
+    manager.cancel("slow")
+    client.gates["slow"].set()
+    wait_until(lambda: statuses(manager)["slow"] == "cancelled")
+    assert "slow" in client.closed
+    manager.clear_finished()
+    assert manager.snapshot() == []
+
+def test_unfinished_pulls_resume_on_restart(tmp_path):
+    path = str(tmp_path / "downloads.json")
+    client = GatedClient()
+    DownloadManager(client, max_concurrent=1, state_path=path).enqueue("a")
+    DownloadManager(client, max_concurrent=1, state_path=path).enqueue("b")
+    assert json.loads(open(path).read()) == {"pending": ["b"]}
+    manager = DownloadManager(client, state_path=path)
+    manager.resume()
+    assert statuses(manager) == {"b": "pulling"}
+    client.gates.setdefault("a", threading.Event()).set()
+    client.gates.setdefault("b", threading.Event()).set()
+
+def test_rate_and_totals():
+    job = PullJob("m")
+    job.status = "pulling"
+    job.layers = {"a": [50, 100], "b": [0, 100]}
+    job.samples.extend([(0.0, 0), (2.0, 50)])
+    snapshot = job.snapshot()
+    assert (snapshot["rate"], snapshot["eta"]) == (25.0, 6.0)
+    totals = DownloadManager(None, state_path="").totals([snapshot, dict(snapshot, status="done")])
+    assert (totals["active"], totals["completed"], totals["total"]) == (1, 50, 200)
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from benchmarks.bench_markdown import merge_segments
+from markdown_stream import MarkdownStream, RULE, render_markdown
+
+SAMPLES = [
+    "# Title\n**b** *i* `c` [l](http://x)\n```\ncode\n```\n- a\n1. b\n> q\n---\n| a | b |\n|---|---|\n",
+    "- - -\n* * *\n_ _ _\n- item\n- -x\n",
+    "**bold *both* bold** and __under__ \\*escaped\\*\n",
+    "```python\ndef f():\n    return `x`\n```\nafter\n",
+    "[unterminated link\n12. twelve\n12 not a list\n",
+]
+
+def stream(chunks):
+    md = MarkdownStream()
+    out = []
+    for chunk in chunks:
+        out.extend(md.feed(chunk))
+    return merge_segments(out + md.flush())
+
+def test_block_and_inline_tags():
+    segments = dict((tags, text) for text, tags in render_markdown(SAMPLES[0]))
+    assert segments[("header",)] == "Title\n"
+    assert segments[("bold",)] == "b"
+    assert segments[("italic",)] == "i"
+    assert segments[("code",)] == "c"
+    assert segments[("link", "href:http://x")] == "l"
+    assert segments[("code_block",)] == "code\n"
+    assert segments[("list_item",)] == "• a\n1. b\n"
+    assert segments[("quote",)] == "q\n"
+    assert segments[("hr",)] == RULE + "\n"
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_every_two_way_split_matches_a_full_parse(text):
+    full = merge_segments(render_markdown(text))
+    for cut in range(1, len(text)):
+        assert stream([text[:cut], text[cut:]]) == full, cut
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_random_token_sized_chunks_match_a_full_parse(text):
+    full = merge_segments(render_markdown(text))
+    rng = random.Random(text)
+    for _ in range(50):
+        chunks, i = [], 0
+        while i < len(text):
+            size = rng.randint(1, 6)
+            chunks.append(text[i:i + size])
+            i += size
+        assert stream(chunks) == full
+
+def test_a_spaced_rule_split_after_the_first_dash_is_not_a_bullet():
+    assert stream(["- ", "- -\n"]) == [(RULE + "\n", ("hr",))]
+
+def test_held_back_text_comes_out_on_flush():
+    md = MarkdownStream()
+    assert md.feed("--") == []
+    assert merge_segments(md.flush()) == [("--", ())]
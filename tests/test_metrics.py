@@ -0,0 +1,49 @@
+import json
+
+from metrics import GenerationMetrics, MetricsLog, StartupProfile
+
+def test_rate_prefers_ollama_stats():
+    metrics = GenerationMetrics("m", "http://host")
+    metrics.stats = {"eval_count": 50, "eval_duration": 2_000_000_000}
+    metrics.client = {"stream_ms": 100.0}
+    metrics.tokens = 7
+    assert metrics.tokens_per_second() == 25.0
+
+def test_rate_falls_back_to_streamed_tokens_when_stopped():
+    metrics = GenerationMetrics("m", "http://host")
+    metrics.tokens = 10
+    metrics.client = {"stream_ms": 500.0, "cancelled": True}
+    assert metrics.tokens_per_second() == 20.0
+    assert metrics.summary_text().startswith("stopped · 20.0 tok/s")
+
+def test_summary_mentions_cache_passages_and_slow_loads():
+    metrics = GenerationMetrics("m", "http://host")
+    metrics.client = {"cached": True}
+    metrics.passages = 2
+    metrics.stats = {"load_duration": 2_000_000_000}
+    assert metrics.summary_text() == "cached · 2 passages · load 2.0s"
+
+def test_record_render_and_log_round_trip(tmp_path):
+    metrics = GenerationMetrics("m", "http://host")
+    for i in range(10):
+        metrics.record_render(enqueued_at=metrics.t0 + i, render_start=metrics.t0 + i + 0.001,
+                              render_end=metrics.t0 + i + 0.003, tokens=2)
+    metrics.client = {"ttfb_ms": 12.34, "host": "http://host"}
+    metrics.finish()
+    path = tmp_path / "metrics.jsonl"
+    MetricsLog(str(path)).append(metrics.to_record())
+    record = json.loads(path.read_text())
+    assert record["chunks"] == 10 and record["tokens"] == 20
+    assert abs(record["queue_delay_ms_p50"] - 1.0) < 0.01
+    assert abs(record["render_ms"] - 20.0) < 0.1
+    assert record["ttfb_ms"] == 12.3
+    assert "host" not in record
+
+def test_startup_profile_charges_time_to_each_phase():
+    profile = StartupProfile()
+    profile.mark("imports")
+    profile.mark("window")
+    assert [phase for phase, _ in profile.phases] == ["imports", "window"]
+    total = sum(ms for _, ms in profile.phases)
+    assert abs(total - (profile.last - profile.start) * 1000) < 1e-6
+    assert profile.report().splitlines()[-1].startswith("total")
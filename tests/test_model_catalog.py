@@ -0,0 +1,33 @@
+from model_catalog import ModelCatalog, describe_model, format_bytes
+
+MODELS = [{"name": "llama3:8b", "digest": "aaa", "size": 4_700_000_000,
+           "details": {"parameter_size": "8.0B", "quantization_level": "Q4_0"}}]
+
+def test_update_reports_changes_by_digest(tmp_path):
+    catalog = ModelCatalog(str(tmp_path / "models.json"))
+    assert catalog.models("http://a") == [] and catalog.fetched_at("http://a") is None
+    assert catalog.update("http://a", MODELS)
+    assert not catalog.update("http://a", [dict(MODELS[0], size=1)])
+    assert catalog.update("http://a", [dict(MODELS[0], digest="bbb")])
+    assert catalog.update("http://a", [])
+    assert catalog.update("http://b", [])
+
+def test_listings_survive_a_restart_per_server(tmp_path):
+    path = str(tmp_path / "models.json")
+    ModelCatalog(path).update("http://a", MODELS)
+    catalog = ModelCatalog(path)
+    assert catalog.models("http://a") == MODELS
+    assert catalog.fetched_at("http://a") is not None
+    assert catalog.models("http://b") == []
+
+def test_corrupt_cache_starts_empty(tmp_path):
+    path = tmp_path / "models.json"
+    path.write_text("{not json")
+    assert ModelCatalog(str(path)).models("http://a") == []
+
+def test_format_helpers():
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(1536) == "1.5 KB"
+    assert format_bytes(3 * 1024 ** 4) == "3.0 TB"
+    assert describe_model(MODELS[0]) == "4.4 GB · 8.0B · Q4_0"
+    assert describe_model({"name": "x"}) == ""
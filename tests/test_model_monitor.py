@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta, timezone
+
+from model_monitor import describe_memory, format_expiry, parse_timestamp
+
+def stamp(delta: timedelta) -> str:
+    return (datetime.now(timezone.utc) + delta).strftime("%Y-%m-%dT%H:%M:%S.123456789Z")
+
+def test_parse_timestamp_handles_nanoseconds_and_offsets():
+    parsed = parse_timestamp("2024-06-01T12:30:00.123456789-07:00")
+    assert parsed == datetime(2024, 6, 1, 19, 30, 0, 123456, tzinfo=timezone.utc)
+    assert parse_timestamp("2024-06-01T12:30:00Z").tzinfo is not None
+    assert parse_timestamp("") is None and parse_timestamp("yesterday") is None
+
+def test_format_expiry():
+    assert format_expiry(stamp(timedelta(minutes=4, seconds=30))).startswith("unloads in 4m")
+    assert format_expiry(stamp(timedelta(hours=2, minutes=5, seconds=30))) == "unloads in 2h 05m"
+    assert format_expiry(stamp(timedelta(seconds=-5))) == "unloading"
+    # keep_alive=-1 shows up as an expiry centuries away
+    assert format_expiry("2318-01-01T00:00:00Z") == "kept loaded"
+    assert format_expiry("") == ""
+
+def test_describe_memory_splits_gpu_and_cpu():
+    gb = 1024 ** 3
+    assert describe_memory({"size": 4 * gb, "size_vram": 4 * gb}) == "4.0 GB · 100% GPU"
+    assert describe_memory({"size": 4 * gb, "size_vram": 0}) == "4.0 GB · 100% CPU"
+    assert describe_memory({"size": 4 * gb, "size_vram": gb}) == "4.0 GB · 25% GPU / 75% CPU"
+    assert describe_memory({}) == ""
@@ -0,0 +1,32 @@
+import json
+
+from ndjson_stream import NDJSONDecoder, _json_loads, iter_ndjson
+
+def test_feed_keeps_partial_lines_until_completed():
+    decoder = NDJSONDecoder()
+    assert decoder.feed(b'{"a": 1}\n{"b"') == [{"a": 1}]
+    assert decoder.feed(b': 2}') == []
+    assert decoder.feed(b'\n') == [{"b": 2}]
+    assert decoder.flush() == []
+
+def test_flush_decodes_an_unterminated_last_line():
+    decoder = NDJSONDecoder()
+    assert decoder.feed(b'{"done": true}') == []
+    assert decoder.flush() == [{"done": True}]
+
+def test_invalid_lines_are_skipped_and_counted():
+    decoder = NDJSONDecoder(loads=_json_loads)
+    assert decoder.feed(b'not json\n\n  \n{"ok": 1}\n') == [{"ok": 1}]
+    assert decoder.skipped == 1
+
+def test_multibyte_characters_split_across_blocks():
+    data = json.dumps({"content": "héllo ✓"}, ensure_ascii=False).encode() + b"\n"
+    decoder = NDJSONDecoder(loads=_json_loads)
+    assert decoder.feed(data[:3]) + decoder.feed(data[3:]) == [{"content": "héllo ✓"}]
+
+def test_iter_ndjson_yields_only_blocks_that_complete_lines():
+    body = b"".join(json.dumps({"i": i}).encode() + b"\n" for i in range(5))
+    blocks = [body[i:i + 7] for i in range(0, len(body), 7)] + [b'{"i": 5}']
+    batches = list(iter_ndjson(blocks))
+    assert all(batches)
+    assert [item["i"] for batch in batches for item in batch] == list(range(6))
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from conftest import refused_url
+from ollama_batch import finished_pairs, main, read_items
+
+@pytest.fixture
+def suite(tmp_path, monkeypatch):
+    # Default config: no config.json in the working directory
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "prompts.jsonl"
+    path.write_text('{"id": "greet", "prompt": "Say hi"}\n\n'
+                    '{"messages": [{"role": "user", "content": "2+2?"}], "system": "terse", "options": {"seed": 1}}\n')
+    return path
+
+def results(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_read_items_fills_ids_and_messages(suite, tmp_path):
+    greet, chat = read_items(str(suite))
+    assert greet["messages"] == [{"role": "user", "content": "Say hi"}]
+    assert chat["id"] == "3"
+    bad = tmp_path / "bad.jsonl"
+    bad.write_text('{"id": "x"}\n')
+    with pytest.raises(ValueError):
+        read_items(str(bad))
+
+def test_runs_every_prompt_on_every_model(mock_server, suite, tmp_path, capsys):
+    output = tmp_path / "results.jsonl"
+    code = main([str(suite), "-m", "a", "-m", "b", "-o", str(output), "--url", mock_server.url,
+                 "--options", '{"temperature": 0}'])
+    assert code == 0
+    records = results(output)
+    assert sorted((r["id"], r["model"]) for r in records) == [("3", "a"), ("3", "b"), ("greet", "a"), ("greet", "b")]
+    assert all(r["response"] and not r["error"] and r["host"] == mock_server.url for r in records)
+    chats = {r["messages"][-1]["content"]: r for path, r in mock_server.requests if path == "/api/chat"}
+    assert chats["2+2?"]["options"] == {"temperature": 0, "seed": 1}
+    assert chats["2+2?"]["messages"][0] == {"role": "system", "content": "terse"}
+    assert "4 requests" in capsys.readouterr().out
+
+def test_resume_skips_answered_pairs_and_retries_errors(mock_server, suite, tmp_path):
+    output = tmp_path / "results.jsonl"
+    # An earlier run: one answer, one failure and a line cut short
+    output.write_text(json.dumps({"id": "greet", "model": "a", "error": ""}) + "\n"
+                      + json.dumps({"id": "3", "model": "a", "error": "boom"}) + "\n" + '{"id": "3", "mo')
+    assert finished_pairs(str(output)) == {("greet", "a")}
+    assert main([str(suite), "-m", "a", "-o", str(output), "--url", mock_server.url, "--resume"]) == 0
+    assert [path for path, _ in mock_server.requests].count("/api/chat") == 1
+    lines = output.read_text().splitlines()
+    assert json.loads(lines[-1])["id"] == "3" and not json.loads(lines[-1])["error"]
+    assert lines[2] == '{"id": "3", "mo'
+
+def test_failures_are_recorded_and_set_the_exit_code(suite, tmp_path):
+    output = tmp_path / "results.jsonl"
+    assert main([str(suite), "-m", "a", "-o", str(output), "--url", refused_url()]) == 1
+    assert all(r["error"] for r in results(output))
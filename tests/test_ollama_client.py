@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+
+from benchmarks.mock_server import StreamSpec
+from conftest import read_request
+from ollama_client import OllamaClient, StopSignal
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+def hang(conn):
+    """Accepts the request and never answers."""
+    read_request(conn)
+    time.sleep(30)
+
+def test_chat_stream_yields_content_then_stats(mock_server):
+    client = OllamaClient(mock_server.url)
+    events = list(client.chat_stream("mock", MESSAGES))
+    client.close()
+    content = [e for e in events if e["type"] == "content"]
+    assert len(content) == 20
+    assert events[-1]["type"] == "stats"
+    assert events[-1]["stats"]["eval_count"] == 20
+    assert {"ttfb_ms", "first_token_ms", "stream_ms"} <= set(events[-1]["client"])
+
+def test_batch_mode_joins_the_deltas_of_one_read(mock_server):
+    mock_server.spec = StreamSpec(tokens=40, rate=0, lines_per_write=8)
+    client = OllamaClient(mock_server.url)
+    events = list(client.chat_stream("mock", MESSAGES, batch=True))
+    client.close()
+    content = [e for e in events if e["type"] == "content"]
+    assert sum(e["tokens"] for e in content) == 40
+    assert len(content) < 40
+
+def test_requests_reuse_pooled_connections(mock_server):
+    client = OllamaClient(mock_server.url)
+    for _ in range(3):
+        list(client.chat_stream("mock", MESSAGES))
+    assert client.list_models() is not None
+    stats = client.connection_stats()
+    client.close()
+    assert stats["requests"] == 4
+    assert stats["reused"] >= 2
+
+def test_listings_give_up_quickly_on_a_hung_server(raw_server):
+    client = OllamaClient(raw_server(hang), probe_timeout=0.3)
+    start = time.perf_counter()
+    assert client.list_models() is None
+    assert client.running_models() is None
+    client.close()
+    # Each listing waits for one read timeout, with no retry after it
+    assert time.perf_counter() - start < 2
+
+def test_load_model_sends_options_and_keep_alive(mock_server):
+    client = OllamaClient(mock_server.url, keep_alive={"mock": "1h"})
+    result = client.load_model("mock", options={"num_ctx": 8192})
+    client.close()
+    assert "error" not in result
+    path, request = mock_server.requests[-1]
+    assert path == "/api/generate"
+    assert request["options"] == {"num_ctx": 8192}
+    assert request["keep_alive"] == "1h"
+
+def test_server_errors_are_not_retryable(raw_server):
+    def not_found(conn):
+        read_request(conn)
+        body = json.dumps({"error": "model 'x' not found"}).encode()
+        conn.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+        conn.close()
+    client = OllamaClient(raw_server(not_found))
+    events = list(client.chat_stream("x", MESSAGES))
+    client.close()
+    assert events == [{"type": "error", "content": events[0]["content"], "retryable": False}]
+
+def test_stop_aborts_a_request_still_waiting_for_its_first_token(mock_server):
+    mock_server.spec = StreamSpec(tokens=20, rate=0, first_token_delay=10)
+    client = OllamaClient(mock_server.url)
+    stop = StopSignal()
+    threading.Timer(0.2, stop.set).start()
+    start = time.perf_counter()
+    events = list(client.chat_stream("mock", MESSAGES, stop_event=stop))
+    client.close()
+    assert time.perf_counter() - start < 2
+    assert [e["type"] for e in events] == ["stats"]
+    assert events[0]["client"]["cancelled"] is True
+    assert events[0]["client"]["stop_ms"] < 500
+    deadline = time.perf_counter() + 2
+    while not mock_server.aborted and time.perf_counter() < deadline:
+        time.sleep(0.02)
+    assert mock_server.aborted == 1
+
+def test_stop_signal_runs_callbacks_once():
+    stop = StopSignal()
+    calls = []
+    stop.add_callback(lambda: calls.append("a"))
+    def removed():
+        calls.append("removed")
+    stop.add_callback(removed)
+    stop.remove_callback(removed)
+    stop.set()
+    stop.add_callback(lambda: calls.append("late"))
+    assert calls == ["a", "late"] and stop.set_at is not None
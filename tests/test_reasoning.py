@@ -0,0 +1,38 @@
+from reasoning import ThinkSplitter, join_reasoning, split_reasoning
+
+def feed_all(deltas):
+    splitter = ThinkSplitter()
+    answer, thinking = [], []
+    for delta in deltas:
+        a, t = splitter.feed(delta)
+        answer.append(a)
+        thinking.append(t)
+    a, t = splitter.flush()
+    return "".join(answer + [a]), "".join(thinking + [t])
+
+def test_tags_split_across_deltas():
+    assert feed_all(["<thi", "nk>step one", " step two</th", "ink>The answer"]) == \
+        ("The answer", "step one step two")
+
+def test_every_split_point_gives_the_same_result():
+    text = "a < b <think>x<y</think>done</thin"
+    expected = feed_all([text])
+    assert expected == ("a < b done</thin", "x<y")
+    for cut in range(len(text)):
+        assert feed_all([text[:cut], text[cut:]]) == expected
+    assert feed_all(list(text)) == expected
+
+def test_partial_tags_are_held_back_only_while_ambiguous():
+    splitter = ThinkSplitter()
+    assert splitter.feed("x <th") == ("x ", "")
+    assert splitter.feed("ree") == ("<three", "")
+    assert splitter.feed("<think>unfinished") == ("", "unfinished")
+    assert splitter.flush() == ("", "")
+
+def test_split_and_join_round_trip():
+    assert split_reasoning(join_reasoning("The answer", "the plan")) == ("The answer", "the plan")
+    assert join_reasoning("plain", "") == "plain"
+    assert split_reasoning("no tags < here") == ("no tags < here", "")
+    # An unclosed block (a stopped reply) is all reasoning
+    assert split_reasoning("<think>cut off") == ("", "cut off")
+    assert split_reasoning("<think>a</think>x<think>b</think>y") == ("xy", "a\n\nb")
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from ollama_client import StopSignal
+from response_cache import ResponseCache, cache_key, is_deterministic
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+def live_stream(calls, stop_event=None, stop_after=None):
+    def live():
+        calls.append(1)
+        for i, word in enumerate(["a", "b", "c"]):
+            if stop_after is not None and i == stop_after:
+                stop_event.set()
+            yield {"type": "content", "content": word, "tokens": 1}
+        yield {"type": "stats", "stats": {"eval_count": 3}, "client": {"ttfb_ms": 5.0}}
+    return live
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    yield cache
+    cache.close()
+
+def test_is_deterministic():
+    assert is_deterministic({"temperature": 0})
+    assert is_deterministic({"seed": 42, "temperature": 0.8})
+    assert not is_deterministic({"temperature": 0.7})
+    assert not is_deterministic(None)
+
+def test_cache_key_covers_digest_messages_system_and_options():
+    key = cache_key("d1", MESSAGES, "sys", {"temperature": 0, "seed": 1})
+    assert key == cache_key("d1", MESSAGES, "sys", {"seed": 1, "temperature": 0})
+    assert key != cache_key("d2", MESSAGES, "sys", {"temperature": 0, "seed": 1})
+    assert key != cache_key("d1", MESSAGES, "other", {"temperature": 0, "seed": 1})
+    assert key != cache_key("d1", MESSAGES + MESSAGES, "sys", {"temperature": 0, "seed": 1})
+    assert key != cache_key("d1", MESSAGES, "sys", {"temperature": 0, "seed": 2})
+
+def test_second_stream_replays_from_the_cache(cache):
+    calls = []
+    first = list(cache.stream("k", "m", live_stream(calls)))
+    second = list(cache.stream("k", "m", live_stream(calls)))
+    assert len(calls) == 1
+    assert [e["content"] for e in second[:-1]] == ["a", "b", "c"]
+    assert second[-1]["stats"] == first[-1]["stats"] == {"eval_count": 3}
+    assert second[-1]["client"]["cached"] is True
+    assert "cached" not in first[-1]["client"]
+    assert cache.stats()["entries"] == 1
+
+def test_stopped_live_streams_are_not_stored(cache):
+    stop = threading.Event()
+    list(cache.stream("k", "m", live_stream([], stop, stop_after=1), stop_event=stop))
+    assert cache.get("k") is None
+
+def test_stopped_replay_reports_cancelled(cache):
+    list(cache.stream("k", "m", live_stream([])))
+    stop = StopSignal()
+    replay = cache.stream("k", "m", live_stream([]), stop_event=stop)
+    assert next(replay)["content"] == "a"
+    stop.set()
+    stats = list(replay)[-1]
+    assert stats["stats"] == {}
+    assert stats["client"]["cancelled"] is True and "stop_ms" in stats["client"]
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=250)
+    entry = {"events": [[0.0, "x" * 40, 1]], "stats": {}, "client": {}}
+    cache.put("old", "m", entry)
+    cache.put("used", "m", entry)
+    assert cache.get("old") is not None
+    cache.put("new", "m", entry)
+    assert cache.get("used") is None
+    assert cache.get("old") is not None and cache.get("new") is not None
+    cache.clear()
+    assert cache.stats() == {"entries": 0, "bytes": 0}
+    cache.close()
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmarks.mock_server import hashed_embedding  # noqa: E402
+from retrieval import RetrievalIndex, chunk_text, format_passages  # noqa: E402
+from session_store import SessionStore  # noqa: E402
+
+class Embedder:
+    """The mock server's bag-of-words embeddings, without HTTP; counts the texts embedded."""
+    def __init__(self):
+        self.embedded = 0
+
+    def embed(self, model, texts):
+        self.embedded += len(texts)
+        return [hashed_embedding(text) for text in texts]
+
+@pytest.fixture
+def index(tmp_path):
+    index = RetrievalIndex(str(tmp_path / "index"), Embedder(), "embed")
+    yield index
+    index.close()
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+def test_chunk_text_cuts_at_breaks_with_overlap():
+    text = "\n\n".join("word " * 50 for _ in range(4))
+    chunks = chunk_text(text, size=300, overlap=50)
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert len(chunks) > 1 and all(not chunk.endswith(" ") for chunk in chunks)
+    assert chunk_text("   ") == []
+    assert chunk_text("short") == ["short"]
+
+def test_index_sessions_is_incremental(index, store):
+    first = store.create_session()
+    store.append_message(first, "user", "how do I bake sourdough bread")
+    store.append_message(first, "assistant", "feed the starter and proof the dough overnight")
+    assert index.index_sessions(store) == 2
+    assert index.index_sessions(store) == 0
+    second = store.create_session()
+    store.append_message(second, "user", "tune a guitar")
+    assert index.index_sessions(store) == 1
+    assert index.client.embedded == 3
+
+    [best] = index.search("starter proof overnight", k=1)
+    assert best["source"] == f"chat:{first}" and best["text"].startswith("assistant: feed")
+    assert index.search("guitar", k=4, exclude={f"chat:{second}"})[0]["source"] == f"chat:{first}"
+
+    store.delete_session(second)
+    index.index_sessions(store)
+    assert all(r["source"] == f"chat:{first}" for r in index.search("tune a guitar", k=4))
+
+def test_forget_message_drops_its_passage(index, store):
+    session_id = store.create_session()
+    store.append_message(session_id, "user", "tell me about volcanoes")
+    store.append_message(session_id, "assistant", "volcanoes erupt lava")
+    index.index_sessions(store)
+    index.forget_message(session_id, "assistant", "volcanoes erupt lava")
+    assert [r["text"] for r in index.search("volcanoes erupt lava", k=4)] == ["user: tell me about volcanoes"]
+    assert index.stats()["passages"] == 1
+
+def test_index_files_skips_unchanged_and_drops_removed(index, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "notes.md").write_text("the deploy key lives in the vault")
+    (docs / "todo.txt").write_text("buy milk")
+    (docs / "image.png").write_bytes(b"\x89PNG")
+    assert index.index_files([str(docs)])["indexed"] == 2
+    assert index.index_files([str(docs)]) == {"indexed": 0, "unchanged": 2, "removed": 0, "failed": 0}
+    os.remove(docs / "todo.txt")
+    (docs / "notes.md").write_text("the deploy key moved to the password manager")
+    assert index.index_files([str(docs)]) == {"indexed": 1, "unchanged": 0, "removed": 1, "failed": 0}
+    [passage] = index.search("deploy key", k=4)
+    assert "password manager" in passage["text"]
+    assert format_passages([passage]).endswith("[notes.md]\n" + passage["text"])
+
+def test_reopening_keeps_vectors_and_a_new_model_rebuilds(tmp_path, store):
+    session_id = store.create_session()
+    store.append_message(session_id, "user", "persist me")
+    directory = str(tmp_path / "index")
+    index = RetrievalIndex(directory, Embedder(), "embed")
+    index.index_sessions(store)
+    index.close()
+    index = RetrievalIndex(directory, Embedder(), "embed")
+    assert index.search("persist me", k=1)[0]["text"] == "user: persist me"
+    index.close()
+    index = RetrievalIndex(directory, Embedder(), "other-embed")
+    assert index.search("persist me") == [] and index.stats()["passages"] == 0
+    index.close()
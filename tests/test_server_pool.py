@@ -0,0 +1,91 @@
+import json
+import time
+
+from benchmarks.mock_server import MockOllamaServer, StreamSpec
+from conftest import read_request, refused_url
+from server_pool import ServerPool, normalize_urls
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+def test_normalize_urls():
+    assert normalize_urls(["http://a/", "http://a", " ", "http://b"]) == ["http://a", "http://b"]
+    assert normalize_urls([]) == ["http://localhost:11434"]
+
+def test_candidates_prefer_resident_then_least_busy():
+    pool = ServerPool(["http://a", "http://b", "http://c", "http://d"])
+    a, b, c, d = pool.hosts
+    for host in pool.hosts:
+        host.healthy = True
+        host.models = {"m"}
+    d.healthy = False
+    a.active = 2
+    c.loaded = {"m"}
+    c.active = 5
+    assert pool.candidates("m") == [c, b, a]
+    # Nobody has it: every reachable host, in configured order
+    assert pool.candidates("other") == [a, b, c]
+    pool.close()
+
+def test_chat_fails_over_from_a_refused_host(mock_server):
+    down = refused_url()
+    pool = ServerPool([down, mock_server.url])
+    start = time.perf_counter()
+    events = list(pool.chat_stream("mock", MESSAGES))
+    elapsed = time.perf_counter() - start
+    assert events[-1]["type"] == "stats"
+    assert events[-1]["client"]["host"] == mock_server.url
+    assert sum(e["type"] == "content" for e in events) == 20
+    # One connect retry on the refused host, not a full backoff
+    assert elapsed < 1.5
+    status = {s["url"]: s for s in pool.status()}
+    assert status[down]["healthy"] is False
+    assert "mock" in pool.hosts[1].loaded
+    # Next time the healthy host goes first
+    assert pool.candidates("mock")[0].url == mock_server.url
+    pool.close()
+
+def test_server_errors_pass_through_without_failover(raw_server, mock_server):
+    def not_found(conn):
+        read_request(conn)
+        body = json.dumps({"error": "model 'x' not found"}).encode()
+        conn.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+        conn.close()
+    url = raw_server(not_found)
+    pool = ServerPool([url, mock_server.url])
+    events = list(pool.chat_stream("x", MESSAGES))
+    assert [e["type"] for e in events] == ["error"]
+    assert pool.hosts[0].healthy is not False
+    assert not any(path == "/api/chat" for path, _ in mock_server.requests)
+    pool.close()
+
+def test_every_host_down_yields_the_last_error():
+    pool = ServerPool([refused_url(), refused_url()])
+    events = list(pool.chat_stream("m", MESSAGES))
+    assert [e["type"] for e in events] == ["error"] and events[0]["retryable"]
+    assert [s["healthy"] for s in pool.status()] == [False, False]
+    pool.close()
+
+def test_listings_merge_across_hosts():
+    with MockOllamaServer(StreamSpec(tokens=1, rate=0), model_count=2) as small, \
+            MockOllamaServer(StreamSpec(tokens=1, rate=0), model_count=3) as large:
+        down = refused_url()
+        pool = ServerPool([small.url, large.url, down])
+        models = {m["name"]: m["hosts"] for m in pool.list_models()}
+        assert models == {"mock-0:latest": [small.url, large.url], "mock-1:latest": [small.url, large.url],
+                          "mock-2:latest": [large.url]}
+        assert pool.candidates("mock-2:latest")[0].url == large.url
+        assert pool.load_model("mock-2:latest")["host"] == large.url
+        assert [m["host"] for m in pool.running_models()] == [large.url]
+        pool.close()
+    assert ServerPool([down]).list_models() is None
+
+def test_unload_model_from_one_host():
+    with MockOllamaServer(StreamSpec(tokens=1, rate=0)) as first, MockOllamaServer(StreamSpec(tokens=1, rate=0)) as second:
+        pool = ServerPool([first.url, second.url])
+        for host in pool.hosts:
+            assert "error" not in host.client.load_model("mock-0:latest")
+        pool.running_models()
+        assert pool.unload_model("mock-0:latest", host=second.url) == {}
+        assert [m["host"] for m in pool.running_models()] == [first.url]
+        assert "error" in pool.unload_model("mock-0:latest", host="http://elsewhere")
+        pool.close()
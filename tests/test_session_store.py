@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from session_store import SessionStore, make_title
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), page_size=3)
+    yield store
+    store.close()
+
+def test_append_titles_and_indexes_the_session(store):
+    session_id = store.create_session()
+    store.append_message(session_id, "system", "be brief")
+    assert store.append_message(session_id, "user", "  first question\nmore", model="llama3") == 1
+    store.append_message(session_id, "assistant", "half an answ", cancelled=True)
+    [session] = store.list_sessions()
+    assert (session["title"], session["model"], session["message_count"]) == ("first question", "llama3", 3)
+    assert [m["cancelled"] for m in store.load_messages(session_id)] == [0, 0, 1]
+
+def test_append_to_missing_session_raises(store):
+    with pytest.raises(KeyError):
+        store.append_message(999, "user", "hi")
+
+def test_load_messages_pages_newest_first(store):
+    session_id = store.create_session("t")
+    store.append_messages(session_id, [{"role": "user", "content": str(i)} for i in range(7)])
+    newest = store.load_messages(session_id)
+    assert [m["seq"] for m in newest] == [4, 5, 6]
+    older = store.load_messages(session_id, before=newest[0]["seq"])
+    assert [m["content"] for m in older] == ["1", "2", "3"]
+    assert [m["seq"] for m in store.load_messages(session_id, before=1)] == [0]
+    assert [m["seq"] for m in store.load_messages_from(session_id, 5)] == [5, 6]
+
+def test_pop_message_removes_the_newest_and_frees_its_seq(store):
+    session_id = store.create_session("t")
+    store.append_message(session_id, "user", "q")
+    store.append_message(session_id, "assistant", "a")
+    assert store.pop_message(session_id)["content"] == "a"
+    assert store.append_message(session_id, "assistant", "b") == 1
+    assert store.all_messages(session_id) == [{"role": "user", "content": "q"}, {"role": "assistant", "content": "b"}]
+    store.pop_message(session_id)
+    store.pop_message(session_id)
+    assert store.pop_message(session_id) is None
+
+def test_delete_session_drops_its_messages(store):
+    session_id = store.create_session("t")
+    store.append_message(session_id, "user", "q")
+    store.delete_session(session_id)
+    assert store.list_sessions() == [] and store.messages_since(0) == []
+
+def test_json_export_import_round_trip(store, tmp_path):
+    session_id = store.create_session()
+    store.append_messages(session_id, [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}])
+    path = tmp_path / "chat.json"
+    store.export_json(session_id, str(path))
+    copy = store.import_json(str(path))
+    assert store.all_messages(copy) == store.all_messages(session_id)
+    path.write_text(json.dumps({"not": "a history"}))
+    with pytest.raises(ValueError):
+        store.import_json(str(path))
+
+def test_make_title_shortens_long_first_lines():
+    assert make_title("x" * 100).endswith("…") and len(make_title("x" * 100)) == 60
+
+def test_search_matches_every_word_with_prefix_on_the_last(store):
+    first = store.create_session("Rust")
+    store.append_message(first, "user", "How do lifetimes work in Rust?")
+    second = store.create_session("Python")
+    store.append_message(second, "user", "Explain python generators")
+    store.append_message(second, "assistant", "Generators yield values lazily")
+    assert [(r["session_id"], r["seq"]) for r in store.search("lifetimes ru")] == [(first, 0)]
+    assert {r["seq"] for r in store.search("generat")} == {0, 1}
+    assert store.search("generators rust") == []
+
+def test_search_takes_operators_and_punctuation_literally(store):
+    session_id = store.create_session("t")
+    store.append_message(session_id, "user", "what does AND mean?")
+    assert store.search("AND") and store.search('"') == [] and store.search("  ") == []
+
+def test_search_falls_back_to_substrings_without_fts(store):
+    session_id = store.create_session("t")
+    store.append_message(session_id, "user", "a multi\nline   message")
+    store.fts = False
+    [result] = store.search("line mess")
+    assert result["snippet"] == "a multi line message"
@@ -0,0 +1,49 @@
+import random
+
+from transcript_view import RowHeightIndex
+
+def brute_find(heights, y):
+    total = 0
+    for i, h in enumerate(heights):
+        total += h
+        if y < total:
+            return i
+    return len(heights) - 1
+
+def test_offsets_match_prefix_sums():
+    heights = [random.Random(i).randint(1, 300) for i in range(257)]
+    index = RowHeightIndex(heights)
+    for i in range(len(heights) + 1):
+        assert index.offset(i) == sum(heights[:i])
+    assert index.total() == sum(heights)
+
+def test_append_set_and_pop_keep_the_tree_consistent():
+    rng = random.Random(0)
+    heights = []
+    index = RowHeightIndex()
+    for _ in range(500):
+        action = rng.random()
+        if action < 0.5 or not heights:
+            h = rng.randint(1, 200)
+            heights.append(h)
+            index.append(h)
+        elif action < 0.8:
+            i = rng.randrange(len(heights))
+            heights[i] = rng.randint(1, 200)
+            index.set(i, heights[i])
+        else:
+            assert index.pop() == heights.pop()
+        assert len(index) == len(heights)
+        assert index.total() == sum(heights)
+    # A rebuilt tree agrees with the incrementally maintained one
+    rebuilt = RowHeightIndex(heights)
+    assert [index.offset(i) for i in range(len(heights) + 1)] == [rebuilt.offset(i) for i in range(len(heights) + 1)]
+
+def test_find_returns_the_row_under_y():
+    heights = [30, 10, 55, 1, 80, 20]
+    index = RowHeightIndex(heights)
+    for y in range(-5, sum(heights) + 20):
+        assert index.find(y) == brute_find(heights, max(y, 0))
+
+def test_find_on_an_empty_index():
+    assert RowHeightIndex().find(100) == 0
@@ -0,0 +1,63 @@
+import threading
+
+from ui_dispatcher import UIDispatcher, merge_chunks
+
+class Root:
+    """Stands in for the Tk root (no display here): no file handlers, so the dispatcher polls via after()."""
+    tk = None
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append((ms, callback))
+        return len(self.scheduled)
+
+def test_merge_chunks_joins_text_of_the_same_type():
+    merged = merge_chunks({"type": "chunk", "content": "a", "t": 1.0}, {"type": "chunk", "content": "b", "tokens": 2, "t": 2.0})
+    assert merged == {"type": "chunk", "content": "ab", "tokens": 3, "t": 1.0}
+    assert merge_chunks({"type": "chunk", "content": "a"}, {"type": "thinking", "content": "b"}) is None
+    assert merge_chunks({"type": "done"}, {"type": "done"}) is None
+
+def test_posts_from_threads_are_merged_and_delivered_in_order():
+    root = Root()
+    dispatcher = UIDispatcher(root)
+    received = []
+    threads = [threading.Thread(target=lambda: [dispatcher.post(received.append, {"type": "chunk", "content": "x"},
+                                                                merge_chunks) for _ in range(100)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    dispatcher.post(received.append, {"type": "done"})
+    dispatcher.drain()
+    assert received[0] == {"type": "chunk", "content": "x" * 400, "tokens": 400}
+    assert received[1:] == [{"type": "done"}]
+    assert dispatcher.stats["merged"] == 399
+
+def test_frame_budget_defers_the_rest_to_a_later_turn():
+    root = Root()
+    dispatcher = UIDispatcher(root, frame_budget_ms=0)
+    received = []
+    for i in range(3):
+        dispatcher.post(received.append, {"n": i})
+    dispatcher.drain()
+    assert received == [{"n": 0}]
+    assert root.scheduled[-1][0] == 1
+    dispatcher.drain()
+    dispatcher.drain()
+    assert received == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+def test_a_failing_callback_does_not_stop_the_queue(capsys):
+    dispatcher = UIDispatcher(Root())
+    received = []
+    dispatcher.post(lambda msg: 1 / 0, {})
+    dispatcher.post(received.append, {"ok": True})
+    dispatcher.drain()
+    assert received == [{"ok": True}]
+    assert "ZeroDivisionError" in capsys.readouterr().err
+    dispatcher.close()
+    dispatcher.post(received.append, {"late": True})
+    dispatcher.drain()
+    assert received == [{"ok": True}]
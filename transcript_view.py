@@ -0,0 +1,391 @@
+import customtkinter as ctk
+import tkinter as tk
+import sys
+from typing import List, Dict, Any, Callable, Optional
+
+ROW_PAD_X = 10
+ROW_PAD_Y = 5
+# Follow-to-bottom scrolls are coalesced to at most one per frame
+FRAME_INTERVAL_MS = 16
+
+class RowHeightIndex:
+    """
+    Fenwick tree over row heights. Prefix offsets and "which row is at y"
+    lookups are O(log n), so scrolling costs the same at 10 or 10,000 rows.
+    """
+    def __init__(self, heights: Optional[List[int]] = None):
+        self.build(heights or [])
+
+    def __len__(self):
+        return len(self._heights)
+
+    def build(self, heights: List[int]):
+        self._heights = list(heights)
+        self._tree = [0] + self._heights
+        n = len(self._heights)
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+
+    def append(self, height: int):
+        self._heights.append(height)
+        n = len(self._heights)
+        self._tree.append(height + self.offset(n - 1) - self.offset(n - (n & -n)))
+
+    def pop(self) -> int:
+        """Removes the last row; no other node of the tree covers it, so nothing else changes."""
+        self._tree.pop()
+        return self._heights.pop()
+
+    def height(self, i: int) -> int:
+        return self._heights[i]
+
+    def set(self, i: int, height: int):
+        delta = height - self._heights[i]
+        if not delta:
+            return
+        self._heights[i] = height
+        n = len(self._heights)
+        j = i + 1
+        while j <= n:
+            self._tree[j] += delta
+            j += j & -j
+
+    def offset(self, i: int) -> int:
+        """Sum of the heights of rows [0, i)."""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def total(self) -> int:
+        return self.offset(len(self._heights))
+
+    def find(self, y: float) -> int:
+        """Index of the row containing pixel offset y (clamped to valid rows)."""
+        n = len(self._heights)
+        if n == 0:
+            return 0
+        pos = 0
+        step = 1 << (n.bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= y:
+                pos = nxt
+                y -= self._tree[nxt]
+            step >>= 1
+        return min(pos, n - 1)
+
+class VirtualTranscript(ctk.CTkFrame):
+    """
+    Chat transcript that keeps messages as plain dicts and only creates
+    widgets for the rows in or near the viewport. Row widgets come from
+    `row_factory(master, role=..., text=...)` and must provide
+    `set_message(role, text, final)`, `append_text(text)`, `finish()`,
+    `set_footer(text)`, `set_thinking(text, tokens, expanded)` and
+    `append_thinking(text, tokens)` so they can be recycled; rows report a
+    reasoning block being opened or closed through `on_thinking_toggle`.
+    `on_reach_top` is called when the first row comes into view, e.g. to
+    load an older page.
+    """
+    def __init__(self, master, row_factory: Callable[..., Any], label_text: str = "",
+                 overscan: int = 600, line_height: int = 24, char_width: int = 9,
+                 on_reach_top: Optional[Callable[[], None]] = None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_factory = row_factory
+        self.on_reach_top = on_reach_top
+        self.overscan = overscan
+        self.line_height = line_height
+        self.char_width = char_width
+
+        self.messages: List[Dict[str, Any]] = []
+        self.heights = RowHeightIndex()
+        self.measured: List[bool] = []
+        self.streaming = set()             # indices of messages still receiving deltas
+
+        self._rows: Dict[int, Any] = {}    # message index -> bound row widget
+        self._items: Dict[int, int] = {}   # message index -> canvas window id
+        self._pool: List[Any] = []
+        self._max_pool = 8
+        self._follow = True
+        self._refresh_pending = False
+        self._follow_pending = False
+        self._width = 0
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        if label_text:
+            self.label = ctk.CTkLabel(self, text=label_text)
+            self.label.grid(row=0, column=0, columnspan=2, sticky="ew", padx=6, pady=(6, 0))
+
+        self.canvas = tk.Canvas(self, highlightthickness=0, bd=0, yscrollincrement=8,
+                                bg=self._apply_appearance_mode(self.cget("fg_color")))
+        self.canvas.grid(row=1, column=0, sticky="nsew", padx=(6, 0), pady=6)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns", pady=6)
+        self.canvas.configure(yscrollcommand=self._on_canvas_scroll)
+        self.canvas.bind("<Configure>", self._on_canvas_configure)
+
+        if sys.platform.startswith("linux"):
+            self.bind_all("<Button-4>", self._on_mousewheel, add=True)
+            self.bind_all("<Button-5>", self._on_mousewheel, add=True)
+        else:
+            self.bind_all("<MouseWheel>", self._on_mousewheel, add=True)
+
+    # --- Model ---------------------------------------------------------
+
+    def set_messages(self, messages: List[Dict[str, Any]]):
+        """Replaces the transcript. Only height estimates are computed here; no widgets."""
+        self._release_all()
+        self.messages = messages
+        self.streaming = set()
+        self.heights.build([self._estimate_height(m) for m in messages])
+        self.measured = [False] * len(messages)
+        self._update_scrollregion()
+        self.scroll_to_bottom()
+
+    def prepend_messages(self, messages: List[Dict[str, Any]]):
+        """Inserts older messages above the current ones without moving what is on screen."""
+        if not messages:
+            return
+        count = len(messages)
+        top = self.canvas.yview()[0] * max(self.heights.total(), 1)
+        self._release_all()
+        self.messages[:0] = messages
+        self.streaming = {i + count for i in self.streaming}
+        self.heights.build([self._estimate_height(m) for m in messages] +
+                           [self.heights.height(i) for i in range(len(self.heights))])
+        self.measured[:0] = [False] * count
+        self._update_scrollregion()
+        self.canvas.yview_moveto((top + self.heights.offset(count)) / max(self.heights.total(), 1))
+        self.refresh()
+
+    def append_message(self, message: Dict[str, Any], streaming: bool = False) -> int:
+        self.messages.append(message)
+        if streaming:
+            self.streaming.add(len(self.messages) - 1)
+        self.heights.append(self._estimate_height(message))
+        self.measured.append(False)
+        self._update_scrollregion()
+        if self._follow:
+            self.scroll_to_bottom()
+        else:
+            self.schedule_refresh()
+        return len(self.messages) - 1
+
+    def pop_message(self) -> Dict[str, Any]:
+        """Removes and returns the last message (e.g. a reply about to be regenerated)."""
+        index = len(self.messages) - 1
+        if index in self._rows:
+            self._release(index)
+        self.streaming.discard(index)
+        self.heights.pop()
+        self.measured.pop()
+        message = self.messages.pop()
+        self._update_scrollregion()
+        self.schedule_refresh()
+        return message
+
+    def append_text(self, index: int, text: str):
+        message = self.messages[index]
+        message["content"] += text
+        row = self._rows.get(index)
+        if row is not None:
+            row.append_text(text)
+
+    def append_thinking(self, index: int, text: str, tokens: int = 1):
+        """Adds reasoning to a message; a collapsed block only updates its token count."""
+        message = self.messages[index]
+        message["thinking"] = message.get("thinking", "") + text
+        message["thinking_tokens"] = message.get("thinking_tokens", 0) + tokens
+        row = self._rows.get(index)
+        if row is not None:
+            row.append_thinking(text, tokens)
+
+    def finish_message(self, index: int):
+        """Marks a streamed message complete so its row renders any held-back tail."""
+        self.streaming.discard(index)
+        row = self._rows.get(index)
+        if row is not None:
+            row.finish()
+
+    def set_footer(self, index: int, text: str):
+        """Small status line under a message (e.g. generation stats); kept in the message dict."""
+        self.messages[index]["footer"] = text
+        row = self._rows.get(index)
+        if row is not None:
+            row.set_footer(text)
+
+    def clear(self):
+        self.set_messages([])
+
+    # --- Scrolling -----------------------------------------------------
+
+    def scroll_to_bottom(self):
+        self._follow = True
+        self.canvas.yview_moveto(1.0)
+        self.refresh()
+
+    def scroll_to_index(self, index: int):
+        total = self.heights.total()
+        if not total or not (0 <= index < len(self.messages)):
+            return
+        self._follow = False
+        self.canvas.yview_moveto(self.heights.offset(index) / total)
+        self.refresh()
+
+    def schedule_follow(self):
+        """Keeps the view pinned to the bottom, at most once per frame."""
+        if not self._follow_pending:
+            self._follow_pending = True
+            self.after(FRAME_INTERVAL_MS, self._flush_follow)
+
+    def _flush_follow(self):
+        self._follow_pending = False
+        if self._follow:
+            self.scroll_to_bottom()
+
+    def is_at_bottom(self) -> bool:
+        return self.canvas.yview()[1] >= 0.999
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._follow = self.is_at_bottom()
+        self.schedule_refresh()
+
+    def _on_canvas_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+
+    def _on_mousewheel(self, event):
+        if not self._owns(event.widget):
+            return
+        if sys.platform.startswith("linux"):
+            step = -1 if event.num == 4 else 1
+        elif sys.platform == "darwin":
+            step = -event.delta
+        else:
+            step = -int(event.delta / 6)
+        self.canvas.yview_scroll(step, "units")
+        self._follow = self.is_at_bottom()
+        self.schedule_refresh()
+
+    def _owns(self, widget) -> bool:
+        # event.widget is a string for Tk-internal widgets (e.g. menus)
+        return isinstance(widget, tk.Misc) and str(widget).startswith(str(self.canvas))
+
+    # --- Layout --------------------------------------------------------
+
+    def schedule_refresh(self):
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self.refresh)
+
+    def refresh(self):
+        """Binds widgets to the rows intersecting the viewport (plus overscan) and recycles the rest."""
+        self._refresh_pending = False
+        if not self.messages:
+            return
+        total = max(self.heights.total(), 1)
+        top = self.canvas.yview()[0] * total
+        bottom = top + self.canvas.winfo_height()
+        first = self.heights.find(max(0, top - self.overscan))
+        last = self.heights.find(bottom + self.overscan)
+
+        for index in [i for i in self._rows if i < first or i > last]:
+            self._release(index)
+        for index in range(first, last + 1):
+            if index not in self._rows:
+                self._bind(index)
+        if first == 0 and not self._follow and self.on_reach_top:
+            self.after_idle(self.on_reach_top)
+
+    def _bind(self, index: int):
+        message = self.messages[index]
+        if self._pool:
+            row = self._pool.pop()
+        else:
+            row = self.row_factory(self.canvas, role=message["role"], text="")
+            row.bind("<Configure>", lambda e, r=row: self._on_row_configure(r), add=True)
+            row.on_thinking_toggle = self._on_thinking_toggle
+        row.set_message(message["role"], message["content"], final=index not in self.streaming)
+        row.set_thinking(message.get("thinking", ""), message.get("thinking_tokens", 0),
+                         expanded=message.get("thinking_open", False))
+        row.set_footer(message.get("footer", ""))
+        row.row_index = index
+        self._rows[index] = row
+        self._items[index] = self.canvas.create_window(
+            ROW_PAD_X, self.heights.offset(index) + ROW_PAD_Y, window=row, anchor="nw",
+            width=max(1, self._width - 2 * ROW_PAD_X))
+
+    def _release(self, index: int):
+        row = self._rows.pop(index)
+        self.canvas.delete(self._items.pop(index))
+        row.row_index = None
+        if len(self._pool) < self._max_pool:
+            self._pool.append(row)
+        else:
+            row.destroy()
+
+    def _release_all(self):
+        for index in list(self._rows):
+            self._release(index)
+
+    def _on_thinking_toggle(self, row, expanded: bool):
+        index = getattr(row, "row_index", None)
+        if index is not None:
+            self.messages[index]["thinking_open"] = expanded
+
+    def _on_row_configure(self, row):
+        index = getattr(row, "row_index", None)
+        if index is None or self._rows.get(index) is not row:
+            return
+        height = row.winfo_height() + 2 * ROW_PAD_Y
+        self.measured[index] = True
+        if height == self.heights.height(index):
+            return
+        self.heights.set(index, height)
+        # Only rows below the resized one move, and only bound rows have items
+        for i, item in self._items.items():
+            if i > index:
+                self.canvas.coords(item, ROW_PAD_X, self.heights.offset(i) + ROW_PAD_Y)
+        self._update_scrollregion()
+        if self._follow:
+            self.schedule_follow()
+        self.schedule_refresh()
+
+    def _on_canvas_configure(self, event):
+        width_changed = event.width != self._width
+        self._width = event.width
+        if width_changed:
+            for item in self._items.values():
+                self.canvas.itemconfigure(item, width=max(1, self._width - 2 * ROW_PAD_X))
+            # Off-screen measurements were taken at the old width
+            for i, message in enumerate(self.messages):
+                if i not in self._rows:
+                    self.measured[i] = False
+            self.heights.build([self.heights.height(i) if i in self._rows else self._estimate_height(m)
+                                for i, m in enumerate(self.messages)])
+            self._update_scrollregion()
+        if self._follow:
+            self.schedule_follow()
+        self.schedule_refresh()
+
+    def _update_scrollregion(self):
+        self.canvas.configure(scrollregion=(0, 0, self._width, max(self.heights.total(), 1)))
+
+    def _estimate_height(self, message: Dict[str, Any]) -> int:
+        chars_per_line = max(20, (self._width - 2 * ROW_PAD_X - 50) // self.char_width)
+        lines = 0
+        for line in message["content"].split("\n"):
+            lines += 1 + len(line) // chars_per_line
+        # Mirrors RichTextDisplay.adjust_height plus ChatMessage padding
+        height = max(50, lines * self.line_height + 30) + 20 + 2 * ROW_PAD_Y
+        if message.get("thinking"):
+            height += 30   # the collapsed block's toggle
+            if message.get("thinking_open"):
+                thinking_lines = sum(1 + len(line) // chars_per_line for line in message["thinking"].split("\n"))
+                height += max(50, thinking_lines * self.line_height + 30)
+        return height
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+import traceback
+import tkinter as tk
+from collections import deque
+from typing import Dict, Any, Callable, Optional
+
+Merge = Callable[[Dict[str, Any], Dict[str, Any]], Optional[Dict[str, Any]]]
+
+class UIDispatcher:
+    """
+    Delivers messages from worker threads to callbacks on the Tk thread.
+
+    post() may be called from any thread. It appends to a queue and, if the
+    Tk side isn't already due to look, writes a byte to a pipe that Tk
+    watches with createfilehandler, so the callback runs as soon as Tk is
+    free and nothing runs while the queue is empty. Each wake-up drains for
+    at most `frame_budget_ms`; anything left waits for the next turn of the
+    event loop so redraws and input still get through.
+
+    A message posted with a `merge` function is folded into the one before
+    it when that one is still queued for the same callback: merge(old, new)
+    returns the combined message, or None to keep them separate. Streamed
+    chunks use this, so a burst that arrives during a slow frame is drawn
+    in one go.
+
+    Where Tk can't watch file descriptors (Windows), the queue is polled
+    every IDLE_POLL_MS instead.
+    """
+    IDLE_POLL_MS = 50
+
+    def __init__(self, root, frame_budget_ms: float = 8.0):
+        self.root = root
+        self.frame_budget = frame_budget_ms / 1000
+        self._items = deque()      # (callback, msg, merge)
+        self._lock = threading.Lock()
+        self._woken = False        # a wake-up byte is in the pipe and not yet handled
+        self._resume_job = None
+        self._closed = False
+        self.stats = {"posted": 0, "merged": 0, "wakeups": 0}
+        self._read_fd = self._write_fd = None
+        try:
+            read_fd, write_fd = os.pipe()
+            os.set_blocking(read_fd, False)
+            os.set_blocking(write_fd, False)
+            root.tk.createfilehandler(read_fd, tk.READABLE, self._on_readable)
+            self._read_fd, self._write_fd = read_fd, write_fd
+        except (AttributeError, OSError, tk.TclError):
+            self._poll()
+
+    def post(self, callback: Callable[[Dict[str, Any]], None], msg: Dict[str, Any], merge: Optional[Merge] = None):
+        """Queues callback(msg) for the Tk thread. Safe from any thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self.stats["posted"] += 1
+            if merge is not None and self._items:
+                last_callback, last_msg, last_merge = self._items[-1]
+                if last_callback == callback and last_merge is merge:
+                    merged = merge(last_msg, msg)
+                    if merged is not None:
+                        self._items[-1] = (callback, merged, merge)
+                        self.stats["merged"] += 1
+                        return
+            self._items.append((callback, msg, merge))
+            if self._woken or self._write_fd is None:
+                return
+            self._woken = True
+        try:
+            os.write(self._write_fd, b"\0")
+        except (BlockingIOError, OSError):
+            pass  # the pipe already holds unread wake-ups
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._items.clear()
+        if self._read_fd is not None:
+            try:
+                self.root.tk.deletefilehandler(self._read_fd)
+            except tk.TclError:
+                pass
+            os.close(self._read_fd)
+            os.close(self._write_fd)
+            self._read_fd = self._write_fd = None
+
+    def _on_readable(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except (BlockingIOError, OSError):
+            pass
+        self.stats["wakeups"] += 1
+        self.drain()
+
+    def drain(self):
+        """Runs queued callbacks until the queue is empty or the frame budget is spent."""
+        with self._lock:
+            self._woken = False
+        deadline = time.perf_counter() + self.frame_budget
+        while True:
+            with self._lock:
+                if not self._items:
+                    return
+                callback, msg, _ = self._items.popleft()
+            try:
+                callback(msg)
+            except Exception:
+                traceback.print_exc()
+            if time.perf_counter() > deadline:
+                with self._lock:
+                    pending = bool(self._items)
+                if pending and self._resume_job is None:
+                    # after(1) rather than after_idle: lets pending redraws and input run first
+                    self._resume_job = self.root.after(1, self._resume)
+                return
+
+    def _resume(self):
+        self._resume_job = None
+        self.drain()
+
+    def _poll(self):
+        if self._closed:
+            return
+        self.drain()
+        self.root.after(1 if self._items else self.IDLE_POLL_MS, self._poll)
+
+def merge_chunks(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Joins two streamed-text messages of the same type ("chunk" or "thinking");
+    "t" keeps the earlier enqueue time so queue delay isn't understated.
+    """
+    if old.get("type") not in ("chunk", "thinking") or new.get("type") != old.get("type"):
+        return None
+    return {**old, "content": old["content"] + new["content"], "tokens": old.get("tokens", 1) + new.get("tokens", 1)}